@@ -7,13 +7,48 @@ Combines output generation and external API integration
 import sys
 import os
 import json
+import csv
+import time
+import hashlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
 
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from film_utils import *
+from film_utils import (DEFAULT_SLUG_REGISTRY, assign_group_slugs, calculate_popularity_score, clean_name,
+                        completeness_score, load_and_group_films, safe_float, safe_int, save_json,
+                        split_delimited_values, summarize_film_rows)
 
 # Configuration
 STATIC_DIR = "static"
+SITE_URL = "https://preview.cbfc-watch.pages.dev"
+
+# Change feed: JSON Feed and Atom pages under static/changes. index.* holds the
+# newest FEED_PAGE_SIZE entries; every full page is archived once as page-N.*
+FEED_DIR = "changes"
+FEED_PAGE_SIZE = 50
+DEFAULT_FEED_STATE = "src/lib/data/change_feed_state.json"
+FEED_TITLES = {'new_film': 'New film', 'new_cuts': 'New cuts', 'updated': 'Updated'}
+
+# Per-film payloads in the /api/films/slug/[slug] response shape, at
+# static/films/<first byte of sha256(slug)>/<slug>.json, with a manifest of content hashes
+FILM_PAYLOAD_DIR = "films"
+FILM_PAYLOAD_CHUNK = 200
+# Analysis CSV columns (film_analysis.py) behind each API count and peer median field
+ANALYSIS_PAYLOAD_FIELDS = {
+    'violence_modifications': 'violence', 'sensitive_content_modifications': 'sensitive_content',
+    'political_religious_modifications': 'political_religious', 'disclaimers_added': 'disclaimers'
+}
+AI_CATEGORY_FIELDS = {'ai_action_types': 'ACTION_TYPES', 'ai_content_types': 'CONTENT_TYPES',
+                      'ai_media_elements': 'MEDIA_ELEMENTS', 'ai_references': 'REFERENCES'}
+
+# Film fields whose change is reported as an update (IMDb votes churn on every run, so they are left out)
+FEED_METADATA_COLUMNS = {
+    'rating': 'rating', 'certDate': 'cert_date', 'posterUrl': 'imdb_poster_url', 'imdbRating': 'imdb_rating',
+    'imdbGenres': 'imdb_genres', 'imdbOverview': 'imdb_overview', 'imdbDirectors': 'imdb_directors',
+    'imdbActors': 'imdb_actors'
+}
 
 
 def recalculate_proportional_popularity_movies(movies):
@@ -118,7 +153,7 @@ def recalculate_proportional_popularity_movies(movies):
                     
     return movies
 
-def generate_current_movies(csv_file):
+def generate_current_movies(csv_file, slug_registry=None):
     """Generate curated current movies using proportional popularity scoring."""
     print("Generating current movies selection...")
 
@@ -128,19 +163,12 @@ def generate_current_movies(csv_file):
 
     # Convert to search-friendly format with scores
     movies_with_scores = []
-    used_slugs = set()
+    group_slugs = assign_group_slugs(groups, slug_registry)
 
     for (name_key, year), film_rows in groups.items():
         best_row = max(film_rows, key=completeness_score)
 
-        # Generate unique slug
-        base_slug = make_slug(best_row.get('movie_name', ''), year)
-        slug = base_slug
-        counter = 1
-        while slug in used_slugs:
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        used_slugs.add(slug)
+        slug = group_slugs[(name_key, year)]
 
         # Collect languages and AI tags
         languages = set()
@@ -216,6 +244,396 @@ def generate_summary_stats(csv_file):
 
 
 
+def short_hash(value):
+    """Return an 8-byte hex hash of a JSON-serialisable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+def film_fingerprints(groups, group_slugs):
+    """
+    Return {slug: fingerprint} for the change feed: name, year, languages, one
+    hash per metadata field (including the cut text) and the sorted hashes of the
+    group's cuts, identified by film version and cut number.
+    """
+    fingerprints = {}
+    for (name_key, year), film_rows in groups.items():
+        best_row = max(film_rows, key=completeness_score)
+        name = clean_name(best_row.get('movie_name', ''))
+        languages = sorted({row['language'].strip() for row in film_rows if row.get('language', '').strip()})
+
+        meta = {field: short_hash(best_row.get(column, '')) for field, column in FEED_METADATA_COLUMNS.items()}
+        meta['name'] = short_hash(name)
+        meta['languages'] = short_hash(languages)
+
+        cut_rows = [row for row in film_rows if row.get('description')]
+        meta['cutText'] = short_hash([row['description'] for row in cut_rows])
+        cuts = sorted(short_hash([row.get('id', ''), row.get('cut_no', '')]) for row in cut_rows)
+        fingerprints[group_slugs[(name_key, year)]] = {
+            'name': name, 'year': year, 'languages': languages, 'meta': meta, 'cuts': cuts
+        }
+    return fingerprints
+
+def diff_fingerprints(previous, current):
+    """Return change entries (without seq or timestamp) between two fingerprint snapshots."""
+    new_films, new_cuts, updated = [], [], []
+    for slug, film in sorted(current.items(), key=lambda item: (item[1]['name'], item[0])):
+        entry = {'slug': slug, 'name': film['name'], 'year': film['year'], 'languages': film['languages']}
+        before = previous.get(slug)
+        if before is None:
+            new_films.append({**entry, 'type': 'new_film', 'details': {'cutCount': len(film['cuts'])},
+                              'id': short_hash([slug, 'new_film'])})
+            continue
+
+        added = sorted(set(film['cuts']) - set(before['cuts']))
+        if added:
+            new_cuts.append({**entry, 'type': 'new_cuts', 'details': {'count': len(added), 'cutCount': len(film['cuts'])},
+                             'id': short_hash([slug, 'new_cuts', added])})
+
+        # Added cuts always change the cut text, which the new_cuts entry already reports
+        fields = sorted(field for field, value in film['meta'].items()
+                        if before['meta'].get(field) != value and not (added and field == 'cutText'))
+        if fields:
+            updated.append({**entry, 'type': 'updated', 'details': {'fields': fields},
+                            'id': short_hash([slug, 'updated', {field: film['meta'][field] for field in fields}])})
+    return new_films + new_cuts + updated
+
+def load_feed_state(state_path):
+    """Load the change feed state (fingerprints, entry count, recent entries), or None before the first run."""
+    if os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+def feed_entry_title(entry):
+    """Human-readable title of a change entry."""
+    title = f"{FEED_TITLES[entry['type']]}: {entry['name']} ({entry['year']})"
+    if entry['type'] == 'new_cuts':
+        title += f" - {entry['details']['count']} new cut{'s' if entry['details']['count'] != 1 else ''}"
+    return title
+
+def feed_entry_text(entry):
+    """Plain-text summary of a change entry."""
+    if entry['type'] == 'updated':
+        return f"Changed: {', '.join(entry['details']['fields'])}"
+    return f"{entry['details']['cutCount']} cuts in total. Languages: {', '.join(entry['languages']) or 'unknown'}"
+
+def render_json_feed(entries, site_url, feed_url, next_url=None):
+    """Render entries (newest first) as a JSON Feed 1.1 page; next_url points to older entries."""
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': 'CBFC Watch - new and updated films',
+        'home_page_url': site_url,
+        'feed_url': feed_url,
+        'items': [{
+            'id': f"urn:cbfc-watch:change:{entry['id']}",
+            'url': f"{site_url}/film/{entry['slug']}",
+            'title': feed_entry_title(entry),
+            'content_text': feed_entry_text(entry),
+            'date_published': entry['published'],
+            '_cbfc': {'seq': entry['seq'], 'type': entry['type'], 'slug': entry['slug'], **entry['details']}
+        } for entry in entries]
+    }
+    if next_url:
+        feed['next_url'] = next_url
+    return feed
+
+def render_atom_feed(entries, site_url, feed_url, prev_archive_url=None):
+    """Render entries (newest first) as an Atom page with RFC 5005 archive links."""
+    updated = entries[0]['published'] if entries else time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        '  <title>CBFC Watch - new and updated films</title>',
+        f'  <id>{escape(feed_url)}</id>',
+        f'  <updated>{updated}</updated>',
+        f'  <link rel="self" href="{escape(feed_url)}"/>',
+        f'  <link rel="alternate" href="{escape(site_url)}"/>'
+    ]
+    if prev_archive_url:
+        lines.append(f'  <link rel="prev-archive" href="{escape(prev_archive_url)}"/>')
+    for entry in entries:
+        lines += [
+            '  <entry>',
+            f"    <id>urn:cbfc-watch:change:{entry['id']}</id>",
+            f'    <title>{escape(feed_entry_title(entry))}</title>',
+            f"    <link href=\"{escape(site_url)}/film/{escape(entry['slug'])}\"/>",
+            f"    <updated>{entry['published']}</updated>",
+            f"    <category term=\"{entry['type']}\"/>",
+            f'    <summary>{escape(feed_entry_text(entry))}</summary>',
+            '  </entry>'
+        ]
+    lines.append('</feed>')
+    return '\n'.join(lines) + '\n'
+
+def write_feed_page(feed_dir, name, entries, site_url, older_name=None):
+    """Write name.json and name.atom for one page of entries (given oldest first)."""
+    base_url = f"{site_url}/{FEED_DIR}"
+    newest_first = entries[::-1]
+    save_json(render_json_feed(newest_first, site_url, f"{base_url}/{name}.json",
+                               f"{base_url}/{older_name}.json" if older_name else None),
+              os.path.join(feed_dir, f"{name}.json"))
+    with open(os.path.join(feed_dir, f"{name}.atom"), 'w', encoding='utf-8') as f:
+        f.write(render_atom_feed(newest_first, site_url, f"{base_url}/{name}.atom",
+                                 f"{base_url}/{older_name}.atom" if older_name else None))
+
+def generate_change_feed(csv_file, output_dir, state_path=DEFAULT_FEED_STATE, slug_registry=None, site_url=SITE_URL):
+    """
+    Diff the dataset against the previous run's fingerprints and append new films,
+    new cuts and metadata updates to the paged change feed. Entry ids are derived
+    from the change itself, so they are stable across reruns. The first run only
+    records the baseline. Returns the number of new entries.
+    """
+    groups, _ = load_and_group_films(csv_file)
+    if not groups:
+        return 0
+
+    fingerprints = film_fingerprints(groups, assign_group_slugs(groups, slug_registry))
+    state = load_feed_state(state_path)
+    feed_dir = os.path.join(output_dir, FEED_DIR)
+    entries = []
+    if state is None:
+        state = {'seq': 0, 'pages': 0, 'recent': [], 'films': fingerprints}
+        print(f"Change feed baseline recorded for {len(fingerprints)} films")
+    else:
+        published = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        entries = diff_fingerprints(state['films'], fingerprints)
+        for entry in entries:
+            state['seq'] += 1
+            entry.update(seq=state['seq'], published=published)
+        state['recent'] += entries
+        state['films'] = fingerprints
+        print(f"Change feed: {len(entries)} new entries")
+
+    if entries or (state['seq'] and not os.path.exists(os.path.join(feed_dir, 'index.json'))):
+        os.makedirs(feed_dir, exist_ok=True)
+        # Archive every page that has filled up; archived pages never change again
+        while state['seq'] - state['pages'] * FEED_PAGE_SIZE >= FEED_PAGE_SIZE:
+            state['pages'] += 1
+            page = [entry for entry in state['recent'] if (entry['seq'] - 1) // FEED_PAGE_SIZE + 1 == state['pages']]
+            write_feed_page(feed_dir, f"page-{state['pages']}", page, site_url,
+                            f"page-{state['pages'] - 1}" if state['pages'] > 1 else None)
+        state['recent'] = state['recent'][-2 * FEED_PAGE_SIZE:]
+
+        # The index links to the archived page just before its oldest entry
+        index_entries = state['recent'][-FEED_PAGE_SIZE:]
+        older_page = (index_entries[0]['seq'] - 1) // FEED_PAGE_SIZE if index_entries else 0
+        write_feed_page(feed_dir, 'index', index_entries, site_url, f"page-{older_page}" if older_page else None)
+
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(state_path + '.tmp', state_path)
+    return len(entries)
+
+def film_payload_path(slug):
+    """Relative path of a film's payload, sharded by the first byte of the slug's sha256."""
+    return f"{hashlib.sha256(slug.encode('utf-8')).hexdigest()[:2]}/{slug}.json"
+
+def load_analysis_payloads(analysis_csv):
+    """Read film_analysis.py results into {(film id, language): analysis payload}."""
+    analysis = {}
+    with open(analysis_csv, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            payload = {'model_type': row['model_type']}
+            for count_field, prefix in ANALYSIS_PAYLOAD_FIELDS.items():
+                payload[count_field] = safe_int(row.get(f'score_value_{count_field}'))
+                expected = row.get(f'median_score_{count_field}')
+                payload[f'{prefix}_peer_median'] = round(float(expected), 4) if expected else None
+            analysis[(row['id'], row['language'])] = payload
+    return analysis
+
+def compact(record):
+    """Drop empty values from a payload record."""
+    return {key: value for key, value in record.items() if value not in (None, '', [], {})}
+
+def build_film_payload(slug, year, film_rows, analysis, similar=None):
+    """
+    Build one film group's payload, matching what the film API assembles from D1.
+    The view count is live in D1, so the page merges it in from the views endpoint.
+    """
+    best_row = max(film_rows, key=completeness_score)
+    summaries = summarize_film_rows(film_rows)
+    versions = {}
+    categories = {}
+
+    for row in film_rows:
+        film_id = row.get('id', '').strip()
+        if film_id not in versions:
+            versions[film_id] = {
+                'row': row,
+                'version': compact({
+                    'id': film_id, 'language': row.get('language'), 'cert_date': row.get('cert_date'),
+                    'cbfc_file_no': row.get('cbfc_file_no'), 'certifier': row.get('certifier')
+                }),
+                'modifications': []
+            }
+        if not row.get('description'):
+            continue
+
+        modification = compact({
+            'cut_no': safe_int(row.get('cut_no')) if row.get('cut_no') else None,
+            'description': row.get('description'),
+            'ai_description': row.get('ai_cleaned_description'),
+            'deleted_secs': safe_float(row.get('deleted_secs')) if row.get('deleted_secs') else None,
+            'replaced_secs': safe_float(row.get('replaced_secs')) if row.get('replaced_secs') else None,
+            'inserted_secs': safe_float(row.get('inserted_secs')) if row.get('inserted_secs') else None,
+            'ai_action_types': row.get('ai_action'),
+            'ai_content_types': row.get('ai_content_types'),
+            'ai_media_elements': row.get('ai_media_element'),
+            'ai_references': row.get('ai_reference')
+        })
+        versions[film_id]['modifications'].append(modification)
+        for field, category in AI_CATEGORY_FIELDS.items():
+            for value in split_delimited_values(modification.get(field), ['|']):
+                values = categories.setdefault(category, [])
+                if value not in values:
+                    values.append(value)
+
+    payload_versions = []
+    for film_id, entry in versions.items():
+        version = entry['version']
+        version['modifications'] = sorted(entry['modifications'], key=lambda mod: mod.get('cut_no', 0))
+        version_analysis = analysis.get((film_id, entry['row'].get('language')))
+        if version_analysis:
+            version['analysis'] = version_analysis
+        # summarize_film_rows keys by the first CSV column, which is the film id
+        summary = summaries.get(next(iter(entry['row'].values())))
+        if summary:
+            version['summary'] = {**summary, 'ai_action_types': '|'.join(sorted(summary['ai_action_types'])) or None,
+                                  'ai_content_types': '|'.join(sorted(summary['ai_content_types'])) or None}
+        payload_versions.append(version)
+
+    # Film-level fields come from the first version's row, as the API takes them from its first film record
+    first_row = film_rows[0]
+    payload = compact({
+        'slug': slug,
+        'name': clean_name(best_row.get('movie_name', '')),
+        'year': year,
+        'duration': safe_float(first_row.get('duration_secs')) / 60.0 if first_row.get('duration_secs') else None,
+        'rating': first_row.get('rating'),
+        'poster_url': best_row.get('imdb_poster_url'),
+        'imdb_id': best_row.get('imdb_id'),
+        'imdb_rating': safe_float(best_row.get('imdb_rating')) if best_row.get('imdb_rating') else None,
+        'imdb_votes': best_row.get('imdb_votes'),
+        'imdb_overview': best_row.get('imdb_overview'),
+        'imdb_genres': best_row.get('imdb_genres'),
+        'imdb_directors': best_row.get('imdb_directors'),
+        'imdb_actors': best_row.get('imdb_actors'),
+        'imdb_countries': best_row.get('imdb_countries'),
+        'imdb_languages': best_row.get('imdb_languages'),
+        'imdb_studios': best_row.get('imdb_studios')
+    })
+    payload['versions'] = payload_versions
+    payload['categories'] = categories
+    payload['similar'] = similar or []
+    return payload
+
+def render_film_payloads(task):
+    """
+    Render and write one chunk of film payloads. Runs in a worker process, so it
+    takes and returns plain picklable values. A file is only rewritten when its
+    content hash differs from the manifest's. Returns [(slug, path, hash, written)].
+    """
+    films, output_dir, previous_hashes = task
+    results = []
+    for slug, year, film_rows, analysis, similar in films:
+        data = json.dumps(build_film_payload(slug, year, film_rows, analysis, similar), separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        relative_path = film_payload_path(slug)
+        path = os.path.join(output_dir, relative_path)
+
+        written = previous_hashes.get(slug) != digest or not os.path.exists(path)
+        if written:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        results.append((slug, relative_path, digest, written))
+    return results
+
+def load_similar_payloads(similar_json, groups, group_slugs):
+    """
+    Resolve similar_films.py --json-output into {slug: [similar film, ...]} with the
+    name, year and poster the film API reads from film_similar.
+    """
+    with open(similar_json, encoding='utf-8') as f:
+        similar = json.load(f)
+
+    details = {}
+    for group_key, film_rows in groups.items():
+        best_row = max(film_rows, key=completeness_score)
+        details[group_slugs[group_key]] = {
+            'name': clean_name(best_row.get('movie_name', '')),
+            'year': safe_int(group_key[1]),
+            'poster_url': best_row.get('imdb_poster_url') or None
+        }
+    return {slug: [{'slug': other, **details.get(other, {'name': None, 'year': None, 'poster_url': None}),
+                    'score': score} for other, score in neighbours]
+            for slug, neighbours in similar.items()}
+
+def generate_film_payloads(csv_file, output_dir, analysis_csv, similar_json, slug_registry=None, max_workers=None,
+                           chunk_size=FILM_PAYLOAD_CHUNK):
+    """
+    Prerender every film group's payload in a process pool into a sharded directory
+    with a manifest of content hashes. Unchanged files are left alone and payloads
+    of films no longer in the dataset are removed. Returns (written, unchanged, removed).
+    Both the analysis and similar films outputs are required, as the film page
+    serves a payload instead of the API whenever one exists.
+    """
+    groups, _ = load_and_group_films(csv_file)
+    if not groups:
+        return 0, 0, 0
+
+    group_slugs = assign_group_slugs(groups, slug_registry)
+    analysis = load_analysis_payloads(analysis_csv)
+    similar = load_similar_payloads(similar_json, groups, group_slugs)
+    payload_dir = os.path.join(output_dir, FILM_PAYLOAD_DIR)
+    manifest_path = os.path.join(payload_dir, 'manifest.json')
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+
+    tasks = []
+    films = []
+    for group_key, film_rows in groups.items():
+        slug = group_slugs[group_key]
+        film_analysis = {}
+        for row in film_rows:
+            key = (row.get('id', '').strip(), row.get('language'))
+            if key in analysis:
+                film_analysis[key] = analysis[key]
+        films.append((slug, group_key[1], film_rows, film_analysis, similar.get(slug)))
+        if len(films) >= chunk_size:
+            tasks.append(films)
+            films = []
+    if films:
+        tasks.append(films)
+    del groups
+
+    tasks = [(chunk, payload_dir, {slug: previous[slug]['hash'] for slug, *_ in chunk if slug in previous})
+             for chunk in tasks]
+    manifest = {}
+    written = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for results in executor.map(render_film_payloads, tasks):
+            for slug, relative_path, digest, was_written in results:
+                manifest[slug] = {'path': relative_path, 'hash': digest}
+                written += was_written
+
+    removed = 0
+    for slug, entry in previous.items():
+        if slug not in manifest and os.path.exists(os.path.join(payload_dir, entry['path'])):
+            os.remove(os.path.join(payload_dir, entry['path']))
+            removed += 1
+
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    print(f"Film payloads: {written} written, {len(manifest) - written} unchanged, {removed} removed")
+    return written, len(manifest) - written, removed
+
 def main():
     """Main content generation pipeline."""
     import argparse
@@ -223,6 +641,15 @@ def main():
     parser = argparse.ArgumentParser(description="Generate JSON content files for web application")
     parser.add_argument('--output-dir', default=STATIC_DIR, help='Output directory')
     parser.add_argument('--csv-file', default="src/lib/data/data.csv", help='CSV data file')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+    parser.add_argument('--feed-state', default=DEFAULT_FEED_STATE, help='Fingerprints and recent entries of the change feed')
+    parser.add_argument('--site-url', default=SITE_URL, help='Site URL used for links in the change feed')
+    parser.add_argument('--analysis-csv', help='film_analysis.py results to include as each version\'s peer comparison '
+                        '(required for the film payloads)')
+    parser.add_argument('--similar-json', help='similar_films.py --json-output to include as each film\'s similar films '
+                        '(required for the film payloads)')
+    parser.add_argument('--workers', type=int, help='Worker processes for the film payloads')
+    parser.add_argument('--skip-film-payloads', action='store_true', help='Do not prerender the per-film JSON payloads')
 
     args = parser.parse_args()
 
@@ -250,7 +677,7 @@ def main():
     try:
         # Generate content files
         outputs = {
-            "current_movies.json": generate_current_movies(csv_file),
+            "current_movies.json": generate_current_movies(csv_file, args.slug_registry),
             "summary_stats.json": generate_summary_stats(csv_file)
         }
 
@@ -264,6 +691,17 @@ def main():
                 print(f"Failed to generate {filename}")
                 return 1
 
+        generate_change_feed(csv_file, args.output_dir, args.feed_state, args.slug_registry, args.site_url.rstrip('/'))
+        # The film page prefers a payload to the API, so one is only written with
+        # everything the API returns
+        if args.skip_film_payloads:
+            print("Skipping film payloads")
+        elif args.analysis_csv and args.similar_json:
+            generate_film_payloads(csv_file, args.output_dir, args.analysis_csv, args.similar_json, args.slug_registry,
+                                   args.workers)
+        else:
+            print("Skipping film payloads: they need --analysis-csv and --similar-json")
+
         print("Content generation completed successfully!")
         return 0
 
@@ -6,74 +6,276 @@ Combines CSV processing and D1 database import functionality
 
 import sys
 import os
+import re
+import json
+import time
+import hashlib
 import tempfile
 import shutil
+import itertools
 from pathlib import Path
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from film_utils import *
-from film_analysis import run_analysis
-import pandas as pd
+from film_utils import (DEFAULT_BATCH_SIZE, DEFAULT_SLUG_REGISTRY, assign_group_slugs, clean_name,
+                        completeness_score, load_and_group_films, run_command, sql_value, summarize_film_rows)
+from run_metrics import new_run_metrics, record_batch_metrics, finish_run, write_run_metrics
+
+# Tables that the staging import loads index-free and swaps in after the load
+STAGED_TABLES = ['films', 'cut_texts', 'modifications', 'film_summary', 'analysis_results', 'analysis_strata_results',
+                 'analysis_peer_expectations']
+STAGING_SUFFIX = '_staging'
+
+# Batches close at a byte, statement or film row target. The byte target starts
+# at DEFAULT_BATCH_BYTES and is retuned from each batch's import latency towards
+# TARGET_BATCH_SECONDS, within the min/max bounds (wrangler times out at 300s).
+DEFAULT_BATCH_BYTES = 2 * 1024 * 1024
+MIN_BATCH_BYTES = 64 * 1024
+MAX_BATCH_BYTES = 32 * 1024 * 1024
+MAX_BATCH_STATEMENTS = 20000
+TARGET_BATCH_SECONDS = 60
+SCHEMA_DIR = Path("scripts/db")
+# Applied before the schema files when modifications still has its cut text columns
+CUT_TEXTS_MIGRATION = SCHEMA_DIR / "migrations" / "cut-texts.sql"
+DATA_URL = "https://github.com/diagram-chasing/censor-board-cuts/raw/refs/heads/master/data/data.csv"
+
+# Columns an upsert overwrites on an existing film row (view counts are kept)
+FILM_UPDATE_COLUMNS = ['slug', 'name', 'year', 'language', 'duration', 'rating', 'cert_date', 'cert_no', 'cbfc_file_no',
+                       'applicant', 'certifier', 'poster_url', 'imdb_id', 'imdb_rating', 'imdb_votes', 'imdb_overview',
+                       'imdb_genres', 'imdb_directors', 'imdb_actors', 'imdb_countries', 'imdb_languages', 'imdb_studios']
+
+# Cut text no modification references any more, after upserts and deletions
+CUT_TEXTS_CLEANUP_SQL = "DELETE FROM cut_texts WHERE hash NOT IN (SELECT text_hash FROM modifications WHERE text_hash IS NOT NULL);\n"
+
+def staged_name(table, staging=False):
+    """Return the table name to write to for the given import mode."""
+    return f"{table}{STAGING_SUFFIX}" if staging else table
+
+def read_schema_statements(schema_dir=SCHEMA_DIR):
+    """Read the CREATE statements from the schema files, keyed by statement type."""
+    statements = {'table': {}, 'index': [], 'view': []}
+    for schema_file in sorted(Path(schema_dir).glob("*.sql")):
+        sql = re.sub(r'--[^\n]*', '', schema_file.read_text(encoding='utf-8'))
+        for statement in sql.split(';'):
+            statement = statement.strip()
+            table = re.match(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)', statement, re.IGNORECASE)
+            index = re.match(r'CREATE INDEX (?:IF NOT EXISTS )?\w+ ON (\w+)', statement, re.IGNORECASE)
+            view = re.match(r'CREATE VIEW (?:IF NOT EXISTS )?(\w+)', statement, re.IGNORECASE)
+            if table:
+                statements['table'][table.group(1)] = (schema_file.name, statement)
+            elif index:
+                statements['index'].append((index.group(1), statement))
+            elif view:
+                statements['view'].append((view.group(1), statement))
+    return statements
+
+def d1_table_columns(table, db_name, wrangler_flag):
+    """Return the column names of a D1 table (empty when it does not exist), or None if the query fails."""
+    success, stdout, _ = run_command([
+        'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
+        '--command', f"SELECT name FROM pragma_table_info('{table}');", '--json', '-y'
+    ])
+    if not success:
+        return None
+    try:
+        return {row['name'] for result in json.loads(stdout) for row in result.get('results', [])}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
 
-def generate_sql_batches(csv_path, output_dir, batch_size=DEFAULT_BATCH_SIZE):
-    """Generate SQL batch files from CSV data."""
-    groups, _ = load_and_group_films(csv_path)
-    if not groups:
-        print(f"No film data found in {csv_path}")
-        return []
+def generate_normalize_sql(film_ids, schema_dir=SCHEMA_DIR):
+    """
+    Return SQL regenerating the 001 bridge rows of the given films (SQL literals):
+    their film_* rows are replaced, and the modification_* rows of their new cuts
+    added, as the old ones cascade away with the replaced cuts.
+    """
+    ids = ', '.join(film_ids)
+    statements = []
+    for normalize_file in sorted(Path(schema_dir).glob("001-*.sql")):
+        sql = re.sub(r'--[^\n]*', '', normalize_file.read_text(encoding='utf-8'))
+        for statement in sql.split(';'):
+            statement = statement.strip()
+            table = re.match(r'(?:CREATE TABLE|INSERT OR IGNORE INTO) (?:IF NOT EXISTS )?(\w+)', statement, re.IGNORECASE)
+            if not table:
+                continue
+            if statement.upper().startswith('CREATE'):
+                statements.append(statement)
+            elif re.search(r'\bFROM films\s+WHERE ', statement):
+                # Each population query splits its values recursively from one base case
+                statements.append(f"DELETE FROM {table.group(1)} WHERE film_id IN ({ids})")
+                statements.append(re.sub(r'\bFROM films\s+WHERE ', f"FROM films WHERE id IN ({ids}) AND ", statement))
+            else:
+                statements.append(re.sub(r'\bFROM modifications\s+WHERE ',
+                                         f"FROM modifications WHERE film_id IN ({ids}) AND ", statement))
+    return ''.join(f"{statement};\n" for statement in statements)
+
+def generate_staging_sql(output_dir, schema_dir=SCHEMA_DIR):
+    """Generate the staging schema and swap SQL files. Returns (schema_file, swap_file)."""
+    statements = read_schema_statements(schema_dir)
+
+    def to_staging(sql):
+        for table in STAGED_TABLES:
+            sql = re.sub(rf'\b{table}\b(?=\s*\()', staged_name(table, True), sql)
+        return sql
+
+    # Staging tables mirror the live schema but carry no secondary indexes
+    schema_file = os.path.join(output_dir, "tmp_import_staging_schema.sql")
+    with open(schema_file, 'w', encoding='utf-8') as f:
+        for table in reversed(STAGED_TABLES):
+            f.write(f"DROP TABLE IF EXISTS {staged_name(table, True)};\n")
+        for table in STAGED_TABLES:
+            _, create_sql = statements['table'][table]
+            create_sql = re.sub(r'IF NOT EXISTS ', '', create_sql, flags=re.IGNORECASE)
+            f.write(to_staging(create_sql) + ";\n")
+
+    # Dropping a film cascades into every table referencing it, so rows in the
+    # base schema tables that are not rebuilt by the import are kept aside
+    preserved = [
+        table for table, (filename, create_sql) in statements['table'].items()
+        if filename.startswith('000-') and table not in STAGED_TABLES
+        and re.search(r'REFERENCES films\s*\(', create_sql)
+    ]
+
+    swap_file = os.path.join(output_dir, "tmp_import_staging_swap.sql")
+    with open(swap_file, 'w', encoding='utf-8') as f:
+        f.write(f"UPDATE {staged_name('films', True)} SET views = COALESCE((SELECT f.views FROM films f WHERE f.id = {staged_name('films', True)}.id), 0);\n")
+        for table in preserved:
+            f.write(f"DROP TABLE IF EXISTS {table}_keep;\n")
+            f.write(f"CREATE TABLE {table}_keep AS SELECT * FROM {table};\n")
+        f.write("PRAGMA defer_foreign_keys = on;\n")
+        for view, _ in statements['view']:
+            f.write(f"DROP VIEW IF EXISTS {view};\n")
+        for table in reversed(STAGED_TABLES):
+            f.write(f"DROP TABLE IF EXISTS {table};\n")
+        for table in STAGED_TABLES:
+            f.write(f"ALTER TABLE {staged_name(table, True)} RENAME TO {table};\n")
+        for table, create_sql in statements['index']:
+            if table in STAGED_TABLES:
+                f.write(create_sql + ";\n")
+        for _, create_sql in statements['view']:
+            f.write(create_sql + ";\n")
+        for table in preserved:
+            f.write(f"INSERT OR IGNORE INTO {table} SELECT * FROM {table}_keep WHERE film_id IN (SELECT id FROM films);\n")
+            f.write(f"DROP TABLE {table}_keep;\n")
+        f.write("PRAGMA defer_foreign_keys = off;\n")
+        # The 001 bridge tables lost their rows to the cascades too. They are derived
+        # from films and modifications, so they are repopulated from the new tables
+        for normalize_file in sorted(Path(schema_dir).glob("001-*.sql")):
+            f.write(normalize_file.read_text(encoding='utf-8').rstrip() + "\n")
+        f.write("ANALYZE;\n")
+
+    return schema_file, swap_file
+
+def generate_search_rebuild_sql(output_dir):
+    """Generate the SQL that rebuilds the external-content full-text index from the loaded tables."""
+    rebuild_file = os.path.join(output_dir, "tmp_import_search_rebuild.sql")
+    with open(rebuild_file, 'w', encoding='utf-8') as f:
+        f.write("INSERT INTO modifications_fts(modifications_fts) VALUES('rebuild');\n")
+    return rebuild_file
+
+def cut_text_hash(description, ai_description):
+    """Content address of a cut's text. Whitespace is normalised, so copies differing only in spacing share a hash."""
+    normalized = '\x1f'.join(' '.join((text or '').split()) for text in (description, ai_description))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+def new_batch_sizer(target_bytes=DEFAULT_BATCH_BYTES, min_bytes=MIN_BATCH_BYTES, max_bytes=MAX_BATCH_BYTES,
+                    max_statements=MAX_BATCH_STATEMENTS, max_rows=DEFAULT_BATCH_SIZE,
+                    target_seconds=TARGET_BATCH_SECONDS):
+    """Create the batch size targets and the per-batch import stats."""
+    return {
+        'target_bytes': target_bytes,
+        'min_bytes': min_bytes,
+        'max_bytes': max_bytes,
+        'max_statements': max_statements,
+        'max_rows': max_rows,
+        'target_seconds': target_seconds,
+        'pending': {},
+        'batches': []
+    }
+
+def batch_is_full(batch_sizer, batch_bytes, statements, rows):
+    """Check a batch against the current byte, statement and film row targets."""
+    return (batch_bytes >= batch_sizer['target_bytes'] or statements >= batch_sizer['max_statements']
+            or rows >= batch_sizer['max_rows'])
+
+def record_batch(batch_sizer, batch_file, seconds, success):
+    """Record an imported batch and retarget the batch size from its latency."""
+    batch_bytes, statements = batch_sizer['pending'].pop(batch_file)
+    batch_sizer['batches'].append({
+        'bytes': batch_bytes, 'statements': statements, 'seconds': seconds,
+        'success': success, 'target_bytes': batch_sizer['target_bytes']
+    })
+
+    if not success:
+        target = batch_sizer['target_bytes'] / 2
+    elif seconds > 0:
+        # Aim the next batch at target_seconds at this batch's throughput,
+        # moving halfway there so one slow or fast batch does not swing it
+        target = (batch_sizer['target_bytes'] + batch_bytes / seconds * batch_sizer['target_seconds']) / 2
+    else:
+        return
+    batch_sizer['target_bytes'] = int(min(batch_sizer['max_bytes'], max(batch_sizer['min_bytes'], target)))
+
+def print_batch_stats(batch_sizer):
+    """Print the batch sizes, latencies and throughput of an import run."""
+    batches = batch_sizer['batches']
+    if not batches:
+        return
+    latencies = sorted(b['seconds'] for b in batches)
+    total_bytes = sum(b['bytes'] for b in batches)
+    total_seconds = sum(latencies)
+    targets = [b['target_bytes'] for b in batches] + [batch_sizer['target_bytes']]
+
+    print(f"Batches: {len(batches)} ({sum(not b['success'] for b in batches)} failed), "
+          f"{total_bytes / 1e6:.1f} MB, {sum(b['statements'] for b in batches)} statements")
+    print(f"Batch latency: p50 {latencies[len(latencies) // 2]:.1f}s, "
+          f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.1f}s, max {latencies[-1]:.1f}s; "
+          f"throughput {total_bytes / 1e6 / max(total_seconds, 1e-9):.2f} MB/s")
+    print(f"Batch target: {targets[0] / 1e6:.2f} MB -> {targets[-1] / 1e6:.2f} MB "
+          f"(range {min(targets) / 1e6:.2f}-{max(targets) / 1e6:.2f} MB)")
+
+def iter_sql_batches(groups, output_dir, staging=False, slug_registry=None, batch_sizer=None, upsert=False):
+    """
+    Yield the files of an import in the order they are applied. Data batches are
+    written lazily, each closing when batch_sizer's current targets are reached,
+    so latency recorded while one batch imports sizes the next. With upsert,
+    existing film rows are updated in place and their cuts replaced, for
+    re-importing changed groups into the live tables, and each batch ends by
+    regenerating its films' 001 bridge rows.
+    """
+    batch_sizer = batch_sizer or new_batch_sizer()
+    group_slugs = assign_group_slugs(groups, slug_registry)
 
     os.makedirs(output_dir, exist_ok=True)
 
-    batch_files = []
-    current_batch = 1
-    rows_written = 0
-    used_slugs = set()
-
-    batch_file = os.path.join(output_dir, f"tmp_import_batch_{current_batch}.sql")
-    sqlfile = open(batch_file, 'w', encoding='utf-8')
-    batch_files.append(batch_file)
+    films_table = staged_name('films', staging)
+    cut_texts_table = staged_name('cut_texts', staging)
+    modifications_table = staged_name('modifications', staging)
+    summary_table = staged_name('film_summary', staging)
+    text_stats = {'cuts': 0, 'hashes': set(), 'text_bytes': 0, 'written_bytes': 0, 'stored_bytes': 0}
+    film_insert = 'INSERT' if upsert else 'INSERT OR IGNORE'
+    film_conflict = ''
+    if upsert:
+        film_conflict = "\nON CONFLICT (id) DO UPDATE SET " + ', '.join(f"{column} = excluded.{column}"
+                                                                       for column in FILM_UPDATE_COLUMNS)
+    if staging:
+        schema_file, swap_file = generate_staging_sql(output_dir)
+        yield schema_file
+
+    current_batch = 0
+    sqlfile = None
+    batch_film_ids = []
 
     for group_key, film_rows in groups.items():
-        # Handle both old format (name, year) and new format (name, year, film_id)
-        if len(group_key) == 3:
-            name_key, year, film_id = group_key
-        else:
-            name_key, year = group_key
-            film_id = None
+        name_key, year = group_key
         best_row = max(film_rows, key=completeness_score)
-
-        # Generate unique slug
-        base_slug = make_slug(best_row.get('movie_name', ''), year)
-        
-        # If this is a film with multiple versions (different film IDs), 
-        # append the last 3 digits of film ID to make it unique
-        if len(group_key) == 3 and film_id:
-            # Check if there are other films with same name/year but different IDs
-            name_year_key = (group_key[0], group_key[1])  # (name, year)
-            similar_films = [k for k in groups.keys() if len(k) == 3 and (k[0], k[1]) == name_year_key]
-            
-            if len(similar_films) > 1:
-                # Multiple films with same name/year - append film ID suffix
-                id_suffix = film_id[-3:] if len(film_id) >= 3 else film_id
-                base_slug = f"{base_slug}-{id_suffix}"
-        
-        slug = base_slug
-        counter = 1
-        while slug in used_slugs:
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        used_slugs.add(slug)
+        slug = group_slugs[group_key]
+        statements = []
+        group_text_hashes = set()
+        if upsert:
+            group_film_ids = list(dict.fromkeys(sql_value(row.get('id')) for row in film_rows))
+            statements.append(f"DELETE FROM {modifications_table} WHERE film_id IN ({', '.join(group_film_ids)});\n")
 
         # Insert separate film record for each language version
         for row in film_rows:
-            if rows_written >= batch_size:
-                sqlfile.close()
-                current_batch += 1
-                batch_file = os.path.join(output_dir, f"tmp_import_batch_{current_batch}.sql")
-                sqlfile = open(batch_file, 'w', encoding='utf-8')
-                batch_files.append(batch_file)
-                rows_written = 0
-
             # Film record
             film_id = sql_value(row.get(list(row.keys())[0]))
             name = sql_value(clean_name(best_row.get('movie_name', '')))
@@ -98,15 +300,14 @@ def generate_sql_batches(csv_path, output_dir, batch_size=DEFAULT_BATCH_SIZE):
             imdb_languages = sql_value(best_row.get('imdb_languages'))
             imdb_studios = sql_value(best_row.get('imdb_studios'))
 
-            sqlfile.write(f"""INSERT OR IGNORE INTO films (id, slug, name, year, language, duration, rating, cert_date, cert_no, cbfc_file_no, applicant, certifier, poster_url, imdb_id, imdb_rating, imdb_votes, imdb_overview, imdb_genres, imdb_directors, imdb_actors, imdb_countries, imdb_languages, imdb_studios)
-VALUES ({film_id}, {sql_value(slug)}, {name}, {sql_value(year, True)}, {language}, {duration}, {rating}, {cert_date}, {cert_no}, {cbfc_file_no}, {applicant}, {certifier}, {poster_url}, {imdb_id}, {imdb_rating}, {imdb_votes}, {overview}, {imdb_genres}, {imdb_directors}, {imdb_actors}, {imdb_countries}, {imdb_languages}, {imdb_studios});
+            statements.append(f"""{film_insert} INTO {films_table} (id, slug, name, year, language, duration, rating, cert_date, cert_no, cbfc_file_no, applicant, certifier, poster_url, imdb_id, imdb_rating, imdb_votes, imdb_overview, imdb_genres, imdb_directors, imdb_actors, imdb_countries, imdb_languages, imdb_studios)
+VALUES ({film_id}, {sql_value(slug)}, {name}, {sql_value(year, True)}, {language}, {duration}, {rating}, {cert_date}, {cert_no}, {cbfc_file_no}, {applicant}, {certifier}, {poster_url}, {imdb_id}, {imdb_rating}, {imdb_votes}, {overview}, {imdb_genres}, {imdb_directors}, {imdb_actors}, {imdb_countries}, {imdb_languages}, {imdb_studios}){film_conflict};
 """)
 
             # Insert modification if exists
             if row.get('description'):
                 cut_no = sql_value(row.get('cut_no'), True)
-                description = sql_value(row.get('description'))
-                ai_desc = sql_value(row.get('ai_cleaned_description'))
+                text_hash = cut_text_hash(row.get('description'), row.get('ai_cleaned_description'))
                 deleted_secs = sql_value(row.get('deleted_secs'), True)
                 replaced_secs = sql_value(row.get('replaced_secs'), True)
                 inserted_secs = sql_value(row.get('inserted_secs'), True)
@@ -115,57 +316,216 @@ VALUES ({film_id}, {sql_value(slug)}, {name}, {sql_value(year, True)}, {language
                 ai_media_elements = sql_value(row.get('ai_media_element'))
                 ai_references = sql_value(row.get('ai_reference'))
 
-                sqlfile.write(f"""INSERT OR IGNORE INTO modifications (film_id, cut_no, description, ai_description, deleted_secs, replaced_secs, inserted_secs, ai_action_types, ai_content_types, ai_media_elements, ai_references)
-VALUES ({film_id}, {cut_no}, {description}, {ai_desc}, {deleted_secs}, {replaced_secs}, {inserted_secs}, {ai_action_types}, {ai_content_types}, {ai_media_elements}, {ai_references});
+                # Each distinct text is written once per film group, where dubbed
+                # versions repeat it; OR IGNORE dedupes it across groups
+                text_bytes = sum(len((row.get(column) or '').encode('utf-8'))
+                                 for column in ('description', 'ai_cleaned_description'))
+                text_stats['cuts'] += 1
+                text_stats['text_bytes'] += text_bytes
+                if text_hash not in text_stats['hashes']:
+                    text_stats['hashes'].add(text_hash)
+                    text_stats['stored_bytes'] += text_bytes
+                if text_hash not in group_text_hashes:
+                    group_text_hashes.add(text_hash)
+                    text_stats['written_bytes'] += text_bytes
+                    statements.append(f"""INSERT OR IGNORE INTO {cut_texts_table} (hash, description, ai_description)
+VALUES ({sql_value(text_hash)}, {sql_value(row.get('description'))}, {sql_value(row.get('ai_cleaned_description'))});
 """)
 
-            rows_written += 1
+                statements.append(f"""INSERT OR IGNORE INTO {modifications_table} (film_id, cut_no, text_hash, deleted_secs, replaced_secs, inserted_secs, ai_action_types, ai_content_types, ai_media_elements, ai_references)
+VALUES ({film_id}, {cut_no}, {sql_value(text_hash)}, {deleted_secs}, {replaced_secs}, {inserted_secs}, {ai_action_types}, {ai_content_types}, {ai_media_elements}, {ai_references});
+""")
 
-    sqlfile.close()
+        # Summaries are written with the group, whose rows hold all of each film's cuts
+        for film_id, summary in summarize_film_rows(film_rows).items():
+            statements.append(f"""INSERT OR REPLACE INTO {summary_table} (film_id, modification_count, deleted_secs, replaced_secs, inserted_secs, ai_action_types, ai_content_types)
+VALUES ({sql_value(film_id)}, {summary['modification_count']}, {summary['deleted_secs']}, {summary['replaced_secs']}, {summary['inserted_secs']}, {sql_value('|'.join(sorted(summary['ai_action_types'])))}, {sql_value('|'.join(sorted(summary['ai_content_types'])))});
+""")
 
-    # Create indexes file
+        # Groups are never split, so a batch always closes between films
+        if sqlfile and batch_is_full(batch_sizer, batch_bytes, statement_count, rows_written):
+            if batch_film_ids:
+                sqlfile.write(generate_normalize_sql(batch_film_ids))
+            sqlfile.close()
+            batch_sizer['pending'][batch_file] = (batch_bytes, statement_count)
+            yield batch_file
+            sqlfile = None
+
+        if not sqlfile:
+            current_batch += 1
+            batch_file = os.path.join(output_dir, f"tmp_import_batch_{current_batch}.sql")
+            sqlfile = open(batch_file, 'w', encoding='utf-8')
+            batch_bytes = statement_count = rows_written = 0
+            batch_film_ids = []
+
+        for statement in statements:
+            sqlfile.write(statement)
+            batch_bytes += len(statement.encode('utf-8'))
+        statement_count += len(statements)
+        rows_written += len(film_rows)
+        if upsert:
+            batch_film_ids += group_film_ids
+
+    if sqlfile:
+        if batch_film_ids:
+            sqlfile.write(generate_normalize_sql(batch_film_ids))
+        sqlfile.close()
+        batch_sizer['pending'][batch_file] = (batch_bytes, statement_count)
+        yield batch_file
+
+    if text_stats['cuts']:
+        print(f"Cut text: {len(text_stats['hashes'])} distinct texts for {text_stats['cuts']} cuts; "
+              f"{text_stats['stored_bytes'] / 1e6:.1f} MB stored and {text_stats['written_bytes'] / 1e6:.1f} MB written "
+              f"instead of {text_stats['text_bytes'] / 1e6:.1f} MB")
+
+    if staging:
+        # Indexes are built once on the loaded tables as part of the swap
+        yield swap_file
+        yield generate_search_rebuild_sql(output_dir)
+        return
+
+    # Create indexes file. Replaced and deleted cuts leave their text behind, so
+    # cut_texts rows no longer referenced are removed first
     index_file = os.path.join(output_dir, "tmp_import_final_indexes.sql")
     with open(index_file, 'w', encoding='utf-8') as f:
+        f.write(CUT_TEXTS_CLEANUP_SQL)
         f.write("""CREATE INDEX IF NOT EXISTS idx_films_slug ON films(slug);
 CREATE INDEX IF NOT EXISTS idx_films_year ON films(year);
 CREATE INDEX IF NOT EXISTS idx_modifications_film_id ON modifications(film_id);
 ANALYZE;
 """)
-    batch_files.append(index_file)
+    yield index_file
+    yield generate_search_rebuild_sql(output_dir)
 
-    return batch_files
+def generate_sql_batches(csv_path, output_dir, batch_size=DEFAULT_BATCH_SIZE, staging=False,
+                         slug_registry=None, batch_sizer=None):
+    """Generate SQL batch files from CSV data."""
+    groups, _ = load_and_group_films(csv_path)
+    if not groups:
+        print(f"No film data found in {csv_path}")
+        return []
 
-def generate_analysis_sql(analysis_csv_path, output_dir):
-    """Generate SQL for analysis results from the analysis CSV."""
+    batch_sizer = batch_sizer or new_batch_sizer(max_rows=batch_size)
+    return list(iter_sql_batches(groups, output_dir, staging, slug_registry, batch_sizer))
+
+def analysis_row_values(row):
+    """Return the SQL values of a stratified analysis row, in the strata table column order."""
+    return [
+        sql_value(row['id']),
+        sql_value(row['language']),
+        sql_value(row['model_type']),
+        sql_value(row['score_value_violence_modifications'], True),
+        sql_value(row['median_score_violence_modifications'], True),
+        sql_value(row['score_value_sensitive_content_modifications'], True),
+        sql_value(row['median_score_sensitive_content_modifications'], True),
+        sql_value(row['score_value_political_religious_modifications'], True),
+        sql_value(row['median_score_political_religious_modifications'], True),
+        sql_value(row['score_value_disclaimers_added'], True),
+        sql_value(row['median_score_disclaimers_added'], True)
+    ]
+
+ANALYSIS_SQL_COLUMNS = ("film_id, language, model_type, violence_modifications, violence_peer_median, "
+                        "sensitive_content_modifications, sensitive_content_peer_median, political_religious_modifications, "
+                        "political_religious_peer_median, disclaimers_added, disclaimers_peer_median")
+
+def peer_group_values(row):
+    """Return the SQL values of a row's peer group key (genre, rating, grouped language)."""
+    import pandas as pd
+
+    return [sql_value(row[column] if pd.notna(row[column]) else None)
+            for column in ['primary_genre', 'rating', 'language_grouped']]
+
+def generate_analysis_sql(analysis_csv_path, output_dir, staging=False):
+    """Generate SQL for analysis results from the analysis CSV: raw counts and the peer group key."""
     if not os.path.exists(analysis_csv_path):
         print(f"Analysis CSV not found: {analysis_csv_path}")
         return None
-    
+
+    import pandas as pd
+    from film_analysis import MODIFICATION_TYPES
+
     df = pd.read_csv(analysis_csv_path)
     analysis_file = os.path.join(output_dir, "tmp_analysis_import.sql")
     
     with open(analysis_file, 'w', encoding='utf-8') as f:
         for _, row in df.iterrows():
-            film_id = sql_value(row['id'])
-            language = sql_value(row['language'])
-            model_type = sql_value(row['model_type'])
-            violence_mods = sql_value(row['score_value_violence_modifications'], True)
-            violence_median = sql_value(row['median_score_violence_modifications'], True)
-            sensitive_mods = sql_value(row['score_value_sensitive_content_modifications'], True)
-            sensitive_median = sql_value(row['median_score_sensitive_content_modifications'], True)
-            pol_rel_mods = sql_value(row['score_value_political_religious_modifications'], True)
-            pol_rel_median = sql_value(row['median_score_political_religious_modifications'], True)
-            disclaimers = sql_value(row['score_value_disclaimers_added'], True)
-            disclaimers_median = sql_value(row['median_score_disclaimers_added'], True)
-            
-            f.write(f"""INSERT OR REPLACE INTO analysis_results (film_id, language, model_type, violence_modifications, violence_peer_median, sensitive_content_modifications, sensitive_content_peer_median, political_religious_modifications, political_religious_peer_median, disclaimers_added, disclaimers_peer_median)
-VALUES ({film_id}, {language}, {model_type}, {violence_mods}, {violence_median}, {sensitive_mods}, {sensitive_median}, {pol_rel_mods}, {pol_rel_median}, {disclaimers}, {disclaimers_median});
+            values = [sql_value(row['id']), sql_value(row['language']), sql_value(row['model_type'])]
+            values += [sql_value(row[f'score_value_{modification_type}'], True) for modification_type in MODIFICATION_TYPES]
+            values += peer_group_values(row)
+            f.write(f"""INSERT OR REPLACE INTO {staged_name('analysis_results', staging)} (film_id, language, model_type, violence_modifications, sensitive_content_modifications, political_religious_modifications, disclaimers_added, peer_genre, peer_rating, peer_language)
+VALUES ({', '.join(values)});
 """)
     
     return analysis_file
 
-def import_to_d1(batch_files, db_mode='local', db_name=None):
-    """Import SQL batches to D1 database."""
+def generate_peer_expectations_sql(peer_csv_path, output_dir, staging=False):
+    """Generate SQL for the peer group expectation table from the peer CSV."""
+    if not os.path.exists(peer_csv_path):
+        print(f"Peer expectations CSV not found: {peer_csv_path}")
+        return None
+
+    import pandas as pd
+    from film_analysis import MODIFICATION_TYPES
+
+    df = pd.read_csv(peer_csv_path)
+    peer_file = os.path.join(output_dir, "tmp_analysis_peer_import.sql")
+
+    with open(peer_file, 'w', encoding='utf-8') as f:
+        for _, row in df.iterrows():
+            values = peer_group_values(row) + [sql_value(row['model_type']), sql_value(row['film_count'], True)]
+            values += [sql_value(row[f'expected_{modification_type}'], True) for modification_type in MODIFICATION_TYPES]
+            f.write(f"""INSERT OR REPLACE INTO {staged_name('analysis_peer_expectations', staging)} (peer_genre, peer_rating, peer_language, model_type, film_count, violence_expected, sensitive_content_expected, political_religious_expected, disclaimers_expected)
+VALUES ({', '.join(values)});
+""")
+
+    return peer_file
+
+def generate_strata_sql(strata_csv_path, output_dir, staging=False):
+    """Generate SQL for the stratified analysis results from the strata CSV."""
+    if not os.path.exists(strata_csv_path) or os.path.getsize(strata_csv_path) <= 1:
+        print(f"No stratified analysis results in {strata_csv_path}")
+        return None
+
+    import pandas as pd
+
+    df = pd.read_csv(strata_csv_path, dtype={'stratum': str})
+    strata_file = os.path.join(output_dir, "tmp_analysis_strata_import.sql")
+
+    with open(strata_file, 'w', encoding='utf-8') as f:
+        for _, row in df.iterrows():
+            values = [sql_value(row['stratum_type']), sql_value(row['stratum'])] + analysis_row_values(row)
+            f.write(f"""INSERT OR REPLACE INTO {staged_name('analysis_strata_results', staging)} (stratum_type, stratum, {ANALYSIS_SQL_COLUMNS})
+VALUES ({', '.join(values)});
+""")
+
+    return strata_file
+
+def count_statements(sql_file):
+    """Count the INSERT statements (one row each) in a generated SQL file."""
+    with open(sql_file, encoding='utf-8') as f:
+        return sum(line.startswith('INSERT') for line in f)
+
+def order_import_files(batch_files):
+    """Split generated files into (data files, index file, swap file, search rebuild file), applied in that order."""
+    data_files = [f for f in batch_files
+                  if 'final_indexes' not in f and 'staging_swap' not in f and 'search_rebuild' not in f]
+    index_file = next((f for f in batch_files if 'final_indexes' in f), None)
+    swap_file = next((f for f in batch_files if 'staging_swap' in f), None)
+    search_file = next((f for f in batch_files if 'search_rebuild' in f), None)
+    return data_files, index_file, swap_file, search_file
+
+def import_to_d1(batch_files, db_mode='local', db_name=None, batch_sizer=None, staging=None, metrics=None,
+                 retries=0, apply_schema=True):
+    """
+    Import SQL batches to D1 database. batch_files may be a lazy iterable: data
+    files are imported as they arrive (their latency recorded in batch_sizer),
+    and the index, swap and search rebuild files are applied once it is exhausted.
+    Pass staging when batch_files is lazy, as the schema step depends on it.
+    A failed batch is retried up to retries times; each batch is recorded in metrics.
+    Incremental imports into existing tables pass apply_schema=False, as the
+    002 migration drops the analysis tables, or a tuple of schema file prefixes
+    (e.g. ('000-',)) to apply only those files.
+    """
     if not db_name:
         # Read database name from wrangler.toml
         wrangler_toml = Path.cwd() / "wrangler.toml"
@@ -183,10 +543,32 @@ def import_to_d1(batch_files, db_mode='local', db_name=None):
     wrangler_flag = "--local" if db_mode == "local" else "--remote"
     print(f"Importing to {db_mode} database: {db_name}")
 
-    # Apply schemas if they exist
-    schema_files = sorted(Path.cwd().glob("scripts/db/*.sql"))
+    if staging is None:
+        batch_files = list(batch_files)
+        staging = any('staging_swap' in f for f in batch_files)
+
+    # Apply schemas if they exist. A staging import creates analysis_results
+    # itself, so the dropping 002 migration is skipped to keep the live table readable.
+    if isinstance(apply_schema, tuple):
+        prefixes = apply_schema
+    else:
+        prefixes = ('000-', '003-') if staging else ('000-', '002-', '003-')
+    schema_files = sorted(Path.cwd().glob("scripts/db/*.sql")) if apply_schema else []
+    # CREATE TABLE IF NOT EXISTS keeps an existing modifications table as it is,
+    # so one from before cut_texts is migrated first
+    legacy_columns = schema_files and '000-' in prefixes and \
+        'description' in (d1_table_columns('modifications', db_name, wrangler_flag) or ())
+    if legacy_columns:
+        print(f"Applying {CUT_TEXTS_MIGRATION.name}...")
+        success, _, stderr = run_command([
+            'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
+            f'--file={Path.cwd() / CUT_TEXTS_MIGRATION}', '-y'
+        ], timeout=300)
+        if not success:
+            print(f"Migration failed for {CUT_TEXTS_MIGRATION.name}: {stderr}")
+            return False
     for schema_file in schema_files:
-        if schema_file.name.startswith('000-') or schema_file.name.startswith('002-'):
+        if schema_file.name.startswith(prefixes):
             print(f"Applying {schema_file.name}...")
             success, _, stderr = run_command([
                 'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
@@ -196,22 +578,42 @@ def import_to_d1(batch_files, db_mode='local', db_name=None):
                 print(f"Schema application failed for {schema_file.name}: {stderr}")
 
     # Import batches
-    data_files = [f for f in batch_files if 'final_indexes' not in f]
-    index_file = next((f for f in batch_files if 'final_indexes' in f), None)
-
-    for i, batch_file in enumerate(data_files, 1):
-        print(f"Importing batch {i}/{len(data_files)}: {os.path.basename(batch_file)}")
-
-        success, _, stderr = run_command([
-            'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
-            f'--file={batch_file}', '-y'
-        ], timeout=300)
+    failed_batches = 0
+    deferred_files = []
+    i = 0
+    for batch_file in batch_files:
+        if any(kind in batch_file for kind in ('final_indexes', 'staging_swap', 'search_rebuild')):
+            deferred_files.append(batch_file)
+            continue
+        i += 1
+        batch_bytes = os.path.getsize(batch_file)
+        print(f"Importing batch {i}: {os.path.basename(batch_file)} ({batch_bytes / 1e6:.2f} MB)")
+
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            if attempt:
+                print(f"Retrying batch {i} (attempt {attempt + 1}/{retries + 1})...")
+            attempt_start = time.perf_counter()
+            success, _, stderr = run_command([
+                'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
+                f'--file={batch_file}', '-y'
+            ], timeout=300)
+            if success:
+                break
+        if batch_sizer and batch_file in batch_sizer['pending']:
+            record_batch(batch_sizer, batch_file, time.perf_counter() - attempt_start, success and not attempt)
+        if metrics:
+            record_batch_metrics(metrics, count_statements(batch_file), batch_bytes,
+                                 time.perf_counter() - start, success, attempt)
 
         if not success:
             print(f"Batch {i} failed: {stderr}")
+            failed_batches += 1
         else:
             os.remove(batch_file)  # Clean up successful imports
 
+    _, index_file, swap_file, search_file = order_import_files(deferred_files)
+
     # Apply indexes
     if index_file:
         print("Creating indexes...")
@@ -224,6 +626,36 @@ def import_to_d1(batch_files, db_mode='local', db_name=None):
         else:
             print(f"Index creation failed: {stderr}")
 
+    # Build indexes on the staging tables and swap them in as one execution,
+    # leaving the live tables untouched if any part of the load failed
+    if swap_file:
+        if failed_batches:
+            print(f"Skipping staging swap: {failed_batches} batch(es) failed, live tables left unchanged")
+            return False
+
+        print("Building indexes and swapping staging tables...")
+        success, _, stderr = run_command([
+            'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
+            f'--file={swap_file}', '-y'
+        ], timeout=300)
+        if success:
+            os.remove(swap_file)
+        else:
+            print(f"Staging swap failed: {stderr}")
+            return False
+
+    # Re-index the cut descriptions once the final tables are in place
+    if search_file:
+        print("Rebuilding full-text search index...")
+        success, _, stderr = run_command([
+            'npx', 'wrangler', 'd1', 'execute', db_name, wrangler_flag,
+            f'--file={search_file}', '-y'
+        ], timeout=300)
+        if success:
+            os.remove(search_file)
+        else:
+            print(f"Search index rebuild failed: {stderr}")
+
     # Verify import
     print("Verifying import...")
     success, stdout, _ = run_command([
@@ -239,10 +671,9 @@ def fetch_remote_data(output_path="src/lib/data/data.csv"):
     """Fetch latest data from remote source."""
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    url = "https://github.com/diagram-chasing/censor-board-cuts/raw/refs/heads/master/data/data.csv"
-    print(f"Downloading data from {url}")
+    print(f"Downloading data from {DATA_URL}")
 
-    success, _, stderr = run_command(['curl', '-L', url, '-o', output_path])
+    success, _, stderr = run_command(['curl', '-L', DATA_URL, '-o', output_path])
     if success and os.path.exists(output_path):
         print(f"Data downloaded to {output_path}")
         return output_path
@@ -256,11 +687,28 @@ def main():
 
     parser = argparse.ArgumentParser(description="Import CBFC film data to D1 database")
     parser.add_argument('csv_file', nargs='?', help='CSV file path (or fetch from remote)')
-    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Batch size')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Maximum film rows per batch')
+    parser.add_argument('--batch-bytes', type=int, default=DEFAULT_BATCH_BYTES, help='Initial batch size target in bytes')
+    parser.add_argument('--min-batch-bytes', type=int, default=MIN_BATCH_BYTES, help='Lower bound for the batch size target')
+    parser.add_argument('--max-batch-bytes', type=int, default=MAX_BATCH_BYTES, help='Upper bound for the batch size target')
+    parser.add_argument('--max-batch-statements', type=int, default=MAX_BATCH_STATEMENTS, help='Maximum statements per batch')
+    parser.add_argument('--target-batch-seconds', type=float, default=TARGET_BATCH_SECONDS,
+                        help='Import latency per batch the size target is tuned towards')
+    parser.add_argument('--retries', type=int, default=0, help='Retries for a failed batch')
+    parser.add_argument('--metrics-dir', help='Write d1_import.prom and d1_import.json run metrics to this directory')
     parser.add_argument('--db-mode', choices=['local', 'remote'], default='local', help='Database mode')
     parser.add_argument('--fetch', action='store_true', help='Fetch data from remote source')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+    parser.add_argument('--analysis-engine', choices=['mle', 'glm'], default='mle',
+                        help='Peer-comparison model fitting engine')
+    parser.add_argument('--stratify-by',
+                        help="Comma-separated stratification families to also fit, e.g. 'year,certifier,year+certifier'")
+    parser.add_argument('--workers', type=int, help='Worker processes for the stratified fits')
+    parser.add_argument('--staging', action='store_true',
+                        help='Load into index-free staging tables and swap them in after the load')
 
     args = parser.parse_args()
+    metrics = new_run_metrics('d1_import')
 
     # Handle data source
     if args.fetch or not args.csv_file:
@@ -273,26 +721,46 @@ def main():
             print(f"CSV file not found: {csv_path}")
             sys.exit(1)
 
-    # Generate SQL batches
-    with tempfile.TemporaryDirectory() as temp_dir:
-        print(f"Processing {csv_path} (batch size: {args.batch_size})")
-        batch_files = generate_sql_batches(csv_path, temp_dir, args.batch_size)
+    groups, _ = load_and_group_films(csv_path)
+    if not groups:
+        print(f"No film data found in {csv_path}")
+        sys.exit(1)
 
-        if not batch_files:
-            print("No SQL batches generated")
-            sys.exit(1)
+    batch_sizer = new_batch_sizer(args.batch_bytes, args.min_batch_bytes, args.max_batch_bytes,
+                                  args.max_batch_statements, args.batch_size, args.target_batch_seconds)
 
+    # The analysis stack (pandas, NumPy, statsmodels) is only loaded once there is data to analyse
+    from film_analysis import run_analysis
+
+    with tempfile.TemporaryDirectory() as temp_dir:
         # Run analysis and generate analysis SQL
         print("Running statistical analysis...")
         analysis_csv = os.path.join(temp_dir, "analysis_results.csv")
-        run_analysis(csv_path, analysis_csv)
+        strata_csv = os.path.join(temp_dir, "analysis_strata_results.csv")
+        peer_csv = os.path.join(temp_dir, "analysis_peer_expectations.csv")
+        stratum_types = args.stratify_by.split(',') if args.stratify_by else None
+        run_analysis(csv_path, analysis_csv, engine=args.analysis_engine, stratum_types=stratum_types,
+                     strata_output_path=strata_csv, max_workers=args.workers, peer_output_path=peer_csv)
         
-        analysis_sql = generate_analysis_sql(analysis_csv, temp_dir)
-        if analysis_sql:
-            batch_files.append(analysis_sql)
+        analysis_files = [generate_analysis_sql(analysis_csv, temp_dir, staging=args.staging),
+                          generate_peer_expectations_sql(peer_csv, temp_dir, staging=args.staging)]
+        if stratum_types:
+            analysis_files.append(generate_strata_sql(strata_csv, temp_dir, staging=args.staging))
+
+        # Generate SQL batches while importing, so each batch is sized from the latency of the last
+        print(f"Processing {csv_path} (initial batch target: {args.batch_bytes / 1e6:.1f} MB)")
+        batch_files = itertools.chain(
+            iter_sql_batches(groups, temp_dir, args.staging, args.slug_registry, batch_sizer),
+            [f for f in analysis_files if f]
+        )
 
         # Import to database
-        success = import_to_d1(batch_files, args.db_mode)
+        success = import_to_d1(batch_files, args.db_mode, batch_sizer=batch_sizer, staging=args.staging,
+                               metrics=metrics, retries=args.retries)
+        print_batch_stats(batch_sizer)
+        finish_run(metrics, success)
+        if args.metrics_dir:
+            write_run_metrics(metrics, args.metrics_dir)
         if not success:
             sys.exit(1)
 
@@ -35,12 +35,36 @@ CREATE TABLE IF NOT EXISTS film_views (
   FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
 );
 
+-- Rollups of film_views, compacted by scripts/views_rollup.py
+CREATE TABLE IF NOT EXISTS film_views_monthly (
+  film_id TEXT NOT NULL,
+  view_month TEXT NOT NULL,  -- Stored as YYYY-MM
+  view_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (film_id, view_month),
+  FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS film_views_yearly (
+  film_id TEXT NOT NULL,
+  view_year TEXT NOT NULL,  -- Stored as YYYY
+  view_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (film_id, view_year),
+  FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
+);
+
+-- Distinct cut text, stored once and referenced by hash from modifications.
+-- Dubbed versions of a film usually carry the same cuts, so most repeat.
+CREATE TABLE IF NOT EXISTS cut_texts (
+  hash TEXT PRIMARY KEY,
+  description TEXT,
+  ai_description TEXT
+);
+
 CREATE TABLE IF NOT EXISTS modifications (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   film_id TEXT NOT NULL,
   cut_no INTEGER,
-  description TEXT,
-  ai_description TEXT,
+  text_hash TEXT,
   deleted_secs REAL DEFAULT 0,
   replaced_secs REAL DEFAULT 0,
   inserted_secs REAL DEFAULT 0,
@@ -48,9 +72,36 @@ CREATE TABLE IF NOT EXISTS modifications (
   ai_content_types TEXT,
   ai_media_elements TEXT,
   ai_references TEXT,
+  FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE,
+  FOREIGN KEY (text_hash) REFERENCES cut_texts(hash)
+);
+
+-- Per-film censorship summary, computed by data_import.py from each film's cuts
+CREATE TABLE IF NOT EXISTS film_summary (
+  film_id TEXT PRIMARY KEY,
+  modification_count INTEGER NOT NULL DEFAULT 0,
+  deleted_secs REAL DEFAULT 0,
+  replaced_secs REAL DEFAULT 0,
+  inserted_secs REAL DEFAULT 0,
+  ai_action_types TEXT,  -- Distinct values, '|'-separated
+  ai_content_types TEXT,  -- Distinct values, '|'-separated
   FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
 );
 
+-- Nearest films by censorship profile, computed by similar_films.py. The
+-- neighbour's display fields are stored with it so a film page reads its
+-- recommendations with one primary-key range scan
+CREATE TABLE IF NOT EXISTS film_similar (
+  slug TEXT NOT NULL,
+  rank INTEGER NOT NULL,
+  similar_slug TEXT NOT NULL,
+  similar_name TEXT,
+  similar_year INTEGER,
+  similar_poster_url TEXT,
+  score REAL NOT NULL,
+  PRIMARY KEY (slug, rank)
+);
+
 -- Simplified Film-Category Mapping
 CREATE TABLE IF NOT EXISTS film_categories (
   film_id TEXT NOT NULL,
@@ -117,8 +168,8 @@ SELECT
   f.imdb_studios,
   json_group_array(json_object(
     'id', m.id,
-    'description', m.description,
-    'ai_description', m.ai_description,
+    'description', t.description,
+    'ai_description', t.ai_description,
     'cut_no', m.cut_no,
     'deleted_secs', m.deleted_secs,
     'replaced_secs', m.replaced_secs, 
@@ -132,6 +183,8 @@ FROM
   films f
 LEFT JOIN
   modifications m ON f.id = m.film_id
+LEFT JOIN
+  cut_texts t ON t.hash = m.text_hash
 GROUP BY
   f.id;
 
@@ -146,12 +199,12 @@ SELECT
   f.poster_url, 
   f.imdb_rating,
   f.rating,
-  (SELECT COUNT(*) 
-  FROM modifications WHERE film_id = f.id) AS modification_count,
+  COALESCE(s.modification_count, 0) AS modification_count,
   f.imdb_directors,
   f.imdb_actors,
   f.imdb_genres,
   f.imdb_studios,
   f.imdb_countries,
   f.imdb_languages
-FROM films f;
\ No newline at end of file
+FROM films f
+LEFT JOIN film_summary s ON s.film_id = f.id;
\ No newline at end of file
@@ -1,19 +1,21 @@
 -- Analysis results table for statistical peer comparisons
 -- Drop existing table if it exists to migrate to new schema
 DROP TABLE IF EXISTS analysis_results;
+DROP TABLE IF EXISTS analysis_strata_results;
+DROP TABLE IF EXISTS analysis_peer_expectations;
 
 CREATE TABLE analysis_results (
   film_id TEXT NOT NULL,
   language TEXT NOT NULL,
   model_type TEXT NOT NULL,
   violence_modifications INTEGER DEFAULT 0,
-  violence_peer_median REAL DEFAULT 0,
   sensitive_content_modifications INTEGER DEFAULT 0,
-  sensitive_content_peer_median REAL DEFAULT 0,
   political_religious_modifications INTEGER DEFAULT 0,
-  political_religious_peer_median REAL DEFAULT 0,
   disclaimers_added INTEGER DEFAULT 0,
-  disclaimers_peer_median REAL DEFAULT 0,
+  -- Peer group key into analysis_peer_expectations
+  peer_genre TEXT,
+  peer_rating TEXT,
+  peer_language TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (film_id, language),
   FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
@@ -24,4 +26,44 @@ CREATE INDEX IF NOT EXISTS idx_analysis_violence_score ON analysis_results(viole
 CREATE INDEX IF NOT EXISTS idx_analysis_sensitive_score ON analysis_results(sensitive_content_modifications DESC);
 CREATE INDEX IF NOT EXISTS idx_analysis_model_type ON analysis_results(model_type);
 CREATE INDEX IF NOT EXISTS idx_analysis_language ON analysis_results(language);
-CREATE INDEX IF NOT EXISTS idx_analysis_film_language ON analysis_results(film_id, language);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_analysis_film_language ON analysis_results(film_id, language);
+
+-- Expected counts per peer group (primary genre, rating, grouped language).
+-- Both the model and the median fallback depend only on this key, so any film,
+-- including one imported since the last analysis, is compared by one lookup.
+CREATE TABLE analysis_peer_expectations (
+  peer_genre TEXT NOT NULL,
+  peer_rating TEXT NOT NULL,
+  peer_language TEXT NOT NULL,
+  model_type TEXT NOT NULL,
+  film_count INTEGER DEFAULT 0,
+  violence_expected REAL,
+  sensitive_content_expected REAL,
+  political_religious_expected REAL,
+  disclaimers_expected REAL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (peer_genre, peer_rating, peer_language)
+);
+
+-- Peer comparisons fitted separately within a stratum, e.g. stratum_type 'year'
+-- with stratum '2019', or 'year+certifier' with stratum '2019|Mumbai'
+CREATE TABLE analysis_strata_results (
+  stratum_type TEXT NOT NULL,
+  stratum TEXT NOT NULL,
+  film_id TEXT NOT NULL,
+  language TEXT NOT NULL,
+  model_type TEXT NOT NULL,
+  violence_modifications INTEGER DEFAULT 0,
+  violence_peer_median REAL DEFAULT 0,
+  sensitive_content_modifications INTEGER DEFAULT 0,
+  sensitive_content_peer_median REAL DEFAULT 0,
+  political_religious_modifications INTEGER DEFAULT 0,
+  political_religious_peer_median REAL DEFAULT 0,
+  disclaimers_added INTEGER DEFAULT 0,
+  disclaimers_peer_median REAL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (stratum_type, stratum, film_id, language),
+  FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_strata_film_language ON analysis_strata_results(film_id, language);
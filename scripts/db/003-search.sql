@@ -0,0 +1,23 @@
+-- Full-text index over cut descriptions and film names, for keyword queries
+-- answered from D1 when Typesense is unavailable. The index is external-content:
+-- it stores only the token index and reads text back from v_modification_search,
+-- so it is rebuilt by data_import.py after every load.
+
+CREATE VIEW IF NOT EXISTS v_modification_search AS
+SELECT
+  m.id,
+  t.description,
+  t.ai_description,
+  f.name AS film_name
+FROM modifications m
+JOIN films f ON f.id = m.film_id
+LEFT JOIN cut_texts t ON t.hash = m.text_hash;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS modifications_fts USING fts5(
+  description,
+  ai_description,
+  film_name,
+  content = 'v_modification_search',
+  content_rowid = 'id',
+  tokenize = 'unicode61 remove_diacritics 2'
+);
@@ -0,0 +1,38 @@
+-- Moves cut text out of modifications into the content-addressed cut_texts
+-- table, for databases created before it existed. data_import.py applies this
+-- before the schema files when modifications still has a description column.
+-- D1 has no sha256, so each distinct legacy text gets a surrogate hash; the
+-- next staging import replaces them with content hashes.
+
+CREATE TABLE IF NOT EXISTS cut_texts (
+  hash TEXT PRIMARY KEY,
+  description TEXT,
+  ai_description TEXT
+);
+
+ALTER TABLE modifications ADD COLUMN text_hash TEXT REFERENCES cut_texts(hash);
+
+CREATE INDEX IF NOT EXISTS tmp_cut_texts_text ON cut_texts(description, ai_description);
+
+INSERT OR IGNORE INTO cut_texts (hash, description, ai_description)
+SELECT 'legacy-' || MIN(id), description, ai_description
+FROM modifications
+WHERE description IS NOT NULL AND description != ''
+GROUP BY description, ai_description;
+
+UPDATE modifications SET text_hash = (
+  SELECT t.hash FROM cut_texts t
+  WHERE t.description = modifications.description AND t.ai_description IS modifications.ai_description
+)
+WHERE description IS NOT NULL AND description != '';
+
+DROP INDEX tmp_cut_texts_text;
+
+-- Views over modifications are recreated at their current definitions by the
+-- 000 and 003 schema files, which are applied right after this
+DROP VIEW IF EXISTS v_film_details;
+DROP VIEW IF EXISTS v_browse_films;
+DROP VIEW IF EXISTS v_modification_search;
+
+ALTER TABLE modifications DROP COLUMN description;
+ALTER TABLE modifications DROP COLUMN ai_description;
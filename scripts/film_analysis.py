@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
+import os
 import sys
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from film_utils import extract_year
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stream=sys.stdout)
 
@@ -11,10 +12,78 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stre
 MODIFICATION_TYPES = ["violence_modifications", "sensitive_content_modifications",
                       "political_religious_modifications", "disclaimers_added"]
 
+# Fitting engines for the peer-comparison model, and the model_type each records
+MODEL_ENGINES = {'mle': 'NegativeBinomial', 'glm': 'NegativeBinomial_GLM'}
+
+# The peer group a film version is compared within. The model's covariates and
+# the median fallback's grouping are both exactly these columns, so every film
+# version in a peer group has the same expected counts.
+PEER_GROUP_FEATURES = ['primary_genre', 'rating', 'language_grouped']
+
 # When a film has multiple genres, we use this list to pick the most representative one.
 GENRE_PRIORITY = ["Horror", "Thriller", "Sci-Fi", "Action", "Crime", "Mystery",
                   "War", "Western", "Adventure", "Fantasy", "Comedy"]
 
+# Only the raw CSV columns create_movie_features reads; the descriptions and
+# IMDb overview/credits text are never loaded.
+ANALYSIS_COLUMNS = ['id', 'language', 'rating', 'imdb_genres', 'ai_action', 'ai_content_types', 'ai_media_element']
+CATEGORICAL_COLUMNS = ['language', 'rating', 'imdb_genres', 'ai_action', 'ai_media_element', 'certifier']
+
+# Pipe-delimited tag columns, parsed once per load into a sparse boolean tag matrix.
+TAG_COLUMNS = ['ai_action', 'ai_content_types', 'ai_media_element']
+
+# A "suppression" is any action that removes or alters content.
+SUPPRESSION_ACTIONS = ["deletion", "audio_modification", "visual_modification",
+                       "text_modification", "content_overlay", "replacement"]
+
+# The tags behind each modification type. A cut counts when, for every tag
+# column of the rule, it has at least one of the listed tags.
+MODIFICATION_RULES = {
+    'violence_modifications': {'ai_action': SUPPRESSION_ACTIONS, 'ai_content_types': ['violence']},
+    'sensitive_content_modifications': {'ai_action': SUPPRESSION_ACTIONS,
+                                        'ai_content_types': ['sexual_explicit', 'sexual_suggestive', 'profanity']},
+    'political_religious_modifications': {'ai_action': SUPPRESSION_ACTIONS,
+                                          'ai_content_types': ['political', 'religious', 'identity_reference']},
+    'disclaimers_added': {'ai_action': ['insertion']}
+}
+
+# Stratification families: the raw columns each needs and the per-film summary
+# column holding its value. Families combine with '+', e.g. 'year+certifier'.
+STRATUM_COLUMNS = {'year': ['cert_date', 'cert_no'], 'certifier': ['certifier']}
+STRATUM_FEATURES = {'year': 'certification_year', 'certifier': 'certifier'}
+
+# Strata with fewer film versions than this are not fitted separately.
+MIN_STRATUM_FILMS = 100
+
+def load_analysis_data(input_path, cache_path=None, extra_columns=()):
+    """
+    Loads the columns needed for the analysis with categorical dtypes, plus any
+    extra_columns (e.g. those a stratification family needs). If a cache path is
+    given, a columnar snapshot (.parquet, or a pickle otherwise) is reused while
+    it is newer than the CSV and has all the needed columns.
+    """
+    columns = ANALYSIS_COLUMNS + [column for column in extra_columns if column not in ANALYSIS_COLUMNS]
+    if cache_path and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(input_path):
+        cached_df = pd.read_parquet(cache_path) if cache_path.endswith('.parquet') else pd.read_pickle(cache_path)
+        if set(columns) <= set(cached_df.columns):
+            logging.info(f"Loaded cached analysis snapshot from {cache_path}")
+            return cached_df[columns]
+
+    dtypes = {column: 'category' for column in CATEGORICAL_COLUMNS}
+    dtypes.update({'id': str, 'ai_content_types': str, 'cert_date': str, 'cert_no': str})
+    raw_df = pd.read_csv(input_path, usecols=columns, dtype=dtypes)
+
+    if cache_path:
+        try:
+            if cache_path.endswith('.parquet'):
+                raw_df.to_parquet(cache_path, index=False)
+            else:
+                raw_df.to_pickle(cache_path)
+            logging.info(f"Saved analysis snapshot to {cache_path}")
+        except ImportError as e:
+            logging.warning(f"Could not write analysis snapshot ({e}). Use a non-.parquet path to cache with pickle.")
+    return raw_df
+
 def extract_primary_genre(genres_str):
     """
     Determines a film's primary genre. It prioritizes genres from the GENRE_PRIORITY
@@ -36,6 +105,47 @@ def group_rare_categories(series, min_count=15, new_name='Other'):
         return series.replace(infrequent_categories, new_name)
     return series
 
+def build_tag_matrix(raw_df, columns=TAG_COLUMNS):
+    """
+    Parses the pipe-delimited tag columns into a sparse boolean matrix with one
+    row per cut and one column per (tag column, tag). Each distinct cell value is
+    split once, however many cuts share it. Returns (matrix, {(column, tag): index}).
+    """
+    import scipy.sparse as sp
+
+    vocabulary = {}
+    row_indices = []
+    col_indices = []
+
+    for column in columns:
+        if column not in raw_df.columns:
+            continue
+        codes, values = pd.factorize(raw_df[column])
+        value_tags = [[vocabulary.setdefault((column, tag.strip()), len(vocabulary))
+                       for tag in dict.fromkeys(str(value).split('|')) if tag.strip()] for value in values]
+
+        # One row of tag indices per distinct value, padded with -1; the extra
+        # last row is all padding and is what a missing value's code (-1) picks
+        padded = np.full((len(values) + 1, max(map(len, value_tags), default=0)), -1)
+        for code, tags in enumerate(value_tags):
+            padded[code, :len(tags)] = tags
+        rows, positions = np.nonzero(padded[codes] >= 0)
+        row_indices.append(rows)
+        col_indices.append(padded[codes[rows], positions])
+
+    rows = np.concatenate(row_indices) if row_indices else np.zeros(0, dtype=int)
+    cols = np.concatenate(col_indices) if col_indices else np.zeros(0, dtype=int)
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(len(raw_df), len(vocabulary)))
+    return matrix, vocabulary
+
+def match_tag_rule(tag_matrix, vocabulary, rule):
+    """Return a boolean array of the cuts that have one of the listed tags in every column of the rule."""
+    matches = np.ones(tag_matrix.shape[0], dtype=bool)
+    for column, tags in rule.items():
+        indices = [vocabulary[(column, tag)] for tag in tags if (column, tag) in vocabulary]
+        matches &= tag_matrix[:, indices].getnnz(axis=1) > 0
+    return matches
+
 def create_movie_features(raw_df):
     """
     Cleans and transforms the raw data, aggregating it into a single summary
@@ -44,27 +154,32 @@ def create_movie_features(raw_df):
     logging.info("Preparing and cleaning movie data...")
     raw_df['id'] = raw_df['id'].astype(str)
 
-    # A "suppression" is any action that removes or alters content.
-    is_suppression = raw_df['ai_action'].isin(["deletion", "audio_modification", "visual_modification",
-                                              "text_modification", "content_overlay", "replacement"])
-    content_type = raw_df['ai_content_types'].str
-
     # Tally up the different kinds of modifications for each row.
-    raw_df['is_violence'] = is_suppression & content_type.contains('violence', na=False)
-    raw_df['is_sensitive'] = is_suppression & content_type.contains('sexual_explicit|sexual_suggestive|profanity', na=False)
-    raw_df['is_pol_rel'] = is_suppression & content_type.contains('political|religious|identity_reference', na=False)
-    raw_df['is_disclaimer'] = raw_df['ai_action'] == 'insertion'
+    tag_matrix, vocabulary = build_tag_matrix(raw_df)
+    for modification_type, rule in MODIFICATION_RULES.items():
+        raw_df[f'is_{modification_type}'] = match_tag_rule(tag_matrix, vocabulary, rule)
     raw_df['rating_clean'] = raw_df['rating'].str.extract(r'(U|A|UA|S)', expand=False)
 
+    # Certification details are carried through when loaded, for stratified fits.
+    carried = {column: (column, 'first') for column in ['cert_date', 'cert_no', 'certifier'] if column in raw_df.columns}
+
     # Group all modifications by film version (ID + language) to get total counts.
-    film_summaries_df = raw_df.groupby(['id', 'language'], as_index=False).agg(
+    film_summaries_df = raw_df.groupby(['id', 'language'], as_index=False, observed=True).agg(
         rating=('rating_clean', 'first'),
         imdb_genres=('imdb_genres', 'first'),
-        violence_modifications=('is_violence', 'sum'),
-        sensitive_content_modifications=('is_sensitive', 'sum'),
-        political_religious_modifications=('is_pol_rel', 'sum'),
-        disclaimers_added=('is_disclaimer', 'sum')
+        **{modification_type: (f'is_{modification_type}', 'sum') for modification_type in MODIFICATION_TYPES},
+        **carried
     )
+    # Categorical columns from the loader go back to plain values before rare categories are regrouped
+    film_summaries_df['language'] = film_summaries_df['language'].astype(str)
+    film_summaries_df['imdb_genres'] = film_summaries_df['imdb_genres'].astype(object)
+    if 'certifier' in film_summaries_df.columns:
+        film_summaries_df['certifier'] = film_summaries_df['certifier'].astype(object)
+    if 'cert_date' in film_summaries_df.columns:
+        film_summaries_df['certification_year'] = [
+            extract_year(cert_date if isinstance(cert_date, str) else None, cert_no if isinstance(cert_no, str) else None)
+            for cert_date, cert_no in zip(film_summaries_df['cert_date'], film_summaries_df['cert_no'])
+        ]
 
     film_summaries_df['primary_genre'] = film_summaries_df['imdb_genres'].apply(extract_primary_genre)
     film_summaries_df['primary_genre'] = group_rare_categories(film_summaries_df['primary_genre'], min_count=15)
@@ -72,44 +187,120 @@ def create_movie_features(raw_df):
 
     return film_summaries_df.dropna(subset=['rating', 'language_grouped'])
 
-def model_and_analyze(film_summaries_df):
+def build_sparse_design(model_data, factors):
+    """
+    One-hot encodes the factors into a sparse design matrix with an intercept,
+    dropping the first (sorted) level of each factor as the formula interface does.
+    Rows with a missing factor are left out and marked False in the returned mask.
+    """
+    mask = model_data[factors].notna().all(axis=1).to_numpy()
+    n_rows = int(mask.sum())
+    row_indices = [np.arange(n_rows)]
+    col_indices = [np.zeros(n_rows, dtype=int)]
+    n_cols = 1
+
+    for factor in factors:
+        values = model_data.loc[mask, factor].astype(str)
+        codes = pd.Categorical(values, categories=sorted(values.unique())).codes
+        non_base = codes > 0
+        row_indices.append(np.flatnonzero(non_base))
+        col_indices.append(n_cols + codes[non_base] - 1)
+        n_cols += len(np.unique(codes)) - 1
+
+    import scipy.sparse as sp
+
+    rows = np.concatenate(row_indices)
+    design = sp.csr_matrix((np.ones(len(rows)), (rows, np.concatenate(col_indices))), shape=(n_rows, n_cols))
+    return design, mask
+
+def fit_nb2_irls(design, y, max_iter=100, tol=1e-6):
+    """
+    Fits a log-link Negative Binomial (NB2, variance mu + alpha * mu^2) GLM by
+    iteratively reweighted least squares, re-estimating alpha from the Pearson
+    residuals after each step. Returns (coefficients, alpha, converged).
+    """
+    import scipy.sparse as sp
+
+    n_rows, n_cols = design.shape
+    beta = np.zeros(n_cols)
+    beta[0] = np.log(max(y.mean(), 1e-3))
+    alpha = 1.0
+
+    for _ in range(max_iter):
+        eta = np.clip(design @ beta, -30, 30)
+        mu = np.exp(eta)
+        weighted = design.T @ sp.diags(mu / (1 + alpha * mu))
+        working_response = eta + (y - mu) / mu
+        new_beta = np.linalg.lstsq((weighted @ design).toarray(), weighted @ working_response, rcond=None)[0]
+
+        mu = np.exp(np.clip(design @ new_beta, -30, 30))
+        new_alpha = max(np.sum(((y - mu) ** 2 - mu) / mu ** 2) / max(n_rows - n_cols, 1), 1e-8)
+
+        converged = np.max(np.abs(new_beta - beta)) < tol and abs(new_alpha - alpha) < tol * max(alpha, 1)
+        beta, alpha = new_beta, new_alpha
+        if converged:
+            return beta, alpha, True
+
+    return beta, alpha, False
+
+def fit_expected_counts(model_data, engine='mle', disp=True):
+    """
+    Fits the peer-comparison model to the 'score_value' column and returns the
+    expected count for every row, or None if the model did not converge.
+    """
+    factors = ['rating', 'language_grouped']
+    # Only include genre in the model if the data is available.
+    if 'primary_genre' in model_data.columns and model_data['primary_genre'].notna().any():
+        factors.append('primary_genre')
+
+    if engine == 'glm':
+        design, mask = build_sparse_design(model_data, factors)
+        y = model_data.loc[mask, 'score_value'].to_numpy(dtype=float)
+        beta, _, converged = fit_nb2_irls(design, y)
+        if not converged:
+            return None
+        expected = pd.Series(np.nan, index=model_data.index)
+        expected[mask] = np.exp(design @ beta)
+        return expected
+
+    # statsmodels is the slowest import of the analysis, and only this engine needs it
+    import statsmodels.formula.api as smf
+
+    formula = 'score_value ~ ' + ' + '.join(f'C({factor})' for factor in factors)
+    neg_binomial_model = smf.negativebinomial(formula, data=model_data).fit(disp=disp, maxiter=200)
+    if neg_binomial_model.mle_retvals['converged']:
+        return neg_binomial_model.predict(model_data)
+    return None
+
+def model_and_analyze(film_summaries_df, engine='mle', disp=True):
     """
     For each modification type, this calculates the expected count for a film
-    compared to similar films. It tries a statistical model (Negative Binomial)
-    but uses a simple median as a fallback if the model fails.
+    compared to similar films. It tries a statistical model (Negative Binomial,
+    fitted by maximum likelihood or, with engine='glm', by IRLS) but uses a
+    simple median as a fallback if the model fails.
     """
     logging.info("Running statistical analysis...")
     all_results = []
 
-    # These features define a group of "similar films" for comparison.
-    comparison_group_features = ['primary_genre', 'rating', 'language_grouped']
-
     for modification_type in MODIFICATION_TYPES:
         model_data = film_summaries_df.copy()
         # Rename the column for the current modification type to a generic name for the model.
         model_data.rename(columns={modification_type: 'score_value'}, inplace=True)
 
-        model = None
-        formula = 'score_value ~ C(rating) + C(language_grouped)'
-        # Only include genre in the model if the data is available.
-        if 'primary_genre' in model_data.columns and model_data['primary_genre'].notna().any():
-            formula += ' + C(primary_genre)'
-
+        expected = None
         try:
-            # Try to fit a Negative Binomial model
-            neg_binomial_model = smf.negativebinomial(formula, data=model_data).fit(disp=True, maxiter=200)
-            if neg_binomial_model.mle_retvals['converged']:
-                model = neg_binomial_model
+            expected = fit_expected_counts(model_data, engine, disp)
+            if expected is not None:
                 logging.info(f"Successfully fitted a statistical model for '{modification_type}'.")
         except Exception:
             logging.warning(f"Could not fit a model for '{modification_type}'. Using a simple median fallback.")
 
-        if model:
-            # If the model worked, predict the expected score.
-            model_data['median_score'] = model.predict(model_data)
-            model_data['model_type'] = 'NegativeBinomial'
+        if expected is not None:
+            # If the model worked, use its expected score.
+            model_data['median_score'] = expected
+            model_data['model_type'] = MODEL_ENGINES[engine]
         else:
-            model_data['median_score'] = model_data.groupby(comparison_group_features)['score_value'].transform('median')
+            model_data['median_score'] = model_data.groupby(PEER_GROUP_FEATURES)['score_value'].transform('median')
             model_data['model_type'] = 'Empirical_Median_Fallback'
 
         model_data['score_type'] = modification_type
@@ -125,17 +316,98 @@ def model_and_analyze(film_summaries_df):
     ).reset_index()
 
     pivot_df.columns = ['_'.join(col).strip('_') for col in pivot_df.columns]
-    return pivot_df
 
-def run_analysis(input_path, output_path):
+    # Each film version's peer group, the key of the peer expectation table
+    peer_groups = film_summaries_df[['id', 'language'] + PEER_GROUP_FEATURES].drop_duplicates(['id', 'language'])
+    return pivot_df.merge(peer_groups, on=['id', 'language'], how='left')
+
+def build_peer_expectations(analysis_results):
+    """
+    Collapses the per-film expected counts into one row per peer group, with the
+    number of film versions it was computed from. Film versions missing part of
+    the peer group key have no expectation and are left out.
+    """
+    expected_columns = {f'median_score_{modification_type}': f'expected_{modification_type}'
+                        for modification_type in MODIFICATION_TYPES}
+    peer_df = analysis_results.dropna(subset=PEER_GROUP_FEATURES)
+    grouped = peer_df.groupby(PEER_GROUP_FEATURES, observed=True)
+
+    expectations = grouped[list(expected_columns)].first().rename(columns=expected_columns)
+    expectations['model_type'] = grouped['model_type'].agg(lambda model_types: '|'.join(sorted(set(model_types))))
+    expectations['film_count'] = peer_df.drop_duplicates(['id', 'language']).groupby(PEER_GROUP_FEATURES, observed=True).size()
+    return expectations.reset_index()
+
+def stratum_labels(film_summaries_df, stratum_type):
+    """
+    Labels each film version with its stratum for a family such as 'year' or
+    'year+certifier'. Film versions missing any of the values get no label.
+    """
+    labels = None
+    for family in stratum_type.split('+'):
+        values = film_summaries_df[STRATUM_FEATURES[family]]
+        values = values.map(lambda v: str(int(v)) if isinstance(v, float) else str(v), na_action='ignore')
+        labels = values if labels is None else labels + '|' + values
+    return labels
+
+def fit_stratum(task):
+    """
+    Fits the peer-comparison models for one stratum. Runs in a worker process,
+    so it takes and returns plain picklable values.
+    """
+    stratum_type, stratum, stratum_df, engine = task
+    results = model_and_analyze(stratum_df, engine, disp=False)
+    results.insert(0, 'stratum', stratum)
+    results.insert(0, 'stratum_type', stratum_type)
+    return results
+
+def quiet_worker():
+    logging.getLogger().setLevel(logging.WARNING)
+
+def run_stratified_analysis(film_summaries_df, stratum_types, engine='mle', max_workers=None,
+                            min_films=MIN_STRATUM_FILMS):
+    """
+    Fits a separate family of models within each stratum (certification year,
+    certifier, or a '+' combination), so films are compared against peers from
+    the same year or office. The independent fits run in a process pool, largest
+    strata first.
+    """
+    tasks = []
+    for stratum_type in stratum_types:
+        labels = stratum_labels(film_summaries_df, stratum_type)
+        sizes = labels.value_counts()
+        skipped = int((sizes < min_films).sum())
+        for stratum in sizes[sizes >= min_films].index:
+            tasks.append((stratum_type, stratum, film_summaries_df[labels == stratum], engine))
+        logging.info(f"'{stratum_type}': {len(sizes) - skipped} strata to fit, {skipped} below {min_films} film versions skipped.")
+
+    if not tasks:
+        return pd.DataFrame()
+
+    logging.info(f"Fitting {len(tasks) * len(MODIFICATION_TYPES)} models across {len(tasks)} strata...")
+    tasks.sort(key=lambda task: len(task[2]), reverse=True)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=quiet_worker) as executor:
+        stratum_results = list(executor.map(fit_stratum, tasks))
+
+    return pd.concat(stratum_results, ignore_index=True)
+
+def run_analysis(input_path, output_path, cache_path=None, engine='mle', stratum_types=None,
+                 strata_output_path=None, max_workers=None, peer_output_path=None):
+    stratum_types = stratum_types or []
+    unknown = {family for stratum_type in stratum_types for family in stratum_type.split('+')} - set(STRATUM_COLUMNS)
+    if unknown:
+        logging.error(f"Unknown stratification families: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    extra_columns = [column for stratum_type in stratum_types for family in stratum_type.split('+')
+                     for column in STRATUM_COLUMNS[family]]
     try:
-        raw_df = pd.read_csv(input_path, dtype={'id': str})
+        raw_df = load_analysis_data(input_path, cache_path, extra_columns)
     except FileNotFoundError:
         logging.error(f"Input file not found: {input_path}")
         sys.exit(1)
 
     movie_features = create_movie_features(raw_df)
-    analysis_results = model_and_analyze(movie_features)
+    analysis_results = model_and_analyze(movie_features, engine)
 
     if analysis_results.empty:
         logging.error("Analysis produced no results. Exiting.")
@@ -144,11 +416,32 @@ def run_analysis(input_path, output_path):
     analysis_results.to_csv(output_path, index=False)
     logging.info(f"Analysis complete. Results saved to {output_path}")
 
+    if peer_output_path:
+        peer_expectations = build_peer_expectations(analysis_results)
+        peer_expectations.to_csv(peer_output_path, index=False)
+        logging.info(f"{len(peer_expectations)} peer group expectations saved to {peer_output_path}")
+
+    if stratum_types and strata_output_path:
+        strata_results = run_stratified_analysis(movie_features, stratum_types, engine, max_workers)
+        strata_results.to_csv(strata_output_path, index=False)
+        logging.info(f"Stratified analysis complete. {len(strata_results)} results saved to {strata_output_path}")
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description="Run the film modification analysis.")
     parser.add_argument("input_csv", help="Path to the raw input CSV file.")
     parser.add_argument("output_csv", help="Path for the output CSV file.")
+    parser.add_argument("--cache", help="Columnar snapshot of the input columns (.parquet or pickle) to reuse between runs.")
+    parser.add_argument("--engine", choices=sorted(MODEL_ENGINES), default='mle',
+                        help="Model fitting engine: statsmodels MLE or sparse IRLS GLM.")
+    parser.add_argument("--stratify-by", help="Comma-separated stratification families to also fit, e.g. 'year,certifier,year+certifier'.")
+    parser.add_argument("--strata-output", help="Path for the stratified results CSV.")
+    parser.add_argument("--workers", type=int, help="Worker processes for the stratified fits (default: CPU count).")
+    parser.add_argument("--peer-output", help="Path for the peer group expectation table CSV.")
     args = parser.parse_args()
 
-    run_analysis(args.input_csv, args.output_csv)
\ No newline at end of file
+    stratum_types = args.stratify_by.split(',') if args.stratify_by else None
+    if stratum_types and not args.strata_output:
+        parser.error("--stratify-by requires --strata-output")
+    run_analysis(args.input_csv, args.output_csv, args.cache, args.engine, stratum_types, args.strata_output, args.workers,
+                 args.peer_output)
\ No newline at end of file
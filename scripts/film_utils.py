@@ -15,6 +15,7 @@ from difflib import SequenceMatcher
 # Configuration
 CSV_FIELD_SIZE_LIMIT = 500000
 DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SLUG_REGISTRY = "src/lib/data/slug_registry.json"
 
 # Set CSV field size limit
 csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
@@ -66,6 +67,63 @@ def make_slug(name, year):
     slug = re.sub(r'[\s-]+', '-', slug).strip('-')
     return f"{slug}-{year}" if year else slug
 
+def load_slug_registry(path=None):
+    """Load the persisted slug registry, or start an empty one."""
+    registry = {'slugs': {}, 'names': {}}
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            registry.update(json.load(f))
+    registry['taken'] = set(registry['slugs'].values())
+    return registry
+
+def save_slug_registry(registry, path):
+    """Persist the slug registry."""
+    return save_json({'slugs': registry['slugs'], 'names': registry['names']}, path)
+
+def register_film_slug(registry, name_key, year, film_ids, name):
+    """Return the stable slug for a film group, assigning one on first sight."""
+    slugs = registry['slugs']
+    name_year_key = f"{name_key}|{year}"
+    known_ids = [fid for fid in film_ids if fid in slugs] or registry['names'].get(name_year_key, [])
+
+    if known_ids:
+        slug = slugs[known_ids[0]]
+    else:
+        base_slug = make_slug(name, year)
+        slug = base_slug
+        counter = 1
+        while slug in registry['taken']:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        registry['taken'].add(slug)
+
+    group_ids = registry['names'].setdefault(name_year_key, [])
+    for fid in film_ids:
+        slugs.setdefault(fid, slug)
+        if fid not in group_ids:
+            group_ids.append(fid)
+    return slug
+
+def assign_group_slugs(groups, registry_path=None):
+    """Map each (name, year) group to its stable slug, persisting new assignments."""
+    return register_group_slugs(
+        ((group_key, max(film_rows, key=completeness_score).get('movie_name', ''),
+          list(dict.fromkeys(row.get('id', '').strip() for row in film_rows if row.get('id', '').strip())))
+         for group_key, film_rows in groups.items()),
+        registry_path)
+
+def register_group_slugs(group_names, registry_path=None):
+    """Map groups to stable slugs from (group key, best row's movie name, film ids), persisting new assignments."""
+    registry = load_slug_registry(registry_path)
+    group_slugs = {}
+
+    for (name_key, year), name, film_ids in group_names:
+        group_slugs[(name_key, year)] = register_film_slug(registry, name_key, year, film_ids, name)
+
+    if registry_path:
+        save_slug_registry(registry, registry_path)
+    return group_slugs
+
 def sql_value(value, is_number=False):
     """Format value for SQL."""
     if value is None or str(value).strip() == '':
@@ -158,6 +216,31 @@ def calculate_popularity_score(imdb_votes=None, imdb_rating=None):
     total_score = vote_score + rating_score
     return round(total_score, 2)
 
+def summarize_film_rows(film_rows):
+    """Aggregate the cuts of each film id in a group into its film_summary values."""
+    summaries = {}
+    for row in film_rows:
+        film_id = row.get(list(row.keys())[0])
+        summary = summaries.setdefault(film_id, {
+            'modification_count': 0, 'deleted_secs': 0.0, 'replaced_secs': 0.0, 'inserted_secs': 0.0,
+            'ai_action_types': set(), 'ai_content_types': set()
+        })
+        # Only rows that become a modifications record count as cuts
+        if not row.get('description'):
+            continue
+        summary['modification_count'] += 1
+        for field in ['deleted_secs', 'replaced_secs', 'inserted_secs']:
+            summary[field] += safe_float(row.get(field))
+        summary['ai_action_types'].update(split_delimited_values(row.get('ai_action'), ['|']))
+        summary['ai_content_types'].update(split_delimited_values(row.get('ai_content_types'), ['|']))
+    return summaries
+
+def film_group_key(row):
+    """Return the (name, year) key a CSV row is grouped under, or None without both."""
+    name = clean_name(row.get('movie_name', ''))
+    year = extract_year(row.get('cert_date'), row.get('cert_no'))
+    return (name.lower(), year) if name and year else None
+
 def load_and_group_films(csv_path):
     """Load CSV and group films by name+year. Returns (groups, stats)."""
     if not os.path.exists(csv_path):
@@ -177,13 +260,10 @@ def load_and_group_films(csv_path):
             if lang:
                 language_counts[lang] += 1
 
-            name = clean_name(row.get('movie_name', ''))
-            year = extract_year(row.get('cert_date'), row.get('cert_no'))
-            film_id = row.get('id', '').strip()
-
-            if name and year:
+            group_key = film_group_key(row)
+            if group_key:
                 # Group by name and year (original logic)
-                groups[(name.lower(), year)].append(row)
+                groups[group_key].append(row)
 
     stats = {
         'total_films': len(groups),
@@ -193,6 +273,58 @@ def load_and_group_films(csv_path):
 
     return groups, stats
 
+def scan_film_groups(csv_path):
+    """
+    First pass of iter_film_groups, keeping no rows. Returns {group key: [last
+    row number, best row's completeness score and movie name, film ids]} in the
+    order load_and_group_films would group them.
+    """
+    if not os.path.exists(csv_path):
+        return {}
+
+    group_index = {}
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row_number, row in enumerate(csv.DictReader(f)):
+            group_key = film_group_key(row)
+            if not group_key:
+                continue
+            entry = group_index.setdefault(group_key, [row_number, -1, '', []])
+            entry[0] = row_number
+            # Strictly greater, so ties keep the first row as max() does
+            score = completeness_score(row)
+            if score > entry[1]:
+                entry[1], entry[2] = score, row.get('movie_name', '')
+            film_id = row.get('id', '').strip()
+            if film_id and film_id not in entry[3]:
+                entry[3].append(film_id)
+    return group_index
+
+def iter_film_groups(csv_path, group_index, build=None):
+    """
+    Second pass: yield (group key, rows) in the same first-seen order as
+    load_and_group_films, holding only the groups not yet yielded rather than
+    the whole CSV. With build, each group is replaced by build(group key, rows)
+    as soon as its last row is read, so groups waiting for an earlier one to
+    complete are held in that (usually smaller) form.
+    """
+    order = iter(group_index)
+    next_key = next(order, None)
+    pending = {}
+    complete = {}
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row_number, row in enumerate(csv.DictReader(f)):
+            group_key = film_group_key(row)
+            if not group_key:
+                continue
+            pending.setdefault(group_key, []).append(row)
+            if group_index[group_key][0] != row_number:
+                continue
+            film_rows = pending.pop(group_key)
+            complete[group_key] = build(group_key, film_rows) if build else film_rows
+            while next_key in complete:
+                yield next_key, complete.pop(next_key)
+                next_key = next(order, None)
+
 def run_command(cmd, timeout=30):
     """Run shell command and return result."""
     try:
@@ -205,7 +337,7 @@ def run_command(cmd, timeout=30):
 
 def save_json(data, filepath):
     """Save data to JSON file."""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
     try:
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
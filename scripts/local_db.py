@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Local DB - Build a local SQLite copy of the D1 database from the import output
+Applies the schemas and generated batches in import order, plus a keyword search benchmark
+"""
+
+import sys
+import os
+import re
+import time
+import sqlite3
+import tempfile
+from pathlib import Path
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import DEFAULT_BATCH_SIZE
+from data_import import SCHEMA_DIR, generate_sql_batches, order_import_files
+
+# Same query as the /api/search/keyword endpoint: films ranked by their best
+# matching cut, with snippets built only for the returned page
+KEYWORD_SEARCH_SQL = """
+WITH hit AS MATERIALIZED (
+  SELECT m.film_id, m.id AS cut_id, bm25(modifications_fts, 1.0, 1.0, 3.0) AS rank
+  FROM modifications_fts
+  JOIN modifications m ON m.id = modifications_fts.rowid
+  WHERE modifications_fts MATCH ?1
+),
+best AS MATERIALIZED (
+  SELECT film_id, cut_id, MIN(rank) AS rank
+  FROM hit
+  GROUP BY film_id
+  ORDER BY rank
+  LIMIT ?2
+)
+SELECT f.id, f.slug, f.name, f.year, f.language, f.poster_url,
+  snippet(modifications_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet, best.rank
+FROM best
+JOIN modifications_fts ON modifications_fts.rowid = best.cut_id AND modifications_fts MATCH ?1
+JOIN films f ON f.id = best.film_id
+ORDER BY best.rank
+"""
+
+# Unindexed equivalent, for comparison
+LIKE_SEARCH_SQL = """
+SELECT DISTINCT f.id
+FROM modifications m
+JOIN films f ON f.id = m.film_id
+LEFT JOIN cut_texts t ON t.hash = m.text_hash
+WHERE t.description LIKE ?1 OR t.ai_description LIKE ?1 OR f.name LIKE ?1
+LIMIT ?2
+"""
+
+BENCHMARK_QUERIES = ['smoking', 'violence', 'liquor bottle', 'kiss', 'gang*', 'national anthem']
+
+def fts_query(text):
+    """Turn user text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def apply_sql_file(conn, sql_file):
+    """Execute one SQL file against the local database."""
+    with open(sql_file, encoding='utf-8') as f:
+        conn.executescript(f.read())
+
+def build_local_db(csv_path, db_path, batch_size=DEFAULT_BATCH_SIZE, staging=False, slug_registry=None,
+                   normalize=True):
+    """Build a local SQLite database with the files data_import would send to D1, in the same order."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    # A throwaway local copy does not need durable commits for every statement
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        batch_files = generate_sql_batches(csv_path, temp_dir, batch_size, staging=staging, slug_registry=slug_registry)
+        data_files, index_file, swap_file, search_file = order_import_files(batch_files)
+
+        for schema_file in sorted(Path(SCHEMA_DIR).glob("*.sql")):
+            if schema_file.name.startswith(('000-', '002-', '003-')):
+                apply_sql_file(conn, schema_file)
+        for sql_file in data_files + [f for f in (index_file, swap_file) if f]:
+            apply_sql_file(conn, sql_file)
+
+        # The normalized bridge tables are populated from the loaded films and cuts
+        if normalize:
+            for schema_file in sorted(Path(SCHEMA_DIR).glob("001-*.sql")):
+                apply_sql_file(conn, schema_file)
+        if search_file:
+            apply_sql_file(conn, search_file)
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    films = conn.execute("SELECT COUNT(*) FROM films").fetchone()[0]
+    modifications = conn.execute("SELECT COUNT(*) FROM modifications").fetchone()[0]
+    conn.close()
+
+    print(f"Built {db_path}: {films} films, {modifications} modifications "
+          f"({os.path.getsize(db_path) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    return db_path
+
+def time_query(conn, sql, params, repeat):
+    """Run a query repeat times. Returns (row count, p50 ms, p95 ms)."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return len(rows), latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+def run_search_benchmark(db_path, queries=BENCHMARK_QUERIES, limit=20, repeat=20):
+    """Compare keyword lookups through the FTS5 index with LIKE scans."""
+    conn = sqlite3.connect(db_path)
+    print(f"{'query':<20}{'fts hits':>10}{'fts p50':>10}{'fts p95':>10}{'like hits':>11}{'like p50':>10}{'like p95':>10}")
+
+    for text in queries:
+        fts_rows, fts_p50, fts_p95 = time_query(conn, KEYWORD_SEARCH_SQL, (fts_query(text), limit), repeat)
+        like_text = '%' + text.rstrip('*') + '%'
+        like_rows, like_p50, like_p95 = time_query(conn, LIKE_SEARCH_SQL, (like_text, limit), repeat)
+        print(f"{text:<20}{fts_rows:>10}{fts_p50:>8.2f}ms{fts_p95:>8.2f}ms{like_rows:>11}{like_p50:>8.2f}ms{like_p95:>8.2f}ms")
+
+    conn.close()
+
+def main():
+    """Main local database entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and benchmark a local SQLite copy of the D1 database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build the database from a CSV file')
+    build_parser.add_argument('csv_file', help='CSV file with film data')
+    build_parser.add_argument('db_path', help='Output SQLite database path')
+    build_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Batch size')
+    build_parser.add_argument('--staging', action='store_true', help='Load through the staging tables and swap')
+    build_parser.add_argument('--slug-registry', help='Persisted slug registry path (default: in-memory slugs)')
+    build_parser.add_argument('--no-normalize', action='store_true', help='Skip populating the 001 bridge tables')
+
+    bench_parser = subparsers.add_parser('benchmark', help='Benchmark keyword search latency')
+    bench_parser.add_argument('db_path', help='SQLite database path')
+    bench_parser.add_argument('queries', nargs='*', default=BENCHMARK_QUERIES, help='Keyword queries')
+    bench_parser.add_argument('--limit', type=int, default=20, help='Films per query')
+    bench_parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not os.path.exists(args.csv_file):
+            print(f"CSV file not found: {args.csv_file}")
+            return 1
+        build_local_db(args.csv_file, args.db_path, args.batch_size, args.staging, args.slug_registry,
+                       normalize=not args.no_normalize)
+    else:
+        run_search_benchmark(args.db_path, args.queries, args.limit, args.repeat)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
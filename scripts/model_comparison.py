@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Model Comparison - Compare the peer-comparison model fitting engines
+Fit time, convergence and prediction agreement on real and synthetic data
+"""
+
+import sys
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_analysis import (MODIFICATION_TYPES, MODEL_ENGINES, load_analysis_data,
+                           create_movie_features, fit_expected_counts)
+
+def make_synthetic_summaries(n_films, seed=0, alpha=0.8):
+    """Simulate per-film summaries with Negative Binomial counts from known peer-group effects."""
+    rng = np.random.default_rng(seed)
+    ratings = ['A', 'S', 'U', 'UA']
+    languages = ['Bengali', 'English', 'Hindi', 'Kannada', 'Malayalam', 'Marathi', 'Other', 'Tamil', 'Telugu']
+    genres = ['Action', 'Comedy', 'Crime', 'Drama', 'Horror', 'Other', 'Romance', 'Thriller']
+
+    df = pd.DataFrame({
+        'id': [str(i) for i in range(n_films)],
+        'language': rng.choice(languages, n_films),
+        'rating': rng.choice(ratings, n_films, p=[0.2, 0.02, 0.3, 0.48]),
+        'primary_genre': rng.choice(genres, n_films)
+    })
+    df['language_grouped'] = df['language']
+
+    for modification_type in MODIFICATION_TYPES:
+        effects = {value: rng.normal(0, 0.5) for value in ratings + languages + genres}
+        log_mu = rng.normal(0, 0.3) + sum(df[column].map(effects) for column in ['rating', 'language_grouped', 'primary_genre'])
+        mu = np.exp(log_mu.to_numpy())
+        df[modification_type] = rng.negative_binomial(1 / alpha, 1 / (1 + alpha * mu))
+
+    return df
+
+def compare_engines(summaries_df, label):
+    """Fit every modification type with each engine and report time, convergence and agreement."""
+    print(f"\n{label}: {len(summaries_df)} film versions")
+    print(f"{'modification type':<36}{'engine':<8}{'fit s':>8}{'converged':>11}{'corr':>10}{'max |diff|':>12}{'median rel':>12}")
+
+    for modification_type in MODIFICATION_TYPES:
+        model_data = summaries_df.rename(columns={modification_type: 'score_value'})
+        predictions = {}
+
+        for engine in MODEL_ENGINES:
+            start = time.perf_counter()
+            try:
+                predictions[engine] = fit_expected_counts(model_data, engine, disp=False)
+            except Exception:
+                predictions[engine] = None
+            elapsed = time.perf_counter() - start
+
+            agreement = ''
+            reference = predictions.get('mle')
+            if engine != 'mle' and reference is not None and predictions[engine] is not None:
+                both = reference.notna() & predictions[engine].notna()
+                a, b = reference[both], predictions[engine][both]
+                relative = ((a - b).abs() / a.abs().clip(lower=1e-9)).median()
+                agreement = f"{a.corr(b):>10.6f}{(a - b).abs().max():>12.2e}{relative:>12.2e}"
+
+            print(f"{modification_type:<36}{engine:<8}{elapsed:>8.2f}{str(predictions[engine] is not None):>11}{agreement}")
+
+def main():
+    """Main model comparison entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare peer-comparison model fitting engines")
+    parser.add_argument('csv_file', nargs='?', help='Raw input CSV for the real-data comparison')
+    parser.add_argument('--synthetic-films', type=int, nargs='*', default=[5000, 50000],
+                        help='Sizes of synthetic datasets to compare on')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for synthetic data')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.csv_file:
+        if not os.path.exists(args.csv_file):
+            print(f"CSV file not found: {args.csv_file}")
+            return 1
+        compare_engines(create_movie_features(load_analysis_data(args.csv_file)), f"Real data ({args.csv_file})")
+
+    for n_films in args.synthetic_films:
+        compare_engines(make_synthetic_summaries(n_films, args.seed), f"Synthetic data (seed {args.seed})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Offline Search - In-process film search built from the search documents
+BM25 ranking, prefix matching, filters and facets without a Typesense node
+"""
+
+import sys
+import os
+import json
+import re
+import math
+import time
+import pickle
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import DEFAULT_SLUG_REGISTRY
+
+# Text fields ranked with BM25, with the same relative weights as the search page
+SEARCH_FIELDS = {'name': 3.0, 'searchable_content': 1.0}
+
+# Document fields kept for results, filters and facets
+STORED_FIELDS = ['id', 'slug', 'name', 'year', 'language', 'rating', 'imdb_rating',
+                 'imdb_genres', 'modification_count', 'popularity_score', 'poster_url']
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+
+BENCHMARK_QUERIES = [
+    {'q': 'name:gan*'},
+    {'q': 'love'},
+    {'q': 'smoking scene', 'filter_by': 'year:>2018'},
+    {'q': '*', 'filter_by': 'language:[Hindi,Tamil] && modification_count:>5', 'facet_by': 'rating,year'},
+    {'q': 'abuse', 'facet_by': 'language,rating,modification_count'},
+]
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return re.findall(r'\w+', str(text).lower()) if text else []
+
+def build_search_index(documents):
+    """Build an inverted index over the search documents."""
+    index = {'docs': [{field: doc.get(field) for field in STORED_FIELDS} for doc in documents], 'fields': {}}
+
+    for field in SEARCH_FIELDS:
+        term_postings = defaultdict(list)
+        lengths = array('I')
+        for doc_idx, doc in enumerate(documents):
+            tokens = tokenize(doc.get(field, ''))
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_postings[term].append((doc_idx, tf))
+
+        # Postings are packed as (doc, tf) pairs in one array, addressed by term offsets
+        postings = array('I')
+        terms = {}
+        for term in sorted(term_postings):
+            terms[term] = (len(postings) // 2, len(term_postings[term]))
+            for doc_idx, tf in term_postings[term]:
+                postings.append(doc_idx)
+                postings.append(tf)
+
+        index['fields'][field] = {
+            'terms': terms,
+            'sorted_terms': sorted(terms),
+            'postings': postings,
+            'lengths': lengths,
+            'avg_length': (sum(lengths) / len(lengths)) if lengths else 0.0
+        }
+
+    return index
+
+def save_search_index(index, path):
+    """Serialize the index in its compact packed form."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    packed = dict(index)
+    packed['fields'] = {
+        field: {**data, 'postings': data['postings'].tobytes(), 'lengths': data['lengths'].tobytes(),
+                'sorted_terms': None}
+        for field, data in index['fields'].items()
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(packed, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_search_index(path):
+    """Load an index written by save_search_index (only load files you built)."""
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+    for data in index['fields'].values():
+        postings = array('I')
+        postings.frombytes(data['postings'])
+        lengths = array('I')
+        lengths.frombytes(data['lengths'])
+        data.update(postings=postings, lengths=lengths, sorted_terms=sorted(data['terms']))
+    return index
+
+def expand_term(field_index, term, prefix):
+    """Return the indexed terms matching a query term, expanding prefixes."""
+    if not prefix:
+        return [term] if term in field_index['terms'] else []
+    sorted_terms = field_index['sorted_terms']
+    matches = []
+    for i in range(bisect_left(sorted_terms, term), len(sorted_terms)):
+        if not sorted_terms[i].startswith(term) or len(matches) >= MAX_PREFIX_EXPANSIONS:
+            break
+        matches.append(sorted_terms[i])
+    return matches
+
+def parse_query(q):
+    """Parse q into (field or None, term, is_prefix) tuples. The last bare word is a prefix, as in Typesense."""
+    parsed = []
+    for part in q.split():
+        field, _, value = part.rpartition(':')
+        field = field if field in SEARCH_FIELDS else None
+        prefix = value.endswith('*')
+        parsed.extend((field, term, prefix) for term in tokenize(value))
+    if parsed and not parsed[-1][0]:
+        parsed[-1] = (None, parsed[-1][1], True)
+    return parsed
+
+def score_documents(index, q):
+    """Score documents with BM25 over the search fields. Every query term must match."""
+    total_docs = len(index['docs'])
+    scores = None
+
+    for field_filter, term, prefix in parse_query(q):
+        term_scores = defaultdict(float)
+        for field, weight in SEARCH_FIELDS.items():
+            if field_filter and field != field_filter:
+                continue
+            data = index['fields'][field]
+            for match in expand_term(data, term, prefix):
+                start, count = data['terms'][match]
+                idf = math.log(1 + (total_docs - count + 0.5) / (count + 0.5))
+                postings = data['postings']
+                for i in range(start, start + count):
+                    doc_idx, tf = postings[2 * i], postings[2 * i + 1]
+                    norm = 1 - BM25_B + BM25_B * data['lengths'][doc_idx] / (data['avg_length'] or 1)
+                    term_scores[doc_idx] += weight * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {doc_idx: score + term_scores[doc_idx] for doc_idx, score in scores.items() if doc_idx in term_scores}
+        if not scores:
+            return {}
+
+    return scores if scores is not None else {doc_idx: 0.0 for doc_idx in range(total_docs)}
+
+def parse_filter(filter_by):
+    """Parse a Typesense-style filter_by string into (field, op, values) clauses."""
+    clauses = []
+    for clause in filter(None, (c.strip() for c in (filter_by or '').split('&&'))):
+        field, _, expr = clause.partition(':')
+        match = re.match(r'^(>=|<=|>|<|=|!=)?\s*(.*)$', expr.strip())
+        op, value = match.group(1) or '=', match.group(2).strip()
+        range_match = re.match(r'^\[(.+)\.\.(.+)\]$', value)
+        if range_match:
+            clauses.append((field.strip(), '..', [range_match.group(1), range_match.group(2)]))
+        elif value.startswith('['):
+            clauses.append((field.strip(), op, [v.strip().strip('`"') for v in value[1:-1].split(',')]))
+        else:
+            clauses.append((field.strip(), op, [value.strip('`"')]))
+    return clauses
+
+def matches_clause(doc, field, op, values):
+    """Check one filter clause against a stored document."""
+    value = doc.get(field)
+    doc_values = value if isinstance(value, list) else [value]
+
+    if op in ('=', '!='):
+        wanted = {str(v).lower() for v in values}
+        found = any(str(v).lower() in wanted for v in doc_values)
+        return found if op == '=' else not found
+
+    for v in doc_values:
+        if not isinstance(v, (int, float)):
+            continue
+        if op == '..' and float(values[0]) <= v <= float(values[1]):
+            return True
+        target = float(values[0])
+        if (op == '>' and v > target) or (op == '<' and v < target) or \
+           (op == '>=' and v >= target) or (op == '<=' and v <= target):
+            return True
+    return False
+
+def search(index, q='*', filter_by=None, facet_by=None, per_page=10, page=1):
+    """Search the index, returning a Typesense-shaped response."""
+    start = time.perf_counter()
+    docs = index['docs']
+    scores = score_documents(index, q) if q and q.strip() != '*' else {i: 0.0 for i in range(len(docs))}
+
+    clauses = parse_filter(filter_by)
+    if clauses:
+        scores = {i: s for i, s in scores.items() if all(matches_clause(docs[i], *c) for c in clauses)}
+
+    ranked = sorted(scores, key=lambda i: (-scores[i], -(docs[i].get('popularity_score') or 0)))
+
+    facet_counts = []
+    for field in filter(None, (f.strip() for f in (facet_by or '').split(','))):
+        counts = Counter()
+        for i in ranked:
+            value = docs[i].get(field)
+            counts.update(str(v) for v in (value if isinstance(value, list) else [value]) if v not in (None, ''))
+        facet_counts.append({
+            'field_name': field,
+            'counts': [{'value': value, 'count': count} for value, count in counts.most_common()]
+        })
+
+    offset = (page - 1) * per_page
+    return {
+        'found': len(ranked),
+        'hits': [{'document': docs[i], 'text_match': round(scores[i], 4)} for i in ranked[offset:offset + per_page]],
+        'facet_counts': facet_counts,
+        'search_time_ms': round((time.perf_counter() - start) * 1000, 3)
+    }
+
+def run_benchmark(index_path, repeat=50):
+    """Report index load time and per-query latency percentiles."""
+    start = time.perf_counter()
+    index = load_search_index(index_path)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Loaded {len(index['docs'])} documents ({os.path.getsize(index_path) / 1e6:.1f} MB) in {load_ms:.1f} ms")
+
+    for query in BENCHMARK_QUERIES:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = search(index, **query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"🔍 {query}: {result['found']} found, p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+def main():
+    """Main offline search entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and query an offline film search index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build an index from the CSV data')
+    build_parser.add_argument('csv_file', help='CSV file with film data')
+    build_parser.add_argument('index_path', help='Output index path')
+    build_parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+
+    query_parser = subparsers.add_parser('query', help='Query a built index')
+    query_parser.add_argument('index_path', help='Index path')
+    query_parser.add_argument('q', help="Query text, e.g. 'name:gan*'")
+    query_parser.add_argument('--filter-by', help="Filter, e.g. 'year:>2020 && language:[Hindi,Tamil]'")
+    query_parser.add_argument('--facet-by', help='Comma-separated facet fields')
+    query_parser.add_argument('--per-page', type=int, default=10, help='Results per page')
+
+    bench_parser = subparsers.add_parser('benchmark', help='Measure load time and query latency')
+    bench_parser.add_argument('index_path', help='Index path')
+    bench_parser.add_argument('--repeat', type=int, default=50, help='Runs per query')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from search_sync import prepare_search_documents
+
+        if not os.path.exists(args.csv_file):
+            print(f"CSV file not found: {args.csv_file}")
+            return 1
+        documents = prepare_search_documents(args.csv_file, args.slug_registry)
+        start = time.perf_counter()
+        index = build_search_index(documents)
+        save_search_index(index, args.index_path)
+        print(f"Indexed {len(documents)} documents in {time.perf_counter() - start:.1f}s -> {args.index_path}")
+    elif args.command == 'query':
+        result = search(load_search_index(args.index_path), args.q, args.filter_by, args.facet_by, args.per_page)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        run_benchmark(args.index_path, args.repeat)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
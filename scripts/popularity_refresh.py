@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Popularity Refresh - Push view-based popularity to the Typesense index
+Re-ranks films from a views snapshot and partially updates only the documents that changed
+"""
+
+import sys
+import os
+import json
+import math
+import requests
+from array import array
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import (DEFAULT_SLUG_REGISTRY, assign_group_slugs, calculate_popularity_score, completeness_score,
+                        load_and_group_films, safe_int, split_delimited_values)
+from search_sync import classify_language, rank_proportional_popularity
+
+DEFAULT_SNAPSHOT = "src/lib/data/popularity.json"
+DEFAULT_STATE = "src/lib/data/popularity_state.json"
+DEFAULT_BATCH_SIZE = 500
+
+# Points added to the IMDb-based score per decade of all-time and recent views
+VIEW_WEIGHT = 5.0
+RECENT_VIEW_WEIGHT = 10.0
+MAX_INT32 = 2 ** 31 - 1
+
+def load_views_snapshot(snapshot_path):
+    """Load {film_id: (total_views, recent_views)} from a views_rollup.py snapshot."""
+    with open(snapshot_path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    return {film_id: (total, recent) for film_id, (total, recent) in snapshot['films'].items()}
+
+def collect_ranking_inputs(groups, group_slugs, views):
+    """Return (document ids, language codes, base scores, click counts) in document order.
+
+    Document ids and base scores match search_sync; views of every language
+    version in a group count towards its single search document.
+    """
+    doc_ids = []
+    language_codes = array('B')
+    scores = array('d')
+    click_counts = array('q')
+
+    for (name_key, year), film_rows in groups.items():
+        best_row = max(film_rows, key=completeness_score)
+        film_ids = {row.get('id', '').strip() for row in film_rows}
+
+        total_views = sum(views.get(film_id, (0, 0))[0] for film_id in film_ids)
+        recent_views = sum(views.get(film_id, (0, 0))[1] for film_id in film_ids)
+
+        base_score = calculate_popularity_score(
+            imdb_votes=safe_int(best_row.get('imdb_votes', 0)),
+            imdb_rating=best_row.get('imdb_rating')
+        )
+
+        doc_ids.append(best_row.get('id', group_slugs[(name_key, year)]))
+        language_codes.append(classify_language(split_delimited_values(best_row.get('imdb_languages', ''))))
+        scores.append(base_score + VIEW_WEIGHT * math.log10(1 + total_views)
+                      + RECENT_VIEW_WEIGHT * math.log10(1 + recent_views))
+        click_counts.append(min(total_views, MAX_INT32))
+
+    return doc_ids, language_codes, scores, click_counts
+
+def load_refresh_state(state_path):
+    """Load the values pushed by the last refresh, or an empty state."""
+    if state_path and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    return {'collection_created_at': None, 'documents': {}}
+
+def save_refresh_state(state, state_path):
+    """Persist the pushed values for the next run."""
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+
+def changed_documents(doc_ids, scores, click_counts, pushed):
+    """Return partial update documents whose score or click count differs from the pushed values."""
+    updates = []
+    for doc_id, score, clicks in zip(doc_ids, scores, click_counts):
+        values = [int(score), int(clicks)]
+        if pushed.get(doc_id) != values:
+            updates.append({'id': doc_id, 'popularity_score': values[0], 'click_count': values[1]})
+    return updates
+
+def get_collection_created_at(base_url, headers):
+    """Return the films collection's created_at, which changes whenever search_sync rebuilds it."""
+    response = requests.get(f"{base_url}/collections/films", headers=headers)
+    if response.status_code != 200:
+        print(f"Failed to read collection: {response.status_code} - {response.text}")
+        return None
+    return response.json().get('created_at')
+
+def push_updates(updates, base_url, headers, batch_size=DEFAULT_BATCH_SIZE, action='update'):
+    """Send partial updates with action=update (or emplace, which also creates). Returns the ids Typesense accepted."""
+    accepted = []
+    for i in range(0, len(updates), batch_size):
+        batch = updates[i:i+batch_size]
+        response = requests.post(
+            f"{base_url}/collections/films/documents/import",
+            params={'action': action},
+            data='\n'.join(json.dumps(doc, ensure_ascii=False) for doc in batch).encode('utf-8'),
+            headers={**headers, 'Content-Type': 'text/plain'}
+        )
+        if response.status_code != 200:
+            print(f"❌ Update batch {i // batch_size + 1} failed: {response.status_code} - {response.text}")
+            continue
+
+        failures = 0
+        for doc, line in zip(batch, response.text.splitlines()):
+            if json.loads(line).get('success'):
+                accepted.append(doc['id'])
+            else:
+                failures += 1
+        print(f"✅ Updated {len(batch) - failures}/{len(batch)} documents in batch {i // batch_size + 1}")
+    return accepted
+
+def run_refresh(csv_file, snapshot_path, protocol, host, api_key, state_path=DEFAULT_STATE,
+                slug_registry=None, batch_size=DEFAULT_BATCH_SIZE, full=False, dry_run=False):
+    """Re-rank films with view counts and push the changed scores. Returns True on success."""
+    groups, _ = load_and_group_films(csv_file)
+    if not groups:
+        print("No films to rank")
+        return False
+
+    group_slugs = assign_group_slugs(groups, slug_registry)
+    views = load_views_snapshot(snapshot_path)
+    doc_ids, language_codes, scores, click_counts = collect_ranking_inputs(groups, group_slugs, views)
+    del groups
+
+    print(f"Ranking {len(doc_ids)} films with views for {len(views)} film versions...")
+    scores = rank_proportional_popularity(language_codes, scores)
+
+    headers = {'X-TYPESENSE-API-KEY': api_key, 'Content-Type': 'application/json'}
+    base_url = f"{protocol}://{host}"
+    state = load_refresh_state(state_path)
+
+    created_at = None if dry_run else get_collection_created_at(base_url, headers)
+    if not dry_run and created_at is None:
+        return False
+    if full or (not dry_run and created_at != state['collection_created_at']):
+        # A rebuilt collection is back to base scores, so nothing pushed before still holds
+        state = {'collection_created_at': created_at, 'documents': {}}
+
+    updates = changed_documents(doc_ids, scores, click_counts, state['documents'])
+    print(f"{len(updates)} of {len(doc_ids)} documents changed")
+    if dry_run or not updates:
+        return True
+
+    accepted = set(push_updates(updates, base_url, headers, batch_size))
+    for doc in updates:
+        if doc['id'] in accepted:
+            state['documents'][doc['id']] = [doc['popularity_score'], doc['click_count']]
+    save_refresh_state(state, state_path)
+
+    print(f"🎉 Refreshed popularity for {len(accepted)} documents")
+    return len(accepted) == len(updates)
+
+def main():
+    """Main popularity refresh pipeline."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Push view-based popularity scores to Typesense")
+    parser.add_argument('csv_file', help='CSV file with film data')
+    parser.add_argument('protocol', nargs='?', help='Protocol (http/https)')
+    parser.add_argument('host', nargs='?', help='Typesense host')
+    parser.add_argument('api_key', nargs='?', help='Typesense API key')
+    parser.add_argument('--snapshot', default=DEFAULT_SNAPSHOT, help='Views snapshot from views_rollup.py')
+    parser.add_argument('--state', default=DEFAULT_STATE, help='Values pushed by the previous refresh')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Documents per update request')
+    parser.add_argument('--full', action='store_true', help='Push every document, ignoring the saved state')
+    parser.add_argument('--dry-run', action='store_true', help='Only report how many documents changed')
+
+    args = parser.parse_args()
+
+    if not args.dry_run and not (args.protocol and args.host and args.api_key):
+        print("Error: Typesense protocol, host and API key are required")
+        return 1
+    for path in (args.csv_file, args.snapshot):
+        if not os.path.exists(path):
+            print(f"File not found: {path}")
+            return 1
+
+    success = run_refresh(args.csv_file, args.snapshot, args.protocol, args.host, args.api_key, args.state,
+                          args.slug_registry, args.batch_size, args.full, args.dry_run)
+    return 0 if success else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Poster Thumbnails - Pre-generate resized poster images for the site
+Fetches each poster once, resizes in a process pool and writes content-addressed WebP/AVIF files with a manifest
+"""
+
+import sys
+import os
+import io
+import json
+import hashlib
+import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image, features
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import completeness_score, load_and_group_films
+
+DEFAULT_OUTPUT_DIR = "static/posters"
+MANIFEST_NAME = "manifest.json"
+
+# Widths the site requests from IMDb (Card.svelte and the film page), with the
+# QL quality each one asks for
+POSTER_SIZES = {40: 80, 200: 100, 250: 75, 300: 80, 600: 99}
+POSTER_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+CHUNK_SIZE = 64
+
+def http_fetcher(timeout=30):
+    """Return a fetcher that downloads poster URLs."""
+    session = requests.Session()
+
+    def fetch(url):
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    return fetch
+
+def directory_fetcher(source_dir):
+    """Return a fetcher that reads each poster from source_dir by the URL's file name."""
+    def fetch(url):
+        with open(os.path.join(source_dir, url.rsplit('/', 1)[-1]), 'rb') as f:
+            return f.read()
+
+    return fetch
+
+def collect_poster_urls(csv_path):
+    """Return the unique poster URLs of the dataset, one per film group."""
+    groups, _ = load_and_group_films(csv_path)
+    urls = []
+    for film_rows in groups.values():
+        best_row = max(film_rows, key=completeness_score)
+        url = best_row.get('imdb_poster_url', '').strip()
+        if url.startswith('http'):
+            urls.append(url)
+    return list(dict.fromkeys(urls))
+
+def variant_path(digest, width, extension):
+    """Content-addressed path of one variant, sharded by the first hash byte."""
+    return f"{digest[:2]}/{digest}-{width}.{extension}"
+
+def is_processed(entry, output_dir, sizes, formats):
+    """Check that a manifest entry has every requested variant on disk."""
+    files = entry.get('files', {})
+    for width in sizes:
+        for extension in formats:
+            relative_path = files.get(str(width), {}).get(extension)
+            if not relative_path or not os.path.exists(os.path.join(output_dir, relative_path)):
+                return False
+    return True
+
+def resize_poster(task):
+    """
+    Write the resized variants of one source image. Runs in a worker process,
+    so it takes and returns plain picklable values. Images are never upscaled.
+    Returns None when the source is not a readable image.
+    """
+    digest, data, sizes, formats, output_dir = task
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            source.load()
+            image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    except OSError:
+        return None
+
+    files = {}
+    for width, quality in sizes.items():
+        target_width = min(width, image.width)
+        height = max(1, round(image.height * target_width / image.width))
+        resized = image if target_width == image.width else image.resize((target_width, height), Image.LANCZOS)
+
+        for extension in formats:
+            relative_path = variant_path(digest, width, extension)
+            path = os.path.join(output_dir, relative_path)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                resized.save(path + '.tmp', POSTER_FORMATS[extension], quality=quality)
+                os.replace(path + '.tmp', path)
+            files.setdefault(str(width), {})[extension] = relative_path
+
+    return {'hash': digest, 'width': image.width, 'height': image.height, 'files': files}
+
+def load_manifest(manifest_path):
+    """Load the {url: entry} manifest, or an empty one."""
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest, manifest_path):
+    """Write the manifest, replacing the previous one in one step."""
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+def fetch_poster(fetch, url):
+    """Fetch one poster. Returns (url, bytes or None, error)."""
+    try:
+        return url, fetch(url), None
+    except Exception as e:
+        return url, None, str(e)
+
+def generate_thumbnails(urls, output_dir=DEFAULT_OUTPUT_DIR, fetch=None, sizes=POSTER_SIZES, formats=('webp',),
+                        max_workers=None, fetch_workers=8, chunk_size=CHUNK_SIZE):
+    """
+    Fetch and resize every poster not already in the manifest. Downloads run in
+    a thread pool and resizing in a process pool, a chunk at a time, with the
+    manifest saved after each chunk so an interrupted run resumes where it stopped.
+    Returns (processed, skipped, failed) counts.
+    """
+    fetch = fetch or http_fetcher()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    pending = [url for url in urls if not (url in manifest and is_processed(manifest[url], output_dir, sizes, formats))]
+    skipped = len(urls) - len(pending)
+    processed = failed = 0
+    print(f"{len(pending)} posters to process ({skipped} already done)")
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=max_workers) as resize_pool:
+        for start in range(0, len(pending), chunk_size):
+            tasks = []
+            task_urls = []
+            for url, data, error in fetch_pool.map(lambda url: fetch_poster(fetch, url), pending[start:start + chunk_size]):
+                if data is None:
+                    print(f"Failed to fetch {url}: {error}")
+                    failed += 1
+                    continue
+                tasks.append((hashlib.sha256(data).hexdigest()[:32], data, sizes, formats, output_dir))
+                task_urls.append(url)
+
+            for url, result in zip(task_urls, resize_pool.map(resize_poster, tasks)):
+                if result is None:
+                    print(f"Failed to read image from {url}")
+                    failed += 1
+                    continue
+                # Keep variants of other sizes or formats made from the same source
+                previous = manifest.get(url)
+                if previous and previous['hash'] == result['hash']:
+                    for width, variants in result['files'].items():
+                        previous['files'].setdefault(width, {}).update(variants)
+                    result['files'] = previous['files']
+                manifest[url] = result
+                processed += 1
+
+            save_manifest(manifest, manifest_path)
+            print(f"Processed {processed + failed}/{len(pending)} posters")
+
+    return processed, skipped, failed
+
+def main():
+    """Main poster thumbnail pipeline."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-generate resized poster thumbnails")
+    parser.add_argument('--csv-file', default="src/lib/data/data.csv", help='CSV data file')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='Output directory for images and manifest')
+    parser.add_argument('--source-dir', help='Read posters from this directory (by URL file name) instead of downloading')
+    parser.add_argument('--formats', default='webp', help="Comma-separated output formats: 'webp', 'avif'")
+    parser.add_argument('--sizes', help='Comma-separated widths (default: the widths the site uses)')
+    parser.add_argument('--workers', type=int, help='Worker processes for resizing')
+    parser.add_argument('--fetch-workers', type=int, default=8, help='Concurrent downloads')
+    parser.add_argument('--limit', type=int, help='Only process the first N posters')
+
+    args = parser.parse_args()
+
+    formats = tuple(args.formats.split(','))
+    unknown = [extension for extension in formats if extension not in POSTER_FORMATS]
+    if unknown:
+        print(f"Unknown formats: {', '.join(unknown)}")
+        return 1
+    missing = [extension for extension in formats if not features.check(extension)]
+    if missing:
+        print(f"This Pillow build cannot write: {', '.join(missing)}")
+        return 1
+
+    sizes = POSTER_SIZES
+    if args.sizes:
+        sizes = {int(width): POSTER_SIZES.get(int(width), 80) for width in args.sizes.split(',')}
+
+    if not os.path.exists(args.csv_file):
+        print(f"CSV file not found: {args.csv_file}")
+        return 1
+
+    urls = collect_poster_urls(args.csv_file)[:args.limit]
+    fetch = directory_fetcher(args.source_dir) if args.source_dir else http_fetcher()
+
+    processed, skipped, failed = generate_thumbnails(urls, args.output_dir, fetch, sizes, formats,
+                                                     args.workers, args.fetch_workers)
+    print(f"Posters: {processed} processed, {skipped} skipped, {failed} failed")
+    return 0 if not failed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
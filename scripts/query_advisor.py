@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Query Advisor - Query plans and latency of the browse API queries on a local database
+Flags full scans and temp B-trees at several data scales and measures candidate covering indexes
+"""
+
+import sys
+import os
+import re
+import time
+import shutil
+import sqlite3
+import tempfile
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_db import build_local_db
+
+CATEGORIES_TS = "src/routes/browse/categories.ts"
+
+# Wrappers the API endpoints put around a category's base query
+BROWSE_WRAPPER = """
+SELECT *, COUNT(*) OVER() as total_count
+FROM ({base})
+LIMIT 50 OFFSET 0
+"""
+
+TIMESERIES_WRAPPER = """
+SELECT SUBSTR(f.cert_date, 1, 4) as date_period, COUNT(*) as count
+FROM ({base}) matched_films
+JOIN films f ON matched_films.id = f.id
+WHERE f.cert_date IS NOT NULL
+  AND f.cert_date != ''
+  AND LENGTH(f.cert_date) >= 10
+  AND f.cert_date >= '2017-01-01'
+GROUP BY SUBSTR(f.cert_date, 1, 4)
+ORDER BY date_period
+"""
+
+# The film detail endpoint's queries
+FILM_DETAIL_QUERIES = {
+    'film/films': 'SELECT * FROM films WHERE slug = ?1',
+    'film/modifications': ('SELECT m.*, t.description, t.ai_description FROM modifications m JOIN films f ON m.film_id = f.id '
+                           'LEFT JOIN cut_texts t ON t.hash = m.text_hash WHERE f.slug = ?1 ORDER BY m.cut_no'),
+    'film/categories': 'SELECT fc.category_type, fc.category_value, f.id as film_id FROM film_categories fc JOIN films f ON fc.film_id = f.id WHERE f.slug = ?1',
+    'film/analysis': ('SELECT a.*, p.* FROM analysis_results a JOIN films f ON a.film_id = f.id AND a.language = f.language '
+                      'LEFT JOIN analysis_peer_expectations p ON p.peer_genre = a.peer_genre '
+                      'AND p.peer_rating = a.peer_rating AND p.peer_language = a.peer_language WHERE f.slug = ?1'),
+    'film/summary': 'SELECT s.* FROM film_summary s JOIN films f ON s.film_id = f.id WHERE f.slug = ?1',
+    'film/similar': 'SELECT similar_slug, similar_name, similar_year, similar_poster_url, score FROM film_similar WHERE slug = ?1 ORDER BY rank'
+}
+
+# Long text is never copied into a covering index, as that would store it a
+# second time (cut descriptions are kept once, in cut_texts). These free-text
+# columns are always excluded, and so is any TEXT column averaging more bytes
+# than MAX_COVERED_TEXT_LENGTH in the measured data.
+FREE_TEXT_COLUMNS = {('cut_texts', 'description'), ('cut_texts', 'ai_description'), ('films', 'imdb_overview')}
+MAX_COVERED_TEXT_LENGTH = 64
+
+SQL_KEYWORDS = {'on', 'where', 'join', 'left', 'inner', 'group', 'order', 'limit', 'using'}
+
+def load_browse_queries(categories_path=CATEGORIES_TS):
+    """Read each browse category's urlPath and base query from categories.ts."""
+    with open(categories_path, encoding='utf-8') as f:
+        source = f.read()
+    pattern = re.compile(r"urlPath:\s*'([^']+)'.*?dbQuery:\s*`([^`]+)`", re.DOTALL)
+    return {url_path: ' '.join(sql.split()) for url_path, sql in pattern.findall(source)}
+
+def build_query_catalogue(categories_path=CATEGORIES_TS):
+    """Return {name: sql} for the browse list, timeseries and film detail queries."""
+    catalogue = {}
+    for url_path, base in load_browse_queries(categories_path).items():
+        catalogue[f'browse/{url_path}'] = ' '.join(BROWSE_WRAPPER.format(base=base).split())
+        catalogue[f'timeseries/{url_path}'] = ' '.join(TIMESERIES_WRAPPER.format(base=base).split())
+    catalogue.update(FILM_DETAIL_QUERIES)
+    return catalogue
+
+def table_aliases(sql):
+    """Map each alias in the FROM/JOIN clauses to its table."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(\w+))?', sql, re.IGNORECASE):
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+        else:
+            aliases[table] = table
+    return aliases
+
+def query_filter(sql):
+    """Return (table, column, operator) of the query's ?1 filter, or None."""
+    match = re.search(r'(\w+)\.(\w+)\s*(=|LIKE)\s*\?1', sql, re.IGNORECASE)
+    if not match:
+        match = re.search(r'\b(\w+)\s*(=|LIKE)\s*\?1', sql, re.IGNORECASE)
+        table = re.search(r'\bFROM\s+(\w+)', sql, re.IGNORECASE).group(1)
+        return (table, match.group(1), match.group(2).upper()) if match else None
+    alias, column, operator = match.groups()
+    return table_aliases(sql).get(alias, alias), column, operator.upper()
+
+def representative_value(conn, table, column):
+    """Pick the most frequent value of the filter column, the heaviest realistic parameter."""
+    row = conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != '' "
+                       f"GROUP BY {column} ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    return row[0] if row else ''
+
+def candidate_indexes(sql, wide_columns=frozenset()):
+    """
+    Propose covering indexes: for each table filtered on ?1 or joined on a
+    column, an index leading with that column and holding the other columns
+    the query reads from the table, except the (table, column) pairs in
+    wide_columns. Tables read too widely are left out.
+    """
+    aliases = table_aliases(sql)
+    referenced = {}
+    for alias, column in re.findall(r'\b(\w+)\.(\w+)\b', sql):
+        if alias in aliases:
+            referenced.setdefault(aliases[alias], []).append(column)
+
+    lead_columns = []
+    target = query_filter(sql)
+    if target:
+        lead_columns.append(target)
+    for alias, column in re.findall(r'\bON\s+(\w+)\.(\w+)\s*=', sql, re.IGNORECASE):
+        if alias in aliases:
+            lead_columns.append((aliases[alias], column, '='))
+
+    candidates = []
+    for table, column, operator in lead_columns:
+        others = [c for c in dict.fromkeys(referenced.get(table, [])) if c != column and (table, c) not in wide_columns]
+        if len(others) > 3 or column == 'id':
+            continue
+        lead = f"{column} COLLATE NOCASE" if operator == 'LIKE' else column
+        name = f"idx_{table}_{'_'.join([column] + others)}_covering"
+        candidates.append(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join([lead] + others)})")
+    return candidates
+
+def explain(conn, sql, param):
+    """Return the EXPLAIN QUERY PLAN detail lines and the flagged problems."""
+    aliases = table_aliases(sql)
+    details = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (param,))]
+    flags = []
+    for detail in details:
+        # Scans of a subquery's result are expected; scans of a table or a whole index are not
+        scan = re.match(r'SCAN (\w+)', detail)
+        if scan and scan.group(1) in aliases:
+            flags.append(f"full scan of {aliases[scan.group(1)]}")
+        if 'TEMP B-TREE' in detail:
+            flags.append(detail.lower())
+    return details, flags
+
+def time_query(conn, sql, param, repeat):
+    """Median latency of a query in ms."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, (param,)).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2]
+
+def scale_database(conn, factor):
+    """
+    Append factor - 1 renamed copies of every film with its cuts and bridge rows,
+    so plans and timings can be compared at larger data sizes.
+    """
+    max_modification = conn.execute("SELECT COALESCE(MAX(id), 0) FROM modifications").fetchone()[0]
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+        "AND name NOT LIKE 'modifications_fts%'")]
+
+    for table in tables:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if table not in ('films', 'modifications') and 'film_id' not in columns and 'modification_id' not in columns:
+            continue
+        original_rows = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+
+        for copy in range(1, factor):
+            expressions = []
+            for column in columns:
+                if (table == 'films' and column == 'id') or column == 'film_id':
+                    expressions.append(f"{column} || '~{copy}'")
+                elif table == 'films' and column == 'slug':
+                    expressions.append(f"slug || '-{copy}'")
+                elif (table == 'modifications' and column == 'id') or column == 'modification_id':
+                    expressions.append(f"{column} + {copy * max_modification}")
+                else:
+                    expressions.append(column)
+            conn.execute(f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                         f"SELECT {', '.join(expressions)} FROM {table} WHERE rowid <= {original_rows}")
+
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'modifications_fts'").fetchone():
+        conn.execute("INSERT INTO modifications_fts(modifications_fts) VALUES('rebuild')")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+def analyze_scale(db_path, catalogue, repeat):
+    """Plan, flag and time every catalogue query. Returns {name: result}."""
+    conn = sqlite3.connect(db_path)
+    results = {}
+    for name, sql in catalogue.items():
+        target = query_filter(sql)
+        param = representative_value(conn, target[0], target[1]) if target else ''
+        if target and target[2] == 'LIKE':
+            param = f"%{param}%"
+        details, flags = explain(conn, sql, param)
+        results[name] = {'param': param, 'plan': details, 'flags': flags,
+                         'ms': time_query(conn, sql, param, repeat)}
+    conn.close()
+    return results
+
+def index_columns(conn):
+    """Return {table: [column tuples]} of the existing indexes, primary keys included."""
+    indexes = {}
+    for table, index in conn.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'"):
+        columns = tuple(row[2] for row in conn.execute(f"PRAGMA index_info({index})"))
+        indexes.setdefault(table, []).append(columns)
+    return indexes
+
+def wide_text_columns(conn, max_length=MAX_COVERED_TEXT_LENGTH):
+    """Return the free-text (table, column) pairs and those of TEXT columns averaging more than max_length bytes."""
+    wide = set(FREE_TEXT_COLUMNS)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        for row in conn.execute(f"PRAGMA table_info({table})"):
+            column, declared_type = row[1], row[2].upper()
+            if 'TEXT' not in declared_type and 'CHAR' not in declared_type:
+                continue
+            average = conn.execute(f"SELECT AVG(LENGTH(CAST({column} AS BLOB))) FROM {table}").fetchone()[0]
+            if average and average > max_length:
+                wide.add((table, column))
+    return wide
+
+def measure_candidates(db_path, catalogue, baseline, repeat, min_speedup=1.2, min_saving_ms=0.2):
+    """
+    Create each candidate index on its own and keep those that speed up at least
+    one query. Candidates already covered by the prefix of an existing index are
+    skipped, and long TEXT columns are never included.
+    """
+    conn = sqlite3.connect(db_path)
+    wide_columns = wide_text_columns(conn)
+    candidates = {}
+    for name, sql in catalogue.items():
+        for statement in candidate_indexes(sql, wide_columns):
+            candidates.setdefault(statement, []).append(name)
+
+    existing = index_columns(conn)
+    recommendations = []
+    for statement, query_names in candidates.items():
+        index_name, table, column_list = re.search(r'INDEX IF NOT EXISTS (\w+) ON (\w+)\((.+)\)', statement).groups()
+        columns = tuple(column.split()[0] for column in column_list.split(', '))
+        if 'COLLATE' not in column_list and any(found[:len(columns)] == columns for found in existing.get(table, [])):
+            continue
+
+        conn.execute(statement)
+        conn.execute("ANALYZE")
+        improved = []
+        for name in query_names:
+            before = baseline[name]['ms']
+            after = time_query(conn, catalogue[name], baseline[name]['param'], repeat)
+            if after and before / after >= min_speedup and before - after >= min_saving_ms:
+                improved.append((name, before, after, before / after))
+        conn.execute(f"DROP INDEX {index_name}")
+
+        if improved:
+            recommendations.append((statement, improved))
+    conn.close()
+    return recommendations
+
+def print_report(scale_results, recommendations):
+    """Print per-scale latencies and flags, then the measured index recommendations."""
+    scales = list(scale_results)
+    names = list(scale_results[scales[0]])
+    print(f"\n{'query':<28}" + ''.join(f"{'x' + str(s) + ' ms':>12}" for s in scales) + "  flags (largest scale)")
+    for name in names:
+        flags = scale_results[scales[-1]][name]['flags']
+        print(f"{name:<28}" + ''.join(f"{scale_results[s][name]['ms']:>12.2f}" for s in scales) +
+              f"  {'; '.join(flags) if flags else 'ok'}")
+
+    print(f"\nCandidate covering indexes at x{scales[-1]}:")
+    if not recommendations:
+        print("  None measurably faster.")
+    for statement, improved in sorted(recommendations, key=lambda r: -max(i[3] for i in r[1])):
+        print(f"  {statement};")
+        for name, before, after, speedup in improved:
+            print(f"      {name:<28}{before:>9.2f} ms -> {after:>8.2f} ms  ({speedup:.1f}x)")
+
+def run_advisor(csv_path, scales, repeat, categories_path=CATEGORIES_TS, write_sql=None):
+    """Build the local database, analyze the catalogue at each scale and measure candidate indexes."""
+    catalogue = build_query_catalogue(categories_path)
+    scale_results = {}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_db = build_local_db(csv_path, os.path.join(temp_dir, 'base.db'))
+
+        for factor in scales:
+            db_path = os.path.join(temp_dir, f'x{factor}.db')
+            shutil.copy(base_db, db_path)
+            if factor > 1:
+                conn = sqlite3.connect(db_path)
+                scale_database(conn, factor)
+                conn.close()
+            print(f"Analyzing {len(catalogue)} queries at x{factor}...")
+            scale_results[factor] = analyze_scale(db_path, catalogue, repeat)
+
+        largest = os.path.join(temp_dir, f'x{scales[-1]}.db')
+        recommendations = measure_candidates(largest, catalogue, scale_results[scales[-1]], repeat)
+
+    print_report(scale_results, recommendations)
+
+    if write_sql and recommendations:
+        with open(write_sql, 'w', encoding='utf-8') as f:
+            f.write("-- Covering indexes recommended by scripts/query_advisor.py\n")
+            for statement, improved in recommendations:
+                f.write(f"-- {', '.join(name for name, *_ in improved)}\n{statement};\n")
+        print(f"\nWrote {len(recommendations)} index statements to {write_sql}")
+    return scale_results, recommendations
+
+def main():
+    """Main query advisor entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check query plans and latency of the browse API queries")
+    parser.add_argument('csv_file', help='CSV file with film data')
+    parser.add_argument('--scales', default='1,4,16', help='Comma-separated data scale factors')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per query timing')
+    parser.add_argument('--categories', default=CATEGORIES_TS, help='Path to the browse categories.ts')
+    parser.add_argument('--write-sql', help='Write the recommended CREATE INDEX statements to this file')
+    parser.add_argument('--show-plans', action='store_true', help='Print the query plans at the largest scale')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"CSV file not found: {args.csv_file}")
+        return 1
+
+    scales = sorted(int(s) for s in args.scales.split(','))
+    scale_results, _ = run_advisor(args.csv_file, scales, args.repeat, args.categories, args.write_sql)
+
+    if args.show_plans:
+        for name, result in scale_results[scales[-1]].items():
+            print(f"\n{name} (param {result['param']!r}):")
+            for detail in result['plan']:
+                print(f"  {detail}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
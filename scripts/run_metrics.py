@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Run Metrics - Throughput metrics for import and search sync runs
+Per-batch rows, bytes, latency, retries and failures, written as a Prometheus textfile and a JSON summary
+"""
+
+import os
+import json
+import time
+
+# Upper bounds of the batch latency histogram, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRIC_PREFIX = 'cbfc'
+
+def new_run_metrics(job):
+    """Start collecting metrics for one run of job (e.g. 'd1_import')."""
+    return {
+        'job': job,
+        'started_at': time.time(),
+        'start': time.perf_counter(),
+        'duration_seconds': None,
+        'success': None,
+        'batches': []
+    }
+
+def record_batch_metrics(metrics, rows, batch_bytes, seconds, success, retries=0):
+    """Record one batch: rows and bytes sent, latency over all attempts, and retries needed."""
+    metrics['batches'].append({
+        'rows': rows, 'bytes': batch_bytes, 'seconds': round(seconds, 4),
+        'retries': retries, 'success': success
+    })
+
+def finish_run(metrics, success):
+    """Mark the run finished with its outcome."""
+    metrics['duration_seconds'] = time.perf_counter() - metrics['start']
+    metrics['success'] = bool(success)
+
+def percentile(values, pct):
+    """Return the pct percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run_summary(metrics):
+    """Aggregate the recorded batches into the JSON summary."""
+    batches = metrics['batches']
+    latencies = [b['seconds'] for b in batches]
+    rows = sum(b['rows'] for b in batches)
+    total_bytes = sum(b['bytes'] for b in batches)
+    duration = metrics['duration_seconds'] or 0
+
+    return {
+        'job': metrics['job'],
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(metrics['started_at'])),
+        'duration_seconds': round(duration, 3),
+        'success': metrics['success'],
+        'batches': len(batches),
+        'failed_batches': sum(not b['success'] for b in batches),
+        'retries': sum(b['retries'] for b in batches),
+        'rows': rows,
+        'bytes': total_bytes,
+        'rows_per_second': round(rows / duration, 2) if duration else None,
+        'bytes_per_second': round(total_bytes / duration, 2) if duration else None,
+        'batch_seconds': {
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+            'max': max(latencies, default=0.0), 'sum': round(sum(latencies), 3)
+        },
+        'batch_rows_max': max((b['rows'] for b in batches), default=0),
+        'batch_bytes_max': max((b['bytes'] for b in batches), default=0),
+        'batch_details': batches
+    }
+
+def format_prometheus(metrics):
+    """Render the run as Prometheus text exposition format, for the node_exporter textfile collector."""
+    summary = run_summary(metrics)
+    job = metrics['job'].replace('\\', '\\\\').replace('"', '\\"')
+    labels = f'job="{job}"'
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+        for suffix, extra_labels, value in samples:
+            label_text = ','.join([labels] + extra_labels)
+            lines.append(f"{METRIC_PREFIX}_{name}{suffix}{{{label_text}}} {value}")
+
+    metric('run_last_timestamp_seconds', 'gauge', 'Unix time the last run started.',
+           [('', [], int(metrics['started_at']))])
+    metric('run_duration_seconds', 'gauge', 'Wall-clock duration of the last run.',
+           [('', [], summary['duration_seconds'])])
+    metric('run_success', 'gauge', 'Whether the last run succeeded (1) or failed (0).',
+           [('', [], int(bool(summary['success'])))])
+    metric('run_batches', 'gauge', 'Batches sent in the last run, by outcome.',
+           [('', ['status="success"'], summary['batches'] - summary['failed_batches']),
+            ('', ['status="failed"'], summary['failed_batches'])])
+    metric('run_retries', 'gauge', 'Batch retries in the last run.', [('', [], summary['retries'])])
+    metric('run_rows', 'gauge', 'Rows or documents sent in the last run.', [('', [], summary['rows'])])
+    metric('run_bytes', 'gauge', 'Bytes sent in the last run.', [('', [], summary['bytes'])])
+
+    latencies = [b['seconds'] for b in metrics['batches']]
+    buckets = [('_bucket', [f'le="{bound}"'], sum(s <= bound for s in latencies)) for bound in LATENCY_BUCKETS]
+    buckets.append(('_bucket', ['le="+Inf"'], len(latencies)))
+    metric('run_batch_duration_seconds', 'histogram', 'Batch latency in the last run.',
+           buckets + [('_sum', [], summary['batch_seconds']['sum']), ('_count', [], len(latencies))])
+
+    return '\n'.join(lines) + '\n'
+
+def write_run_metrics(metrics, metrics_dir):
+    """Write <job>.prom and <job>.json to metrics_dir. Returns the two paths."""
+    os.makedirs(metrics_dir, exist_ok=True)
+    prom_path = os.path.join(metrics_dir, f"{metrics['job']}.prom")
+    json_path = os.path.join(metrics_dir, f"{metrics['job']}.json")
+
+    # The textfile collector may read at any time, so replace the file in one step
+    with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(format_prometheus(metrics))
+    os.replace(prom_path + '.tmp', prom_path)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(run_summary(metrics), f, indent=2)
+
+    print(f"Run metrics written to {prom_path} and {json_path}")
+    return prom_path, json_path
@@ -6,16 +6,54 @@ Streamlined search indexing with comprehensive field mapping
 
 import sys
 import os
+import re
+import gzip
 import json
+import shutil
+import time
+import tempfile
 import requests
+from array import array
+from collections import deque
 
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from film_utils import *
-
-def create_search_schema():
+from film_utils import (DEFAULT_SLUG_REGISTRY, assign_group_slugs, calculate_popularity_score, clean_name,
+                        completeness_score, iter_film_groups, load_and_group_films, parse_date_to_timestamp,
+                        register_group_slugs, safe_float, safe_int, scan_film_groups, split_delimited_values)
+from run_metrics import new_run_metrics, record_batch_metrics, finish_run, write_run_metrics
+
+# Fields the search page requests facets for (search-fields.ts FACETABLE_FIELDS)
+SEARCH_FACET_FIELDS = {
+    'language', 'imdb_genres', 'imdb_directors', 'imdb_actors', 'imdb_countries',
+    'ai_actions', 'ai_content_types', 'rating', 'year', 'modification_count', 'imdb_rating',
+    'imdb_votes', 'popularity_score', 'click_count', 'has_poster', 'cert_date_timestamp',
+    'imdb_release_date'
+}
+
+# Fields the search page never queries, filters, facets or highlights; slim
+# documents still store them for display
+SEARCH_UNINDEXED_FIELDS = {'slug', 'duration_mins', 'imdb_id', 'ai_media_elements', 'searchable_content'}
+
+# Default per-field character budgets for slim documents. ai_cleaned_descriptions
+# is queried by the search page and feeds the embeddings, so it is only
+# deduplicated unless a budget is given with --budget.
+SLIM_TEXT_BUDGETS = {
+    'imdb_overview': 1000,
+    'modification_descriptions': 4000,
+    'ai_cleaned_descriptions': None,
+    'searchable_content': 1500
+}
+
+# Rough in-memory cost per byte of field text: token index and postings,
+# plus facet hash maps where the field is faceted
+INDEX_BYTES_PER_TEXT_BYTE = 2.0
+FACET_BYTES_PER_TEXT_BYTE = 1.5
+NUMERIC_INDEX_BYTES = 16
+
+def create_search_schema(slim=False):
     """Define Typesense schema for film search."""
-    return {
+    schema = {
         'name': 'films',
         'fields': [
             # Basic film info
@@ -62,82 +100,145 @@ def create_search_schema():
         'default_sorting_field': 'popularity_score'
     }
 
-def recalculate_proportional_popularity(documents):
-    """Recalculate popularity scores to ensure proportional language representation."""
-    # Define the proportional representation for every 17 films
-    language_proportions = {
-        'english': 4, 
-        'hindi': 4,
-        'tamil': 2,
-        'telugu': 2,
-        'kannada': 2,
-        'malayalam': 2,
-        'other': 1
-    }
-    
-    # Classify languages into categories
-    def classify_language(languages):
-        if not languages:
-            return 'other'
-        
-        # Take the first language
-        primary_lang = languages[0].lower().rstrip()
-        
-        if primary_lang in ['english']:
-            return 'english'
-        elif primary_lang in ['hindi']:
-            return 'hindi'
-        elif primary_lang in ['tamil']:
-            return 'tamil'
-        elif primary_lang in ['telugu']:
-            return 'telugu'
-        elif primary_lang in ['kannada']:
-            return 'kannada'
-        elif primary_lang in ['malayalam']:
-            return 'malayalam'
-        else:
-            return 'other'
-    
-    # Group documents by language category and sort by original popularity
+    if slim:
+        # Only keep the indexes and facets the search page actually uses
+        for field in schema['fields']:
+            if field.get('facet') and field['name'] not in SEARCH_FACET_FIELDS:
+                field['facet'] = False
+            if field['name'] in SEARCH_UNINDEXED_FIELDS:
+                field['index'] = False
+    return schema
+
+def dedupe_texts(texts):
+    """Drop repeated cut text (e.g. the same cut listed for each dubbed version)."""
+    seen = set()
+    unique = []
+    for text in texts:
+        key = re.sub(r'[\W_]+', ' ', text.lower()).strip()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(text)
+    return unique
+
+def parse_text_budget(value):
+    """Parse a FIELD=CHARS --budget value into (field, chars)."""
+    import argparse
+
+    field, _, chars = value.partition('=')
+    if field not in SLIM_TEXT_BUDGETS:
+        raise argparse.ArgumentTypeError(f"unknown field '{field}' (choose from {', '.join(SLIM_TEXT_BUDGETS)})")
+    if not chars.isdigit() or int(chars) <= 0:
+        raise argparse.ArgumentTypeError(f"budget for {field} must be a positive number of characters, not '{chars}'")
+    return field, int(chars)
+
+def truncate_text(text, budget):
+    """Truncate text to a character budget at a word boundary."""
+    if budget is None or len(text) <= budget:
+        return text
+    return text[:budget].rsplit(' ', 1)[0]
+
+def estimate_index_memory(documents, schema):
+    """Estimate Typesense index memory in bytes per field."""
+    fields = {field['name']: field for field in schema['fields']}
+    estimates = {}
+
+    for name, field in fields.items():
+        if field.get('embed') or field.get('index') is False:
+            continue
+        if not field['type'].startswith('string'):
+            estimates[name] = NUMERIC_INDEX_BYTES * len(documents) * (2 if field.get('facet') else 1)
+            continue
+
+        text_bytes = 0
+        for doc in documents:
+            value = doc.get(name, '')
+            values = value if isinstance(value, list) else [value]
+            text_bytes += sum(len(str(v).encode('utf-8')) for v in values)
+
+        factor = INDEX_BYTES_PER_TEXT_BYTE + (FACET_BYTES_PER_TEXT_BYTE if field.get('facet') else 0)
+        estimates[name] = int(text_bytes * factor)
+
+    return estimates
+
+def print_index_report(full_documents, slim_documents, text_budgets):
+    """Print estimated index memory per field for full vs slim documents."""
+    full = estimate_index_memory(full_documents, create_search_schema())
+    slim = estimate_index_memory(slim_documents, create_search_schema(slim=True))
+
+    print(f"{'field':<28}{'full MB':>10}{'slim MB':>10}{'at budget':>11}")
+    for name in sorted(full, key=full.get, reverse=True):
+        budget = text_budgets.get(name)
+        at_budget = sum(1 for doc in slim_documents if budget and len(doc.get(name, '')) >= budget * 0.9)
+        print(f"{name:<28}{full[name] / 1e6:>10.2f}{slim.get(name, 0) / 1e6:>10.2f}{at_budget:>11}")
+
+    full_total = sum(full.values())
+    slim_total = sum(slim.values())
+    print(f"{'total':<28}{full_total / 1e6:>10.2f}{slim_total / 1e6:>10.2f}")
+    if full_total:
+        print(f"Estimated index memory saved: {100 * (1 - slim_total / full_total):.1f}% (embeddings not included)")
+
+# Proportional representation of language categories in every 17 ranked films
+LANGUAGE_PROPORTIONS = {
+    'english': 4,
+    'hindi': 4,
+    'tamil': 2,
+    'telugu': 2,
+    'kannada': 2,
+    'malayalam': 2,
+    'other': 1
+}
+LANGUAGE_CATEGORIES = list(LANGUAGE_PROPORTIONS)
+RANKING_GROUP_SIZE = 17
+
+def classify_language(languages):
+    """Return the language category code for a film's IMDb languages."""
+    if not languages:
+        return LANGUAGE_CATEGORIES.index('other')
+
+    # Take the first language
+    primary_lang = languages[0].lower().rstrip()
+    if primary_lang in LANGUAGE_PROPORTIONS:
+        return LANGUAGE_CATEGORIES.index(primary_lang)
+    return LANGUAGE_CATEGORIES.index('other')
+
+def rank_proportional_popularity(language_codes, scores):
+    """Recalculate popularity scores to ensure proportional language representation.
+
+    Works on compact per-document arrays (language category code and base score,
+    in document order) and returns the new scores in the same order.
+    """
+    # Group document positions by language category and sort by original popularity
     language_groups = {}
-    for doc in documents:
-        lang_category = classify_language(doc['imdb_languages'])
-        if lang_category not in language_groups:
-            language_groups[lang_category] = []
-        language_groups[lang_category].append(doc)
-    
-    # Sort each language group by original popularity (descending)
+    for position, code in enumerate(language_codes):
+        language_groups.setdefault(LANGUAGE_CATEGORIES[code], []).append(position)
     for lang_category in language_groups:
-        language_groups[lang_category].sort(key=lambda x: x['popularity_score'], reverse=True)
-    
-    # Recalculate popularity scores with proportional representation
-    total_films = len(documents)
+        language_groups[lang_category].sort(key=lambda position: scores[position], reverse=True)
+        language_groups[lang_category] = deque(language_groups[lang_category])
+
+    total_films = len(scores)
+    ranked_scores = array('d', bytes(8 * total_films))
     current_popularity = total_films  # Start from highest score
-    
-    # Process in groups of 17
-    group_size = 17
     processed_count = 0
-    
+
     while processed_count < total_films:
         # Determine how many films to process in this group
-        remaining_films = total_films - processed_count
-        current_group_size = min(group_size, remaining_films)
-        
+        current_group_size = min(RANKING_GROUP_SIZE, total_films - processed_count)
+
         # Calculate proportional allocation for this group
         group_allocations = {}
         total_allocated = 0
-        
-        for lang, proportion in language_proportions.items():
+
+        for lang, proportion in LANGUAGE_PROPORTIONS.items():
             if lang in language_groups and language_groups[lang]:
                 # Scale proportion based on current group size
                 allocated = min(
-                    int(proportion * current_group_size / group_size),
+                    int(proportion * current_group_size / RANKING_GROUP_SIZE),
                     len(language_groups[lang]),  # Don't allocate more than available
                     current_group_size - total_allocated  # Don't exceed group size
                 )
                 group_allocations[lang] = allocated
                 total_allocated += allocated
-        
+
         # Fill remaining slots with available films
         remaining_slots = current_group_size - total_allocated
         for lang in language_groups:
@@ -145,129 +246,152 @@ def recalculate_proportional_popularity(documents):
                 break
             if lang not in group_allocations:
                 group_allocations[lang] = 0
-            
+
             available = len(language_groups[lang])
             additional = min(remaining_slots, available - group_allocations[lang])
             if additional > 0:
                 group_allocations[lang] += additional
                 remaining_slots -= additional
 
-        
         # Assign popularity scores for this group
         for lang, allocation in group_allocations.items():
-            for i in range(allocation):
+            for _ in range(allocation):
                 if language_groups[lang]:
-                    doc = language_groups[lang].pop(0)
-                    doc['popularity_score'] = current_popularity
+                    ranked_scores[language_groups[lang].popleft()] = current_popularity
                     current_popularity -= 1
                     processed_count += 1
-            
-    return documents
-
-def prepare_search_documents(csv_file):
-    """Transform CSV data into Typesense documents."""
-    groups, _ = load_and_group_films(csv_file)
-    if not groups:
-        return []
-
-    documents = []
-    used_slugs = set()
 
-    print(f"Processing {len(groups)} unique films for search...")
-
-    for (name_key, year), film_rows in groups.items():  
-        best_row = max(film_rows, key=completeness_score)
-
-        # Generate unique slug
-        base_slug = make_slug(best_row.get('movie_name', ''), year)
-        slug = base_slug
-        counter = 1
-        while slug in used_slugs:
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        used_slugs.add(slug)
-
-        # Collect data from all film versions
-        languages = set()
-        mod_descriptions = []
-        ai_cleaned_descriptions = []
-        ai_actions = set()
-        ai_content_types = set()
-        ai_media_elements = set()
-
-        for row in film_rows:
-            if row.get('language'):
-                languages.add(row['language'].strip())
-            if row.get('description'):
-                mod_descriptions.append(row['description'])
-            if row.get('ai_cleaned_description'):
-                ai_cleaned_descriptions.append(row['ai_cleaned_description'])
-            if row.get('ai_action'):
-                ai_actions.update(split_delimited_values(row['ai_action']))
-            if row.get('ai_content_types'):
-                ai_content_types.update(split_delimited_values(row['ai_content_types']))
-            if row.get('ai_media_element'):
-                ai_media_elements.update(split_delimited_values(row['ai_media_element']))
-
-        # Build comprehensive searchable content
-        searchable_parts = [
-            clean_name(best_row.get('movie_name', '')),
-            ' '.join(languages),
-            best_row.get('imdb_overview', ''),
-            ' '.join(mod_descriptions),
-            ' '.join(ai_cleaned_descriptions),
-            ' '.join(split_delimited_values(best_row.get('imdb_genres', ''))),
-            ' '.join(split_delimited_values(best_row.get('imdb_directors', ''))),
-            ' '.join(split_delimited_values(best_row.get('imdb_actors', ''))[:10])  # Limit actors
-        ]
-
-        # Calculate popularity for sorting order
-        popularity = calculate_popularity_score(
-            imdb_votes=safe_int(best_row.get('imdb_votes', 0)),
-            imdb_rating=best_row.get('imdb_rating')
-        )
+    return ranked_scores
 
-        doc = {
-            'id': best_row.get('id', slug),
-            'slug': slug,
-            'name': clean_name(best_row.get('movie_name', '')),
-            'year': safe_int(year),
-            'language': sorted(list(languages)) if languages else [best_row.get('language', '')],
-            'rating': best_row.get('rating', ''),
-            'duration_mins': safe_float(best_row.get('duration_secs', 0)) / 60.0,
+def recalculate_proportional_popularity(documents):
+    """Recalculate popularity scores to ensure proportional language representation."""
+    language_codes = array('B', (classify_language(doc['imdb_languages']) for doc in documents))
+    scores = array('d', (doc['popularity_score'] for doc in documents))
+    for doc, score in zip(documents, rank_proportional_popularity(language_codes, scores)):
+        doc['popularity_score'] = int(score)
+    return documents
 
-            # IMDB data
-            'imdb_id': best_row.get('imdb_id', ''),
-            'imdb_rating': safe_float(best_row.get('imdb_rating')),
-            'imdb_votes': safe_int(best_row.get('imdb_votes', 0)),
-            'imdb_overview': best_row.get('imdb_overview', ''),
-            'imdb_genres': split_delimited_values(best_row.get('imdb_genres', '')),
-            'imdb_directors': split_delimited_values(best_row.get('imdb_directors', '')),
-            'imdb_actors': split_delimited_values(best_row.get('imdb_actors', ''))[:15],
-            'imdb_countries': split_delimited_values(best_row.get('imdb_countries', '')),
-            'imdb_release_date': parse_date_to_timestamp(best_row.get('imdb_release_date')),
-            'imdb_languages': split_delimited_values(best_row.get('imdb_languages', '')),
-            'poster_url': best_row.get('imdb_poster_url', ''),
+def iter_search_documents(groups, group_slugs, slim=False, text_budgets=None):
+    """Yield one Typesense document per (group key, rows) pair, with its base popularity score."""
+    for group_key, film_rows in groups:
+        yield build_search_document(group_key, film_rows, group_slugs, slim, text_budgets)
+
+def build_search_document(group_key, film_rows, group_slugs, slim=False, text_budgets=None):
+    """Build a film group's Typesense document, with its base popularity score.
+
+    With slim=True, cut text repeated across language versions is stored once,
+    searchable_content no longer repeats the overview and cut text, and text
+    fields are truncated to text_budgets (SLIM_TEXT_BUDGETS by default).
+    """
+    name_key, year = group_key
+    best_row = max(film_rows, key=completeness_score)
+
+    slug = group_slugs[(name_key, year)]
+
+    # Collect data from all film versions
+    languages = set()
+    mod_descriptions = []
+    ai_cleaned_descriptions = []
+    ai_actions = set()
+    ai_content_types = set()
+    ai_media_elements = set()
+
+    for row in film_rows:
+        if row.get('language'):
+            languages.add(row['language'].strip())
+        if row.get('description'):
+            mod_descriptions.append(row['description'])
+        if row.get('ai_cleaned_description'):
+            ai_cleaned_descriptions.append(row['ai_cleaned_description'])
+        if row.get('ai_action'):
+            ai_actions.update(split_delimited_values(row['ai_action']))
+        if row.get('ai_content_types'):
+            ai_content_types.update(split_delimited_values(row['ai_content_types']))
+        if row.get('ai_media_element'):
+            ai_media_elements.update(split_delimited_values(row['ai_media_element']))
+
+    modification_count = len(mod_descriptions)
+    if slim:
+        mod_descriptions = dedupe_texts(mod_descriptions)
+        ai_cleaned_descriptions = dedupe_texts(ai_cleaned_descriptions)
+
+    # Build comprehensive searchable content
+    searchable_parts = [
+        clean_name(best_row.get('movie_name', '')),
+        ' '.join(languages),
+        best_row.get('imdb_overview', ''),
+        ' '.join(mod_descriptions),
+        ' '.join(ai_cleaned_descriptions),
+        ' '.join(split_delimited_values(best_row.get('imdb_genres', ''))),
+        ' '.join(split_delimited_values(best_row.get('imdb_directors', ''))),
+        ' '.join(split_delimited_values(best_row.get('imdb_actors', ''))[:10])  # Limit actors
+    ]
+    if slim:
+        # Overview and cut text already have their own indexed fields
+        searchable_parts = searchable_parts[:2] + searchable_parts[5:]
+
+    # Calculate popularity for sorting order
+    popularity = calculate_popularity_score(
+        imdb_votes=safe_int(best_row.get('imdb_votes', 0)),
+        imdb_rating=best_row.get('imdb_rating')
+    )
+
+    doc = {
+        'id': best_row.get('id', slug),
+        'slug': slug,
+        'name': clean_name(best_row.get('movie_name', '')),
+        'year': safe_int(year),
+        'language': sorted(list(languages)) if languages else [best_row.get('language', '')],
+        'rating': best_row.get('rating', ''),
+        'duration_mins': safe_float(best_row.get('duration_secs', 0)) / 60.0,
+
+        # IMDB data
+        'imdb_id': best_row.get('imdb_id', ''),
+        'imdb_rating': safe_float(best_row.get('imdb_rating')),
+        'imdb_votes': safe_int(best_row.get('imdb_votes', 0)),
+        'imdb_overview': best_row.get('imdb_overview', ''),
+        'imdb_genres': split_delimited_values(best_row.get('imdb_genres', '')),
+        'imdb_directors': split_delimited_values(best_row.get('imdb_directors', '')),
+        'imdb_actors': split_delimited_values(best_row.get('imdb_actors', ''))[:15],
+        'imdb_countries': split_delimited_values(best_row.get('imdb_countries', '')),
+        'imdb_release_date': parse_date_to_timestamp(best_row.get('imdb_release_date')),
+        'imdb_languages': split_delimited_values(best_row.get('imdb_languages', '')),
+        'poster_url': best_row.get('imdb_poster_url', ''),
+
+        # Censorship data
+        'modification_count': modification_count,
+        'modification_descriptions': ' '.join(mod_descriptions),
+        'ai_cleaned_descriptions': ' '.join(ai_cleaned_descriptions),
+
+        # AI tags
+        'ai_actions': sorted(list(ai_actions)),
+        'ai_content_types': sorted(list(ai_content_types)),
+        'ai_media_elements': sorted(list(ai_media_elements)),
+
+        # Search fields
+        'searchable_content': ' '.join([p for p in searchable_parts if p]).strip(),
+        'popularity_score': popularity,
+        'click_count': 0,
+        'has_poster': bool(best_row.get('imdb_poster_url', '').strip()),
+        'cert_date_timestamp': parse_date_to_timestamp(best_row.get('cert_date'))
+    }
 
-            # Censorship data
-            'modification_count': len(mod_descriptions),
-            'modification_descriptions': ' '.join(mod_descriptions),
-            'ai_cleaned_descriptions': ' '.join(ai_cleaned_descriptions),
+    if slim:
+        budgets = SLIM_TEXT_BUDGETS if text_budgets is None else text_budgets
+        for field, budget in budgets.items():
+            doc[field] = truncate_text(doc[field], budget)
 
-            # AI tags
-            'ai_actions': sorted(list(ai_actions)),
-            'ai_content_types': sorted(list(ai_content_types)),
-            'ai_media_elements': sorted(list(ai_media_elements)),
+    return doc
 
-            # Search fields
-            'searchable_content': ' '.join([p for p in searchable_parts if p]).strip(),
-            'popularity_score': popularity,
-            'click_count': 0,
-            'has_poster': bool(best_row.get('imdb_poster_url', '').strip()),
-            'cert_date_timestamp': parse_date_to_timestamp(best_row.get('cert_date'))
-        }
+def prepare_search_documents(csv_file, slug_registry=None, slim=False, text_budgets=None):
+    """Transform CSV data into a list of Typesense documents."""
+    groups, _ = load_and_group_films(csv_file)
+    if not groups:
+        return []
 
-        documents.append(doc)
+    group_slugs = assign_group_slugs(groups, slug_registry)
+    print(f"Processing {len(groups)} unique films for search...")
+    documents = list(iter_search_documents(groups.items(), group_slugs, slim, text_budgets))
 
     # Recalculate popularity scores for proportional language representation
     print("Recalculating popularity scores for proportional language representation...")
@@ -275,8 +399,90 @@ def prepare_search_documents(csv_file):
     
     return documents
 
-def sync_to_typesense(documents, protocol, host, api_key):
+def write_document_spool(documents, spool_path):
+    """Write documents once to a JSONL spool (gzip if the path ends in .gz).
+
+    popularity_score is left out of each line and returned, with the language
+    category codes, as compact arrays for re-ranking. Returns (codes, scores).
+    """
+    language_codes = array('B')
+    scores = array('d')
+
+    with open_spool(spool_path, 'wt') as f:
+        for doc in documents:
+            language_codes.append(classify_language(doc['imdb_languages']))
+            scores.append(doc.pop('popularity_score'))
+            f.write(json.dumps(doc, ensure_ascii=False))
+            f.write('\n')
+
+    return language_codes, scores
+
+def write_search_spool(csv_file, spool_path, slug_registry=None, slim=False, text_budgets=None):
+    """
+    Spool the documents of a CSV and rank their popularity. Returns the ranked
+    scores, in spool order; documents and scores match prepare_search_documents.
+    """
+    # Groups are streamed in a second pass over the CSV and turned into documents as
+    # they complete, so the raw rows are never all held at once. They come out in
+    # load_and_group_films order, which the popularity ranking's tie-breaks depend on
+    group_index = scan_film_groups(csv_file)
+    group_slugs = register_group_slugs(((group_key, entry[2], entry[3]) for group_key, entry in group_index.items()),
+                                       slug_registry)
+
+    print(f"Writing {len(group_index)} documents to {spool_path}...")
+    groups = iter_film_groups(csv_file, group_index, lambda group_key, film_rows: build_search_document(
+        group_key, film_rows, group_slugs, slim, text_budgets))
+    language_codes, scores = write_document_spool((doc for _, doc in groups), spool_path)
+    if not scores:
+        return scores
+
+    # Recalculate popularity scores for proportional language representation
+    print("Recalculating popularity scores for proportional language representation...")
+    return rank_proportional_popularity(language_codes, scores)
+
+def open_spool(spool_path, mode):
+    """Open a spool file, compressed if the path ends in .gz."""
+    if spool_path.endswith('.gz'):
+        return gzip.open(spool_path, mode, encoding='utf-8')
+    return open(spool_path, mode, encoding='utf-8')
+
+def iter_spool_batches(spool_path, popularity_scores, batch_size):
+    """Stream (document_count, JSONL bytes) batches from a spool, adding final popularity scores."""
+    lines = []
+    with open_spool(spool_path, 'rt') as f:
+        for position, line in enumerate(f):
+            # Each line is a JSON object; append the ranked score without re-parsing it
+            lines.append(f'{line.rstrip()[:-1]}, "popularity_score": {int(popularity_scores[position])}}}')
+            if len(lines) >= batch_size:
+                yield len(lines), '\n'.join(lines).encode('utf-8')
+                lines = []
+    if lines:
+        yield len(lines), '\n'.join(lines).encode('utf-8')
+
+def iter_document_batches(documents, batch_size):
+    """Yield (document_count, JSONL bytes) batches from a list of documents."""
+    for i in range(0, len(documents), batch_size):
+        batch = documents[i:i+batch_size]
+        yield len(batch), '\n'.join(json.dumps(doc, ensure_ascii=False) for doc in batch).encode('utf-8')
+
+def sync_to_typesense(documents, protocol, host, api_key, slim=False, batch_size=20, metrics=None, retries=0):
     """Upload documents to Typesense."""
+    return sync_batches_to_typesense(iter_document_batches(documents, batch_size), len(documents),
+                                     protocol, host, api_key, slim, metrics, retries)
+
+def sync_spool_to_typesense(spool_path, popularity_scores, protocol, host, api_key, slim=False, batch_size=20,
+                            metrics=None, retries=0):
+    """Stream a document spool to Typesense."""
+    return sync_batches_to_typesense(iter_spool_batches(spool_path, popularity_scores, batch_size),
+                                     len(popularity_scores), protocol, host, api_key, slim, metrics, retries)
+
+def sync_batches_to_typesense(batches, total_documents, protocol, host, api_key, slim=False, metrics=None,
+                              retries=0):
+    """Recreate the collection and import (document_count, JSONL bytes) batches.
+
+    A batch the server rejects is retried up to retries times; each batch is
+    recorded in metrics.
+    """
     headers = {'X-TYPESENSE-API-KEY': api_key, 'Content-Type': 'application/json'}
     base_url = f"{protocol}://{host}"
 
@@ -284,7 +490,7 @@ def sync_to_typesense(documents, protocol, host, api_key):
     requests.delete(f"{base_url}/collections/films", headers=headers)
 
     # Create new collection
-    schema = create_search_schema()
+    schema = create_search_schema(slim)
     response = requests.post(f"{base_url}/collections", json=schema, headers=headers)
 
     if response.status_code != 201:
@@ -293,24 +499,29 @@ def sync_to_typesense(documents, protocol, host, api_key):
 
     print(f"Collection created successfully")
 
-    batch_size = 20
     total_uploaded = 0
 
-    for i in range(0, len(documents), batch_size):
-        batch = documents[i:i+batch_size]
-        data = '\n'.join(json.dumps(doc, ensure_ascii=False) for doc in batch)
-
-        response = requests.post(
-            f"{base_url}/collections/films/documents/import",
-            data=data.encode('utf-8'),
-            headers={'X-TYPESENSE-API-KEY': api_key, 'Content-Type': 'text/plain'}
-        )
+    for batch_number, (count, data) in enumerate(batches, 1):
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            if attempt:
+                print(f"Retrying batch {batch_number} (attempt {attempt + 1}/{retries + 1})...")
+            response = requests.post(
+                f"{base_url}/collections/films/documents/import",
+                data=data,
+                headers={'X-TYPESENSE-API-KEY': api_key, 'Content-Type': 'text/plain'}
+            )
+            if response.status_code == 200:
+                break
+        if metrics:
+            record_batch_metrics(metrics, count, len(data), time.perf_counter() - start,
+                                 response.status_code == 200, attempt)
 
         if response.status_code == 200:
-            total_uploaded += len(batch)
-            print(f"✅ Uploaded batch {min(i + batch_size, len(documents))}/{len(documents)}")
+            total_uploaded += count
+            print(f"✅ Uploaded batch {total_uploaded}/{total_documents}")
         else:
-            print(f"❌ Batch {i//batch_size + 1} failed: {response.status_code} - {response.text}")
+            print(f"❌ Batch {batch_number} failed: {response.status_code} - {response.text}")
             return False
 
     print(f"🎉 Successfully uploaded {total_uploaded} films to Typesense")
@@ -341,12 +552,37 @@ def main():
 
     parser = argparse.ArgumentParser(description="Sync film data to Typesense search engine")
     parser.add_argument('csv_file', help='CSV file with film data')
-    parser.add_argument('protocol', help='Protocol (http/https)')
-    parser.add_argument('host', help='Typesense host')
-    parser.add_argument('api_key', help='Typesense API key')
+    parser.add_argument('protocol', nargs='?', help='Protocol (http/https)')
+    parser.add_argument('host', nargs='?', help='Typesense host')
+    parser.add_argument('api_key', nargs='?', help='Typesense API key')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+
+    parser.add_argument('--batch-size', type=int, default=20, help='Documents per import request')
+    parser.add_argument('--retries', type=int, default=0, help='Retries for a failed import request')
+    parser.add_argument('--metrics-dir', help='Write search_sync.prom and search_sync.json run metrics to this directory')
+    parser.add_argument('--spool', help='Keep the JSONL document spool at this path (.gz to compress)')
+    parser.add_argument('--compress-spool', action='store_true', help='Gzip the temporary document spool')
+    parser.add_argument('--slim', action='store_true', help='Deduplicate cut text and apply per-field text budgets')
+    parser.add_argument('--budget', action='append', default=[], metavar='FIELD=CHARS', type=parse_text_budget,
+                        help=f"Override a slim text budget (repeatable); fields: {', '.join(SLIM_TEXT_BUDGETS)}")
+    parser.add_argument('--report', action='store_true',
+                        help='Print estimated index memory per field for full vs slim documents and exit')
 
     args = parser.parse_args()
 
+    text_budgets = dict(SLIM_TEXT_BUDGETS)
+    text_budgets.update(args.budget)
+
+    if args.report:
+        if not os.path.exists(args.csv_file):
+            print(f"CSV file not found: {args.csv_file}")
+            sys.exit(1)
+        # In-memory slug registry: the report is read-only
+        print_index_report(prepare_search_documents(args.csv_file),
+                           prepare_search_documents(args.csv_file, None, True, text_budgets),
+                           text_budgets)
+        sys.exit(0)
+
     # Validate required arguments
     if not args.protocol:
         print("Error: TYPESENSE_PROTOCOL environment variable not set")
@@ -363,15 +599,27 @@ def main():
         sys.exit(1)
 
     print("Preparing search documents...")
-    documents = prepare_search_documents(args.csv_file)
-
-
-    if not documents:
+    metrics = new_run_metrics('search_sync')
+    spool_dir = None
+    spool_path = args.spool
+    if not spool_path:
+        spool_dir = tempfile.mkdtemp(prefix='search_sync_')
+        spool_path = os.path.join(spool_dir, 'documents.jsonl.gz' if args.compress_spool else 'documents.jsonl')
+
+    scores = write_search_spool(args.csv_file, spool_path, args.slug_registry, args.slim, text_budgets)
+    if not scores:
         print("No documents to upload")
         sys.exit(1)
 
-    print(f"Syncing {len(documents)} documents to Typesense...")
-    success = sync_to_typesense(documents, args.protocol, args.host, args.api_key)
+    print(f"Syncing {len(scores)} documents to Typesense...")
+    success = sync_spool_to_typesense(spool_path, scores, args.protocol, args.host, args.api_key,
+                                      args.slim, args.batch_size, metrics, args.retries)
+    if spool_dir:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    finish_run(metrics, success)
+    if args.metrics_dir:
+        write_run_metrics(metrics, args.metrics_dir)
 
     if success:
         print("Search sync completed successfully!")
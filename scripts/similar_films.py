@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Similar Films - Precompute each film's nearest neighbours by censorship profile
+TF-IDF over the cleaned cut descriptions plus AI action/content/media tags, with blocked sparse top-k search
+"""
+
+import sys
+import os
+import re
+import json
+import math
+import time
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import (DEFAULT_SLUG_REGISTRY, assign_group_slugs, clean_name, completeness_score,
+                        load_and_group_films, safe_int, split_delimited_values, sql_value)
+
+DEFAULT_TOP_K = 10
+DEFAULT_MIN_SCORE = 0.05
+# Share of the similarity from the tag profile; the rest comes from the cut text
+DEFAULT_TAG_WEIGHT = 0.4
+# Memory for one block of dense similarity rows (block rows x films x 4 bytes)
+BLOCK_BYTES = 256 * 1024 * 1024
+# Highest document frequency columns multiplied densely (films x columns x 4 bytes)
+DENSE_COLUMNS = 512
+# Films per SQL file, each with up to top-k rows
+SQL_FILMS_PER_FILE = 5000
+
+# Terms kept must appear in at least MIN_DF films and at most MAX_DF_FRACTION of them
+MIN_DF = 2
+MAX_DF_FRACTION = 0.5
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9']{2,}")
+STOP_WORDS = frozenset("""
+the and for with from that this are was were has have had its into onto over under been being their there
+which where when while who whom what all any also but not off out per via scene scenes shot shots film
+""".split())
+
+TAG_COLUMNS = {'action': 'ai_action', 'content': 'ai_content_types', 'media': 'ai_media_element'}
+
+def tokenize(text):
+    """Lowercase word tokens of a description, without stop words."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def collect_film_profiles(groups, group_slugs):
+    """
+    Return (film entries, text term counts, tag counts) per film group. Cut text
+    repeated across language versions counts once; tags count once per cut.
+    """
+    films, text_counts, tag_counts = [], [], []
+    for (name_key, year), film_rows in groups.items():
+        best_row = max(film_rows, key=completeness_score)
+        terms, tags = {}, {}
+        seen_texts = set()
+
+        for row in film_rows:
+            if not row.get('description'):
+                continue
+            text = row.get('ai_cleaned_description') or row['description']
+            if text not in seen_texts:
+                seen_texts.add(text)
+                for token in tokenize(text):
+                    terms[token] = terms.get(token, 0) + 1
+            for prefix, column in TAG_COLUMNS.items():
+                for value in split_delimited_values(row.get(column, '')):
+                    tag = f"{prefix}:{value.strip()}"
+                    tags[tag] = tags.get(tag, 0) + 1
+
+        if not terms and not tags:
+            continue
+        films.append({
+            'slug': group_slugs[(name_key, year)],
+            'name': clean_name(best_row.get('movie_name', '')),
+            'year': safe_int(year),
+            'poster_url': best_row.get('imdb_poster_url', '')
+        })
+        text_counts.append(terms)
+        tag_counts.append(tags)
+    return films, text_counts, tag_counts
+
+def tfidf_matrix(counts, min_df=1, max_df_fraction=1.0):
+    """
+    Build an L2-normalised sublinear TF-IDF CSR matrix from per-film term counts,
+    keeping terms within the document frequency bounds. Returns (matrix, vocabulary).
+    """
+    n_films = len(counts)
+    document_frequency = {}
+    for terms in counts:
+        for term in terms:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    max_df = max(min_df, int(max_df_fraction * n_films))
+    vocabulary = sorted(term for term, df in document_frequency.items() if min_df <= df <= max_df)
+    columns = {term: i for i, term in enumerate(vocabulary)}
+    idf = np.array([math.log((1 + n_films) / (1 + document_frequency[term])) + 1 for term in vocabulary])
+
+    indptr, indices, data = [0], [], []
+    for terms in counts:
+        for term, count in terms.items():
+            column = columns.get(term)
+            if column is not None:
+                indices.append(column)
+                data.append((1 + math.log(count)) * idf[column])
+        indptr.append(len(indices))
+
+    matrix = sp.csr_matrix((np.array(data, dtype=np.float32), indices, indptr), shape=(n_films, len(vocabulary)))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sp.diags(1 / norms).astype(np.float32) @ matrix, vocabulary
+
+def top_k_neighbours(text_matrix, tag_matrix, k=DEFAULT_TOP_K, tag_weight=DEFAULT_TAG_WEIGHT,
+                     min_score=DEFAULT_MIN_SCORE, block_bytes=BLOCK_BYTES, dense_columns=DENSE_COLUMNS):
+    """
+    Yield (row, neighbour rows, scores) for every film, best first. Similarity is
+    tag_weight * tag cosine + (1 - tag_weight) * text cosine, the dot product of
+    the two matrices stacked with sqrt weights. Rows are scored a block at a time.
+    The most frequent columns (all tags and common terms) would make the sparse
+    product dense, so they are multiplied as dense arrays and only the long tail
+    of rarer terms goes through the sparse product; argpartition then takes the top k.
+    """
+    n_films = text_matrix.shape[0]
+    k = min(k, n_films - 1)
+    if k <= 0:
+        return
+
+    combined = sp.hstack([text_matrix * np.float32(math.sqrt(1 - tag_weight)),
+                          tag_matrix * np.float32(math.sqrt(tag_weight))]).tocsc()
+    document_frequency = np.diff(combined.indptr)
+    frequent = np.zeros(combined.shape[1], dtype=bool)
+    frequent[np.argsort(-document_frequency, kind='stable')[:dense_columns]] = True
+    frequent &= document_frequency > 0
+
+    dense = combined[:, frequent].toarray()
+    dense_transposed = np.ascontiguousarray(dense.T)
+    sparse = combined[:, ~frequent].tocsr()
+    sparse_transposed = sparse.T.tocsr()
+    del combined
+
+    block_rows = max(1, min(4096, block_bytes // max(1, n_films * 4)))
+    for start in range(0, n_films, block_rows):
+        stop = min(n_films, start + block_rows)
+        scores = dense[start:stop] @ dense_transposed
+        scores += (sparse[start:stop] @ sparse_transposed).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1  # never a film's own neighbour
+
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+        for offset in range(stop - start):
+            keep = candidate_scores[offset] >= min_score
+            yield start + offset, candidates[offset][keep], candidate_scores[offset][keep]
+
+def compute_similar_films(csv_file, slug_registry=None, k=DEFAULT_TOP_K, tag_weight=DEFAULT_TAG_WEIGHT,
+                          min_score=DEFAULT_MIN_SCORE):
+    """Return (film entries, {slug: [(neighbour index, score), ...]}) for the dataset."""
+    groups, _ = load_and_group_films(csv_file)
+    if not groups:
+        return [], {}
+
+    group_slugs = assign_group_slugs(groups, slug_registry)
+    films, text_counts, tag_counts = collect_film_profiles(groups, group_slugs)
+    del groups
+
+    start = time.perf_counter()
+    text_matrix, vocabulary = tfidf_matrix(text_counts, MIN_DF, MAX_DF_FRACTION)
+    tag_matrix, tags = tfidf_matrix(tag_counts)
+    print(f"{len(films)} films with cuts: {len(vocabulary)} text terms, {len(tags)} tags, "
+          f"{text_matrix.nnz + tag_matrix.nnz} non-zeros ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    neighbours = {}
+    for row, similar_rows, scores in top_k_neighbours(text_matrix, tag_matrix, k, tag_weight, min_score):
+        neighbours[films[row]['slug']] = [(int(i), round(float(score), 4)) for i, score in zip(similar_rows, scores)]
+    print(f"Computed top {k} neighbours for {len(films)} films in {time.perf_counter() - start:.1f}s")
+    return films, neighbours
+
+def write_similar_json(films, neighbours, output_path):
+    """Write {slug: [[similar slug, score], ...]} as compact JSON."""
+    data = {slug: [[films[i]['slug'], score] for i, score in similar] for slug, similar in neighbours.items()}
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+    return output_path
+
+def generate_similar_sql(films, neighbours, output_dir, films_per_file=SQL_FILMS_PER_FILE):
+    """
+    Write the film_similar rows as SQL files. Each film's rows are replaced as a
+    unit, and the last file drops rows of films no longer in the dataset.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    items = list(neighbours.items())
+    for file_number, i in enumerate(range(0, len(items), films_per_file), 1):
+        sql_file = os.path.join(output_dir, f"tmp_similar_import_{file_number}.sql")
+        with open(sql_file, 'w', encoding='utf-8') as f:
+            for slug, similar in items[i:i+films_per_file]:
+                f.write(f"DELETE FROM film_similar WHERE slug = {sql_value(slug)};\n")
+                if not similar:
+                    continue
+                rows = ',\n'.join(
+                    f"({sql_value(slug)}, {rank}, {sql_value(films[j]['slug'])}, {sql_value(films[j]['name'])}, "
+                    f"{sql_value(films[j]['year'], True)}, {sql_value(films[j]['poster_url'])}, {score})"
+                    for rank, (j, score) in enumerate(similar, 1))
+                f.write(f"INSERT INTO film_similar (slug, rank, similar_slug, similar_name, similar_year, "
+                        f"similar_poster_url, score) VALUES\n{rows};\n")
+        files.append(sql_file)
+
+    cleanup_file = os.path.join(output_dir, "tmp_similar_import_cleanup.sql")
+    with open(cleanup_file, 'w', encoding='utf-8') as f:
+        f.write("DELETE FROM film_similar WHERE slug NOT IN (SELECT slug FROM films WHERE slug IS NOT NULL);\n")
+    files.append(cleanup_file)
+    return files
+
+def main():
+    """Main similar films pipeline."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute similar films from censorship profiles")
+    parser.add_argument('--csv-file', default="src/lib/data/data.csv", help='CSV data file')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Neighbours kept per film')
+    parser.add_argument('--tag-weight', type=float, default=DEFAULT_TAG_WEIGHT, help='Share of the score from the AI tags (0-1)')
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE, help='Drop neighbours below this similarity')
+    parser.add_argument('--json-output', help='Write {slug: [[similar slug, score], ...]} JSON here')
+    parser.add_argument('--sql-dir', help='Write film_similar SQL files here')
+    parser.add_argument('--import', dest='import_db', action='store_true', help='Import the rows into D1')
+    parser.add_argument('--db-mode', choices=['local', 'remote'], default='local', help='Database mode')
+    parser.add_argument('--db-name', help='Database name (default: from wrangler.toml)')
+
+    args = parser.parse_args()
+
+    if not (args.json_output or args.sql_dir or args.import_db):
+        print("Nothing to write: pass --json-output, --sql-dir or --import")
+        return 1
+    if not 0 <= args.tag_weight <= 1:
+        print("--tag-weight must be between 0 and 1")
+        return 1
+    if not os.path.exists(args.csv_file):
+        print(f"CSV file not found: {args.csv_file}")
+        return 1
+
+    films, neighbours = compute_similar_films(args.csv_file, args.slug_registry, args.top_k, args.tag_weight,
+                                              args.min_score)
+    if not films:
+        print("No films with cuts to compare")
+        return 1
+
+    if args.json_output:
+        print(f"Similar films written to {write_similar_json(films, neighbours, args.json_output)}")
+
+    if args.sql_dir:
+        sql_files = generate_similar_sql(films, neighbours, args.sql_dir)
+        print(f"Wrote {len(sql_files)} SQL files to {args.sql_dir}")
+
+    if args.import_db:
+        from data_import import import_to_d1
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sql_files = generate_similar_sql(films, neighbours, temp_dir)
+            # Only 000 (which creates film_similar): the 002 migration would drop the analysis tables
+            if not import_to_d1(sql_files, args.db_mode, args.db_name, staging=False, apply_schema=('000-',)):
+                return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
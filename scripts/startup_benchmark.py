@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - Cold import time of the scripts' CLI startup and no-op runs
+Runs each case in a fresh interpreter with python -X importtime and fails when one goes over the budget
+"""
+
+import sys
+import os
+import time
+import subprocess
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 300
+MISSING_CSV = "does-not-exist.csv"
+
+# Only the analysis stages may load these. Everything else defers them to the
+# stage that needs them, so --help and runs that stop early stay fast
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'statsmodels')
+# Scripts that are themselves the numerical stage, with their own budget
+ANALYSIS_SCRIPTS = ('film_analysis', 'model_comparison', 'similar_films')
+ANALYSIS_BUDGET_MS = 600
+
+def benchmark_cases(scratch_dir):
+    """Return [(script, args)]: --help for every script, then runs that exit early on a missing CSV."""
+    scripts = sorted(name[:-3] for name in os.listdir(SCRIPTS_DIR)
+                     if name.endswith('.py') and name not in ('film_utils.py', 'run_metrics.py', 'startup_benchmark.py'))
+    cases = [(script, ['--help']) for script in scripts]
+    cases += [
+        ('data_import', [MISSING_CSV]),
+        ('search_sync', [MISSING_CSV]),
+        ('query_advisor', [MISSING_CSV]),
+        ('poster_thumbnails', ['--csv-file', MISSING_CSV]),
+        ('similar_films', ['--csv-file', MISSING_CSV]),
+        ('content_generator', ['--csv-file', MISSING_CSV, '--output-dir', scratch_dir])
+    ]
+    return cases
+
+def parse_importtime(stderr):
+    """Sum the self times of a -X importtime report. Returns (milliseconds, {top-level package: ms})."""
+    total_us = 0
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        total_us += int(self_us)
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return total_us / 1000, packages
+
+def measure_startup(script, args, repeat=3):
+    """Run one case in fresh interpreters. Returns the fastest (import ms, wall ms, packages)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(SCRIPTS_DIR, f"{script}.py")] + args,
+                                capture_output=True, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        import_ms, packages = parse_importtime(result.stderr)
+        if best is None or import_ms < best[0]:
+            best = (import_ms, wall_ms, packages)
+    return best
+
+def run_benchmark(budget_ms=DEFAULT_BUDGET_MS, repeat=3, top=3):
+    """Measure every case and print a report. Returns the number of cases over budget."""
+    failures = 0
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        print(f"{'case':<56} {'imports':>9} {'wall':>9} {'budget':>7}  slowest packages")
+        for script, args in benchmark_cases(scratch_dir):
+            import_ms, wall_ms, packages = measure_startup(script, args, repeat)
+            budget = ANALYSIS_BUDGET_MS if script in ANALYSIS_SCRIPTS else budget_ms
+            heavy = [] if script in ANALYSIS_SCRIPTS else [module for module in HEAVY_MODULES if module in packages]
+
+            slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+            case = f"{script} {' '.join(args).replace(scratch_dir, '<tmp>')}"
+            status = ''
+            if import_ms > budget:
+                status = '  OVER BUDGET'
+            if heavy:
+                status += f"  loads {', '.join(heavy)}"
+            if status:
+                failures += 1
+
+            print(f"{case:<56} {import_ms:7.0f}ms {wall_ms:7.0f}ms {budget:5d}ms  "
+                  f"{', '.join(f'{name} {ms:.0f}ms' for name, ms in slowest)}{status}")
+
+    print(f"{failures} cases over budget" if failures else "All cases within budget")
+    return failures
+
+def main():
+    """Main startup benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark cold CLI startup of the scripts")
+    parser.add_argument('--budget-ms', type=int, default=DEFAULT_BUDGET_MS,
+                        help='Import time budget per case, except the analysis scripts')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the fastest is reported')
+
+    args = parser.parse_args()
+
+    return 1 if run_benchmark(args.budget_ms, args.repeat) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
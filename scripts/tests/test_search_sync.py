@@ -0,0 +1,59 @@
+"""
+Search sync - the streamed spool path must produce the same documents, in the
+same order and with the same ranked popularity, as the in-memory list path
+"""
+
+import os
+import sys
+import csv
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from film_utils import iter_film_groups, load_and_group_films, scan_film_groups
+from search_sync import iter_spool_batches, prepare_search_documents, write_search_spool
+
+FIELDS = ['id', 'movie_name', 'language', 'cert_date', 'imdb_votes', 'imdb_rating', 'imdb_languages',
+          'imdb_poster_url', 'description', 'ai_cleaned_description', 'ai_action']
+LANGUAGES = ['English', 'Hindi', 'Tamil', 'Telugu', 'Malayalam', 'Bengali', 'Korean']
+
+def write_csv(path, films=60):
+    """Write a CSV whose language versions are spread out, so groups complete out of first-seen order."""
+    rows = []
+    for version in range(3):
+        for film in range(films):
+            if version and film % version:
+                continue
+            for cut in range(2):
+                rows.append({
+                    'id': f"{version}{film:03d}", 'movie_name': f"Film {film}", 'language': LANGUAGES[version],
+                    'cert_date': '2020-01-15',
+                    # Few distinct vote counts, so the ranking has many ties to break
+                    'imdb_votes': str(film % 3 * 100), 'imdb_rating': '6.5',
+                    'imdb_languages': LANGUAGES[film % len(LANGUAGES)], 'imdb_poster_url': '',
+                    'description': f"Cut {cut} of film {film}", 'ai_cleaned_description': f"cut {cut}",
+                    'ai_action': 'deletion'
+                })
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def test_film_groups_stream_in_load_order(tmp_path):
+    csv_path = str(tmp_path / 'data.csv')
+    write_csv(csv_path)
+
+    groups, _ = load_and_group_films(csv_path)
+    streamed = list(iter_film_groups(csv_path, scan_film_groups(csv_path)))
+    assert streamed == list(groups.items())
+
+def test_spool_matches_document_list(tmp_path):
+    csv_path = str(tmp_path / 'data.csv')
+    write_csv(csv_path)
+
+    expected = prepare_search_documents(csv_path, str(tmp_path / 'list_registry.json'))
+    spool_path = str(tmp_path / 'documents.jsonl')
+    scores = write_search_spool(csv_path, spool_path, str(tmp_path / 'spool_registry.json'))
+    spooled = [json.loads(line) for _, batch in iter_spool_batches(spool_path, scores, 25)
+               for line in batch.decode('utf-8').splitlines()]
+
+    assert spooled == expected
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Typesense Stub - Local stand-in for the Typesense endpoints used by search_sync
+Latency and failure injection, plus a throughput benchmark for search_sync's upload paths
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import DEFAULT_SLUG_REGISTRY
+from offline_search import build_search_index, search
+from run_metrics import percentile
+
+DEFAULT_PORT = 8108
+DEFAULT_API_KEY = 'local-stub-key'
+
+def new_stub_state(api_key=DEFAULT_API_KEY, latency_ms=0, jitter_ms=0, latency_per_doc_ms=0,
+                   failure_rate=0.0, document_failure_rate=0.0, seed=None):
+    """Create the collections, documents and request metrics held by the stub server."""
+    return {
+        'api_key': api_key,
+        'latency_ms': latency_ms,
+        'jitter_ms': jitter_ms,
+        'latency_per_doc_ms': latency_per_doc_ms,
+        'failure_rate': failure_rate,
+        'document_failure_rate': document_failure_rate,
+        'random': random.Random(seed),
+        'lock': threading.Lock(),
+        'collections': {},
+        'documents': {},
+        'search_indexes': {},
+        'request_latencies': [],
+        'documents_rejected': 0
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve the collections, documents/import and documents/search endpoints."""
+
+    server_version = 'TypesenseStub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def _handle(self, method):
+        state = self.server.state
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if parts == ['health']:
+            return self._send_json(200, {'ok': True})
+        if self.headers.get('X-TYPESENSE-API-KEY') != state['api_key']:
+            return self._send_json(401, {'message': 'Forbidden - a valid `x-typesense-api-key` header must be sent.'})
+
+        body = self._read_body() if method in ('POST', 'PATCH') else ''
+        doc_count = body.count('\n') + 1 if body and 'import' in parts else 0
+
+        with state['lock']:
+            delay = state['latency_ms'] + state['random'].uniform(0, state['jitter_ms']) + state['latency_per_doc_ms'] * doc_count
+            fail = state['random'].random() < state['failure_rate']
+        time.sleep(delay / 1000.0)
+
+        if fail:
+            self._send_json(503, {'message': 'Injected failure'})
+        else:
+            self._route(method, parts, params, body)
+
+        with state['lock']:
+            state['request_latencies'].append(('/'.join(parts[2:]) or 'collections', (time.perf_counter() - start) * 1000))
+
+    def _route(self, method, parts, params, body):
+        state = self.server.state
+
+        if parts == ['collections'] and method == 'POST':
+            schema = json.loads(body)
+            with state['lock']:
+                if schema['name'] in state['collections']:
+                    return self._send_json(409, {'message': f"A collection with name `{schema['name']}` already exists."})
+                schema['created_at'] = int(time.time() * 1000)
+                state['collections'][schema['name']] = schema
+                state['documents'][schema['name']] = {}
+                state['search_indexes'].pop(schema['name'], None)
+            return self._send_json(201, schema)
+
+        if len(parts) < 2 or parts[0] != 'collections' or parts[1] not in state['collections']:
+            return self._send_json(404, {'message': 'Not Found'})
+        name = parts[1]
+
+        if len(parts) == 2 and method == 'GET':
+            return self._send_json(200, state['collections'][name])
+
+        if len(parts) == 2 and method == 'DELETE':
+            with state['lock']:
+                schema = state['collections'].pop(name)
+                state['documents'].pop(name)
+                state['search_indexes'].pop(name, None)
+            return self._send_json(200, schema)
+
+        if len(parts) == 4 and parts[2] == 'documents' and method == 'DELETE':
+            with state['lock']:
+                doc = state['documents'][name].pop(parts[3], None)
+                state['search_indexes'].pop(name, None)
+            if doc is None:
+                return self._send_json(404, {'message': f'Could not find a document with id: {parts[3]}'})
+            return self._send_json(200, doc)
+
+        if parts[2:] == ['documents', 'import'] and method == 'POST':
+            return self._send_text(200, self._import(name, body, params.get('action', 'create')))
+
+        if parts[2:] == ['documents', 'search'] and method == 'GET':
+            with state['lock']:
+                if name not in state['search_indexes']:
+                    state['search_indexes'][name] = build_search_index(list(state['documents'][name].values()))
+                index = state['search_indexes'][name]
+            result = search(index, params.get('q', '*'), params.get('filter_by'), params.get('facet_by'),
+                            int(params.get('per_page', 10)), int(params.get('page', 1)))
+            return self._send_json(200, result)
+
+        return self._send_json(404, {'message': 'Not Found'})
+
+    def _import(self, name, body, action):
+        """Apply a JSONL import, returning one result line per document."""
+        state = self.server.state
+        results = []
+        with state['lock']:
+            documents = state['documents'][name]
+            for line in body.splitlines():
+                try:
+                    doc = json.loads(line)
+                except ValueError as e:
+                    results.append({'success': False, 'error': f'Bad JSON: {e}', 'document': line})
+                    continue
+
+                doc_id = str(doc.get('id'))
+                if state['random'].random() < state['document_failure_rate']:
+                    error = 'Injected document failure'
+                elif action == 'create' and doc_id in documents:
+                    error = 'A document with id %s already exists.' % doc_id
+                elif action == 'update' and doc_id not in documents:
+                    error = 'Could not find a document with id: %s' % doc_id
+                else:
+                    error = None
+
+                if error:
+                    state['documents_rejected'] += 1
+                    results.append({'success': False, 'error': error, 'document': line})
+                    continue
+
+                if action in ('update', 'emplace') and doc_id in documents:
+                    documents[doc_id] = {**documents[doc_id], **doc}
+                else:
+                    documents[doc_id] = doc
+                results.append({'success': True})
+            state['search_indexes'].pop(name, None)
+        return '\n'.join(json.dumps(r) for r in results)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Start the stub in a background thread. Returns the server; its state dict is server.state."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.state = new_stub_state(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def run_sync_benchmark(csv_file, batch_sizes, slug_registry=None, paths=('spool', 'list'), **options):
+    """
+    Drive search_sync's upload paths against the stub and report throughput per
+    batch size: the JSONL spool main() streams, and the in-memory document list.
+    """
+    from search_sync import prepare_search_documents, sync_spool_to_typesense, sync_to_typesense, write_search_spool
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        prepared = {}
+        for path in paths:
+            start = time.perf_counter()
+            if path == 'spool':
+                spool_path = os.path.join(spool_dir, 'documents.jsonl')
+                prepared[path] = write_search_spool(csv_file, spool_path, slug_registry)
+            else:
+                prepared[path] = prepare_search_documents(csv_file, slug_registry)
+            print(f"📊 {path}: prepared {len(prepared[path])} documents in {time.perf_counter() - start:.2f}s")
+
+        for path in paths:
+            total = len(prepared[path])
+            for batch_size in batch_sizes:
+                server = start_stub_server(**options)
+                host = f"127.0.0.1:{server.server_address[1]}"
+
+                start = time.perf_counter()
+                if path == 'spool':
+                    success = sync_spool_to_typesense(spool_path, prepared[path], 'http', host, server.state['api_key'],
+                                                      batch_size=batch_size)
+                else:
+                    success = sync_to_typesense(prepared[path], 'http', host, server.state['api_key'],
+                                                batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+
+                import_latencies = [ms for path_name, ms in server.state['request_latencies']
+                                    if path_name == 'documents/import']
+                stored = len(server.state['documents'].get('films', {}))
+                server.shutdown()
+
+                print(f"📊 {path} batch_size={batch_size}: {'ok' if success else 'FAILED'}, {stored}/{total} stored, "
+                      f"{stored / elapsed:.0f} docs/s, {len(import_latencies)} import requests, "
+                      f"p50 {percentile(import_latencies, 50):.1f} ms, p95 {percentile(import_latencies, 95):.1f} ms, "
+                      f"p99 {percentile(import_latencies, 99):.1f} ms, {server.state['documents_rejected']} rejected")
+
+def main():
+    """Main stub server entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Typesense stand-in and sync benchmark")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in [('serve', 'Run the stub server'), ('benchmark', 'Benchmark the search_sync upload paths against the stub')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--api-key', default=DEFAULT_API_KEY, help='API key the stub accepts')
+        sub.add_argument('--latency-ms', type=float, default=0, help='Base latency added to every request')
+        sub.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency per request')
+        sub.add_argument('--latency-per-doc-ms', type=float, default=0, help='Extra import latency per document')
+        sub.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+        sub.add_argument('--document-failure-rate', type=float, default=0.0,
+                         help='Fraction of imported documents rejected in the per-line results')
+        sub.add_argument('--seed', type=int, help='Random seed for jitter and failures')
+        if name == 'serve':
+            sub.add_argument('--host', default='127.0.0.1', help='Bind address')
+            sub.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port')
+        else:
+            sub.add_argument('csv_file', help='CSV file with film data')
+            sub.add_argument('--batch-sizes', default='20', help='Comma-separated batch sizes to compare')
+            sub.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+            sub.add_argument('--paths', default='spool,list',
+                             help='Comma-separated upload paths to compare: spool (what search_sync runs) and list')
+
+    args = parser.parse_args()
+    options = dict(api_key=args.api_key, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                   latency_per_doc_ms=args.latency_per_doc_ms, failure_rate=args.failure_rate,
+                   document_failure_rate=args.document_failure_rate, seed=args.seed)
+
+    if args.command == 'serve':
+        server = start_stub_server(args.host, args.port, **options)
+        print(f"Typesense stub listening on http://{args.host}:{server.server_address[1]} (api key: {args.api_key})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    if not os.path.exists(args.csv_file):
+        print(f"CSV file not found: {args.csv_file}")
+        return 1
+    paths = [path.strip() for path in args.paths.split(',')]
+    if set(paths) - {'spool', 'list'}:
+        parser.error(f"unknown upload path in --paths: {args.paths}")
+    run_sync_benchmark(args.csv_file, [int(b) for b in args.batch_sizes.split(',')], args.slug_registry, paths,
+                       **options)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Views Rollup - Compact film_views history and refresh view counts
+Rolls old daily rows into monthly/yearly tables and exports a popularity snapshot
+"""
+
+import sys
+import os
+import json
+import sqlite3
+from datetime import date, timedelta
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import sql_value
+
+DEFAULT_KEEP_DAYS = 60
+DEFAULT_KEEP_MONTHS = 24
+DEFAULT_RECENT_DAYS = 30
+
+def rollup_cutoffs(today, keep_days=DEFAULT_KEEP_DAYS, keep_months=DEFAULT_KEEP_MONTHS):
+    """Return the (daily, monthly) cutoffs, aligned so no period is split across tables."""
+    daily_cutoff = (today - timedelta(days=keep_days)).replace(day=1)
+    month_index = today.year * 12 + today.month - 1 - keep_months
+    monthly_cutoff = f"{month_index // 12:04d}"
+    return daily_cutoff.isoformat(), monthly_cutoff
+
+def generate_rollup_sql(daily_cutoff, monthly_cutoff):
+    """Generate the compaction and view refresh statements."""
+    return f"""INSERT INTO film_views_monthly (film_id, view_month, view_count)
+SELECT film_id, substr(view_date, 1, 7), SUM(view_count)
+FROM film_views WHERE view_date < {sql_value(daily_cutoff)}
+GROUP BY film_id, substr(view_date, 1, 7)
+ON CONFLICT (film_id, view_month) DO UPDATE SET view_count = view_count + excluded.view_count;
+DELETE FROM film_views WHERE view_date < {sql_value(daily_cutoff)};
+
+INSERT INTO film_views_yearly (film_id, view_year, view_count)
+SELECT film_id, substr(view_month, 1, 4), SUM(view_count)
+FROM film_views_monthly WHERE view_month < {sql_value(monthly_cutoff)}
+GROUP BY film_id, substr(view_month, 1, 4)
+ON CONFLICT (film_id, view_year) DO UPDATE SET view_count = view_count + excluded.view_count;
+DELETE FROM film_views_monthly WHERE view_month < {sql_value(monthly_cutoff)};
+
+WITH totals AS (
+  SELECT film_id, SUM(view_count) AS total FROM (
+    SELECT film_id, view_count FROM film_views
+    UNION ALL SELECT film_id, view_count FROM film_views_monthly
+    UNION ALL SELECT film_id, view_count FROM film_views_yearly
+  ) GROUP BY film_id
+)
+UPDATE films SET views = COALESCE((SELECT total FROM totals WHERE totals.film_id = films.id), 0);
+"""
+
+def export_popularity_snapshot(conn, output_path, today, recent_days=DEFAULT_RECENT_DAYS):
+    """Write {film_id: [total_views, recent_views]} for the ranking code."""
+    recent_cutoff = (today - timedelta(days=recent_days)).isoformat()
+    rows = conn.execute("""
+        SELECT f.id, f.views, COALESCE(SUM(v.view_count), 0)
+        FROM films f LEFT JOIN film_views v ON v.film_id = f.id AND v.view_date >= ?
+        WHERE f.views > 0
+        GROUP BY f.id
+    """, (recent_cutoff,)).fetchall()
+
+    snapshot = {
+        'generated': today.isoformat(),
+        'recent_days': recent_days,
+        'films': {film_id: [total, recent] for film_id, total, recent in rows}
+    }
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    return len(rows)
+
+def run_rollup(db_path, today, keep_days=DEFAULT_KEEP_DAYS, keep_months=DEFAULT_KEEP_MONTHS):
+    """Compact film_views in a local SQLite database. Returns the open connection."""
+    daily_cutoff, monthly_cutoff = rollup_cutoffs(today, keep_days, keep_months)
+    conn = sqlite3.connect(db_path)
+
+    before = conn.execute("SELECT COUNT(*) FROM film_views").fetchone()[0]
+    conn.executescript(f"BEGIN;\n{generate_rollup_sql(daily_cutoff, monthly_cutoff)}COMMIT;")
+    after = conn.execute("SELECT COUNT(*) FROM film_views").fetchone()[0]
+
+    print(f"Compacted {before - after} daily rows older than {daily_cutoff} "
+          f"(monthly rows before {monthly_cutoff} rolled into years)")
+    return conn
+
+def main():
+    """Main views rollup pipeline."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact film_views and refresh films.views")
+    parser.add_argument('db_path', nargs='?', help='Local SQLite copy of the D1 database')
+    parser.add_argument('--keep-days', type=int, default=DEFAULT_KEEP_DAYS, help='Days of daily rows to keep')
+    parser.add_argument('--keep-months', type=int, default=DEFAULT_KEEP_MONTHS, help='Months of monthly rows to keep')
+    parser.add_argument('--snapshot', help='Write a popularity snapshot JSON to this path')
+    parser.add_argument('--sql-out', help='Write the rollup SQL for wrangler d1 execute instead of running it')
+    parser.add_argument('--today', type=date.fromisoformat, default=date.today(), help='Reference date (YYYY-MM-DD)')
+
+    args = parser.parse_args()
+
+    if args.sql_out:
+        daily_cutoff, monthly_cutoff = rollup_cutoffs(args.today, args.keep_days, args.keep_months)
+        with open(args.sql_out, 'w', encoding='utf-8') as f:
+            f.write(generate_rollup_sql(daily_cutoff, monthly_cutoff))
+        print(f"Rollup SQL written to {args.sql_out}")
+        return 0
+
+    if not args.db_path or not os.path.exists(args.db_path):
+        print(f"Database not found: {args.db_path}")
+        return 1
+
+    conn = run_rollup(args.db_path, args.today, args.keep_days, args.keep_months)
+    if args.snapshot:
+        count = export_popularity_snapshot(conn, args.snapshot, args.today)
+        print(f"Popularity snapshot with {count} films written to {args.snapshot}")
+    conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Watch - Keep D1, the analysis tables and Typesense in sync from one long-running process
+Polls the upstream CSV with conditional requests and applies only the films that changed, reusing warm in-memory state
+"""
+
+import sys
+import os
+import json
+import time
+import hashlib
+import tempfile
+import itertools
+import requests
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from film_utils import DEFAULT_SLUG_REGISTRY, assign_group_slugs, load_and_group_films, sql_value
+from data_import import (CUT_TEXTS_CLEANUP_SQL, DATA_URL, new_batch_sizer, iter_sql_batches, import_to_d1,
+                         generate_analysis_sql, generate_peer_expectations_sql)
+from search_sync import iter_search_documents, recalculate_proportional_popularity
+from popularity_refresh import push_updates
+
+DEFAULT_CSV = "src/lib/data/data.csv"
+DEFAULT_STATUS_FILE = "src/lib/data/watch_status.json"
+DEFAULT_INTERVAL = 300
+DEFAULT_BATCH_SIZE = 100
+
+# The peer models are refitted once this share of film versions has changed
+# since the last fit, or when a changed film falls in a peer group the fit
+# has not seen; otherwise changed films are compared with the fitted table.
+REFIT_FRACTION = 0.02
+
+# Search fields owned by popularity_refresh.py, left alone on existing documents
+POPULARITY_FIELDS = ('popularity_score', 'click_count')
+
+def new_watch_state(csv_path, slug_registry=None):
+    """Start the in-memory state kept between polls."""
+    return {
+        'csv_path': csv_path,
+        'slug_registry': slug_registry,
+        'etag': None,
+        'last_modified': None,
+        'content_hash': None,
+        'group_hashes': {},
+        'group_ids': {},
+        'document_hashes': {},
+        'search_pending': False,
+        'analysis_rows': {},
+        'peer_expectations': None,
+        'default_model_type': None,
+        'versions_since_fit': 0
+    }
+
+def file_hash(path):
+    """Return the sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def json_hash(value):
+    """Return a short hash of a JSON-serialisable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+def poll_upstream(state, url=DATA_URL, timeout=60):
+    """
+    Fetch the upstream CSV if it changed since the last poll, using the stored
+    ETag and Last-Modified. Returns True when new content was written to the CSV path.
+    """
+    headers = {}
+    if state['etag']:
+        headers['If-None-Match'] = state['etag']
+    if state['last_modified']:
+        headers['If-Modified-Since'] = state['last_modified']
+
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        csv_dir = os.path.dirname(state['csv_path']) or '.'
+        os.makedirs(csv_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=csv_dir, suffix='.tmp')
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(1024 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    state['etag'], state['last_modified'] = etag, last_modified
+    if digest.hexdigest() == state['content_hash']:
+        # Servers without validators send the same bytes again
+        os.remove(tmp_path)
+        return False
+
+    os.replace(tmp_path, state['csv_path'])
+    state['content_hash'] = digest.hexdigest()
+    return True
+
+def diff_groups(state, groups):
+    """
+    Compare freshly loaded groups with the hashes in state. Returns (changed group
+    keys, removed film ids, new group hashes, new group film ids); the new hashes
+    are committed to state once the changes are applied.
+    """
+    group_hashes = {key: json_hash(film_rows) for key, film_rows in groups.items()}
+    group_ids = {key: [row.get('id', '').strip() for row in film_rows] for key, film_rows in groups.items()}
+
+    changed = [key for key, digest in group_hashes.items() if state['group_hashes'].get(key) != digest]
+    current_ids = {film_id for film_ids in group_ids.values() for film_id in film_ids}
+    previous_ids = {film_id for film_ids in state['group_ids'].values() for film_id in film_ids}
+    removed = sorted(previous_ids - current_ids - {''})
+    return changed, removed, group_hashes, group_ids
+
+def generate_removal_sql(film_ids, output_dir):
+    """Write the SQL deleting films no longer in the dataset (their cuts, summaries and analysis cascade) and their cut text."""
+    removal_file = os.path.join(output_dir, "tmp_import_removed_films.sql")
+    with open(removal_file, 'w', encoding='utf-8') as f:
+        for i in range(0, len(film_ids), 500):
+            f.write(f"DELETE FROM films WHERE id IN ({', '.join(sql_value(film_id) for film_id in film_ids[i:i+500])});\n")
+        f.write(CUT_TEXTS_CLEANUP_SQL)
+    return removal_file
+
+def sync_d1(state, groups, changed, removed, output_dir, db_mode, db_name, retries):
+    """
+    Upsert the changed groups into the live D1 tables and delete removed films.
+    With nothing deployed yet (no primed CSV), every film is imported and the
+    schemas are applied first, as the database may be empty.
+    """
+    files = [generate_removal_sql(removed, output_dir)] if removed else []
+    changed_groups = {key: groups[key] for key in changed}
+    if changed_groups:
+        files = itertools.chain(files, iter_sql_batches(changed_groups, output_dir, slug_registry=state['slug_registry'],
+                                                        batch_sizer=new_batch_sizer(), upsert=True))
+    # The upsert batches create the 001 bridge tables themselves; the 002 analysis
+    # tables this drops are refilled by the analysis step of the same run
+    full_import = not state['group_hashes']
+    return import_to_d1(files, db_mode, db_name, staging=False, retries=retries, apply_schema=full_import)
+
+def fit_peer_expectations(state, features):
+    """Refit the peer models on all film versions and keep the expectation table in memory."""
+    from film_analysis import model_and_analyze, build_peer_expectations
+
+    analysis_results = model_and_analyze(features, disp=False)
+    state['peer_expectations'] = build_peer_expectations(analysis_results)
+    state['default_model_type'] = analysis_results['model_type'].mode().iloc[0]
+    state['versions_since_fit'] = 0
+
+def build_analysis_rows(state, features):
+    """Return {(film id, language): row} of raw counts, peer group key and the peer group's model type."""
+    from film_analysis import MODIFICATION_TYPES, PEER_GROUP_FEATURES
+
+    rows = features[['id', 'language'] + MODIFICATION_TYPES + PEER_GROUP_FEATURES].merge(
+        state['peer_expectations'][PEER_GROUP_FEATURES + ['model_type']], on=PEER_GROUP_FEATURES, how='left')
+    rows['model_type'] = rows['model_type'].fillna(state['default_model_type'])
+    rows = rows.rename(columns={modification_type: f'score_value_{modification_type}'
+                                for modification_type in MODIFICATION_TYPES})
+    rows = rows.astype(object).where(rows.notna(), None)
+    return {(row['id'], row['language']): row for row in rows.to_dict('records')}
+
+def sync_analysis(state, output_dir, db_mode, db_name, retries):
+    """
+    Recompute the features on the warm dataset and import the analysis rows that
+    changed, refitting the peer models first when too much has changed.
+    Returns (success, refitted).
+    """
+    import pandas as pd
+    from film_analysis import PEER_GROUP_FEATURES, load_analysis_data, create_movie_features
+
+    features = create_movie_features(load_analysis_data(state['csv_path']))
+    peer_keys = features[PEER_GROUP_FEATURES].dropna()
+    known_keys = set(map(tuple, state['peer_expectations'][PEER_GROUP_FEATURES].itertuples(index=False))) \
+        if state['peer_expectations'] is not None else set()
+
+    rows = build_analysis_rows(state, features) if known_keys else {}
+    changed = [key for key, row in rows.items() if state['analysis_rows'].get(key) != row]
+    unseen = set(map(tuple, peer_keys.itertuples(index=False))) - known_keys
+    refit = not known_keys or bool(unseen) or \
+        state['versions_since_fit'] + len(changed) >= REFIT_FRACTION * len(features)
+
+    if refit:
+        print(f"Refitting peer models on {len(features)} film versions...")
+        fit_peer_expectations(state, features)
+        rows = build_analysis_rows(state, features)
+        changed = [key for key, row in rows.items() if state['analysis_rows'].get(key) != row]
+    else:
+        state['versions_since_fit'] += len(changed)
+
+    files = []
+    if changed:
+        analysis_csv = os.path.join(output_dir, "tmp_watch_analysis.csv")
+        pd.DataFrame([rows[key] for key in changed]).to_csv(analysis_csv, index=False)
+        files.append(generate_analysis_sql(analysis_csv, output_dir))
+    if refit:
+        peer_csv = os.path.join(output_dir, "tmp_watch_peer_expectations.csv")
+        state['peer_expectations'].to_csv(peer_csv, index=False)
+        files.append(generate_peer_expectations_sql(peer_csv, output_dir))
+
+    print(f"Analysis: {len(changed)} film versions changed{', peer models refitted' if refit else ''}")
+    success = not files or import_to_d1(files, db_mode, db_name, staging=False, retries=retries, apply_schema=False)
+    if success:
+        state['analysis_rows'] = rows
+    return success, refit
+
+def search_document_hash(doc):
+    """Hash a search document without the fields popularity_refresh.py maintains."""
+    return json_hash({field: value for field, value in doc.items() if field not in POPULARITY_FIELDS})
+
+def sync_search(state, groups, group_slugs, base_url, api_key, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Upsert the search documents whose content changed and delete removed ones.
+    New documents are created with a proportionally ranked popularity score;
+    existing ones keep the score and click count popularity_refresh.py pushed.
+    """
+    headers = {'X-TYPESENSE-API-KEY': api_key, 'Content-Type': 'application/json'}
+    documents = list(iter_search_documents(groups.items(), group_slugs))
+    hashes = {doc['id']: search_document_hash(doc) for doc in documents}
+    previous = state['document_hashes']
+
+    new_ids = {doc_id for doc_id in hashes if doc_id not in previous}
+    if new_ids:
+        documents = recalculate_proportional_popularity(documents)
+    upserts = []
+    for doc in documents:
+        if doc['id'] in new_ids:
+            upserts.append(doc)
+        elif previous[doc['id']] != hashes[doc['id']]:
+            upserts.append({field: value for field, value in doc.items() if field not in POPULARITY_FIELDS})
+    removed = [doc_id for doc_id in previous if doc_id not in hashes]
+
+    print(f"Search: {len(new_ids)} new, {len(upserts) - len(new_ids)} changed, {len(removed)} removed documents")
+    accepted = set(push_updates(upserts, base_url, headers, batch_size, action='emplace')) if upserts else set()
+
+    failures = len(upserts) - len(accepted)
+    for doc_id in removed:
+        response = requests.delete(f"{base_url}/collections/films/documents/{doc_id}", headers=headers)
+        if response.status_code in (200, 404):
+            del previous[doc_id]
+        else:
+            print(f"Failed to delete document {doc_id}: {response.status_code} - {response.text}")
+            failures += 1
+
+    # Documents that failed keep their old hash, so the next change retries them
+    for doc_id in accepted:
+        previous[doc_id] = hashes[doc_id]
+    return failures == 0
+
+def prime_state(state, base_url=None, api_key=None):
+    """
+    Load the local CSV into state as the already-deployed baseline: group and
+    document hashes, analysis rows and the fitted peer models.
+    """
+    from film_analysis import load_analysis_data, create_movie_features
+
+    groups, _ = load_and_group_films(state['csv_path'])
+    state['content_hash'] = file_hash(state['csv_path'])
+    _, _, state['group_hashes'], state['group_ids'] = diff_groups(state, groups)
+
+    group_slugs = assign_group_slugs(groups, state['slug_registry'])
+    state['document_hashes'] = {doc['id']: search_document_hash(doc)
+                                for doc in iter_search_documents(groups.items(), group_slugs)}
+
+    features = create_movie_features(load_analysis_data(state['csv_path']))
+    fit_peer_expectations(state, features)
+    state['analysis_rows'] = build_analysis_rows(state, features)
+    print(f"Primed with {len(groups)} films and {len(state['analysis_rows'])} analysed film versions")
+
+def run_cycle(state, options):
+    """Poll once and apply any change. Returns the run record for the status file, or None if nothing changed."""
+    if not poll_upstream(state, options['url']):
+        return None
+
+    start = time.perf_counter()
+    run = {'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'steps': {}}
+
+    groups, _ = load_and_group_films(state['csv_path'])
+    changed, removed, group_hashes, group_ids = diff_groups(state, groups)
+    run['changed_groups'], run['removed_films'] = len(changed), len(removed)
+    print(f"Upstream changed: {len(changed)} film groups changed, {len(removed)} films removed")
+
+    def step(name, action):
+        step_start = time.perf_counter()
+        success = action()
+        run['steps'][name] = {'success': bool(success), 'seconds': round(time.perf_counter() - step_start, 3)}
+        return success
+
+    # A failed search sync keeps the old hashes of the documents it missed, so it is
+    # retried even once D1 is up to date and no group differs any more
+    search_due = options['typesense_url'] and (changed or removed or state['search_pending'])
+
+    if changed or removed:
+        os.makedirs(options['output_dir'], exist_ok=True)
+        d1_ok = True
+        if not options['skip_d1']:
+            d1_ok = step('d1', lambda: sync_d1(state, groups, changed, removed, options['output_dir'],
+                                                options['db_mode'], options['db_name'], options['retries']))
+            # Analysis rows reference the films, so they wait for a good D1 step
+            d1_ok = d1_ok and step('analysis', lambda: sync_analysis(state, options['output_dir'], options['db_mode'],
+                                                                     options['db_name'], options['retries'])[0])
+        if d1_ok:
+            # Otherwise the groups stay changed against the old hashes and are applied again
+            state['group_hashes'], state['group_ids'] = group_hashes, group_ids
+    if search_due:
+        group_slugs = assign_group_slugs(groups, state['slug_registry'])
+        state['search_pending'] = not step('search', lambda: sync_search(
+            state, groups, group_slugs, options['typesense_url'], options['api_key'], options['batch_size']))
+
+    run['duration_seconds'] = round(time.perf_counter() - start, 3)
+    run['success'] = all(result['success'] for result in run['steps'].values())
+    if not run['success']:
+        # Forget the validators so the next poll downloads the file and retries
+        state['content_hash'] = state['etag'] = state['last_modified'] = None
+    return run
+
+def load_status(status_path):
+    """Load the previous status file, or an empty one."""
+    if status_path and os.path.exists(status_path):
+        with open(status_path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def write_status(status, status_path):
+    """Write the status file, replacing the previous one in one step."""
+    os.makedirs(os.path.dirname(status_path) or '.', exist_ok=True)
+    with open(status_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(status, f, indent=2)
+    os.replace(status_path + '.tmp', status_path)
+
+def watch(state, options):
+    """Poll on an interval until interrupted (or once), keeping the status file current."""
+    status = {'pid': os.getpid(), 'status': 'starting', 'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+              'interval_seconds': options['interval'], 'polls': 0, 'runs': 0, 'last_poll': None,
+              'last_poll_seconds': None, 'last_run': None, 'last_success': None, 'last_error': None}
+
+    try:
+        while True:
+            poll_start = time.perf_counter()
+            status['status'] = 'running'
+            try:
+                run = run_cycle(state, options)
+                status['last_error'] = None if run is None or run['success'] else 'One or more steps failed'
+            except Exception as e:
+                print(f"Watch cycle failed: {e}")
+                state['content_hash'] = state['etag'] = state['last_modified'] = None
+                run = None
+                status['last_error'] = str(e)
+
+            status['polls'] += 1
+            status['last_poll'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            status['last_poll_seconds'] = round(time.perf_counter() - poll_start, 3)
+            if run:
+                status['runs'] += 1
+                status['last_run'] = run
+                if run['success']:
+                    status['last_success'] = run['started_at']
+            status['status'] = 'error' if status['last_error'] else 'idle'
+            status.update(etag=state['etag'], last_modified=state['last_modified'], content_hash=state['content_hash'])
+            write_status(status, options['status_file'])
+
+            if options['once']:
+                return status['last_error'] is None
+            time.sleep(max(0, options['interval'] - (time.perf_counter() - poll_start)))
+    except KeyboardInterrupt:
+        status['status'] = 'stopped'
+        write_status(status, options['status_file'])
+        return True
+
+def main():
+    """Main watch loop."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch the upstream CSV and apply changed films incrementally")
+    parser.add_argument('--csv-file', default=DEFAULT_CSV, help='Local copy of the dataset')
+    parser.add_argument('--url', default=DATA_URL, help='Upstream CSV URL')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='Seconds between polls')
+    parser.add_argument('--once', action='store_true', help='Poll once and exit')
+    parser.add_argument('--status-file', default=DEFAULT_STATUS_FILE, help='Health and status JSON file')
+    parser.add_argument('--db-mode', choices=['local', 'remote'], default='local', help='Database mode')
+    parser.add_argument('--db-name', help='Database name (default: from wrangler.toml)')
+    parser.add_argument('--skip-d1', action='store_true', help='Do not update D1 or the analysis tables')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per failed D1 batch')
+    parser.add_argument('--typesense-protocol', default=os.environ.get('TYPESENSE_PROTOCOL', 'https'))
+    parser.add_argument('--typesense-host', default=os.environ.get('TYPESENSE_HOST'), help='Typesense host (search is skipped without one)')
+    parser.add_argument('--typesense-api-key', default=os.environ.get('TYPESENSE_API_KEY'))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Documents per Typesense import')
+    parser.add_argument('--slug-registry', default=DEFAULT_SLUG_REGISTRY, help='Persisted slug registry path')
+    parser.add_argument('--output-dir', help='Output directory for temporary SQL files')
+
+    args = parser.parse_args()
+
+    if args.typesense_host and not args.typesense_api_key:
+        print("Error: --typesense-api-key (or TYPESENSE_API_KEY) is required with a Typesense host")
+        return 1
+
+    state = new_watch_state(args.csv_file, args.slug_registry)
+    if os.path.exists(args.csv_file):
+        # The local CSV is taken as deployed; its validators are reused if it is the file they came with
+        prime_state(state)
+        previous = load_status(args.status_file)
+        if previous.get('content_hash') == state['content_hash']:
+            state['etag'], state['last_modified'] = previous.get('etag'), previous.get('last_modified')
+    else:
+        print(f"{args.csv_file} not found; the first poll applies the schemas and imports every film")
+
+    options = {
+        'url': args.url,
+        'interval': args.interval,
+        'once': args.once,
+        'status_file': args.status_file,
+        'db_mode': args.db_mode,
+        'db_name': args.db_name,
+        'skip_d1': args.skip_d1,
+        'retries': args.retries,
+        'typesense_url': f"{args.typesense_protocol}://{args.typesense_host}" if args.typesense_host else None,
+        'api_key': args.typesense_api_key,
+        'batch_size': args.batch_size,
+        'output_dir': args.output_dir or tempfile.mkdtemp(prefix='cbfc_watch_')
+    }
+    return 0 if watch(state, options) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
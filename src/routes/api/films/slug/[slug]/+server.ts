@@ -25,6 +25,16 @@ interface FilmVersion {
 	modifications: Modification[];
 	categories: Record<string, string[]>;
 	analysis?: AnalysisData;
+	summary?: FilmSummary;
+}
+
+interface FilmSummary {
+	modification_count: number;
+	deleted_secs: number;
+	replaced_secs: number;
+	inserted_secs: number;
+	ai_action_types: string | null;
+	ai_content_types: string | null;
 }
 
 interface AnalysisData {
@@ -39,6 +49,61 @@ interface AnalysisData {
 	disclaimers_peer_median: number;
 }
 
+// Kept in sync with GENRE_PRIORITY and MODIFICATION_RULES in scripts/film_analysis.py
+const GENRE_PRIORITY = [
+	'Horror',
+	'Thriller',
+	'Sci-Fi',
+	'Action',
+	'Crime',
+	'Mystery',
+	'War',
+	'Western',
+	'Adventure',
+	'Fantasy',
+	'Comedy'
+];
+const SUPPRESSION_ACTIONS = new Set([
+	'deletion',
+	'audio_modification',
+	'visual_modification',
+	'text_modification',
+	'content_overlay',
+	'replacement'
+]);
+
+// Raw counts come from analysis_results and the expected counts from the
+// peer group they share in analysis_peer_expectations
+const ANALYSIS_SQL = `
+	SELECT a.film_id, a.language, a.model_type,
+		a.violence_modifications, p.violence_expected AS violence_peer_median,
+		a.sensitive_content_modifications, p.sensitive_content_expected AS sensitive_content_peer_median,
+		a.political_religious_modifications, p.political_religious_expected AS political_religious_peer_median,
+		a.disclaimers_added, p.disclaimers_expected AS disclaimers_peer_median
+	FROM analysis_results a
+	JOIN films f ON a.film_id = f.id AND a.language = f.language
+	LEFT JOIN analysis_peer_expectations p
+		ON p.peer_genre = a.peer_genre AND p.peer_rating = a.peer_rating AND p.peer_language = a.peer_language
+	WHERE f.slug = ?1
+`;
+
+interface SimilarFilm {
+	slug: string;
+	name: string | null;
+	year: number | null;
+	poster_url: string | null;
+	score: number;
+}
+
+// Precomputed by scripts/similar_films.py, read by primary key
+const SIMILAR_SQL = `
+	SELECT similar_slug AS slug, similar_name AS name, similar_year AS year,
+		similar_poster_url AS poster_url, score
+	FROM film_similar
+	WHERE slug = ?1
+	ORDER BY rank
+`;
+
 interface FilmDetail {
 	slug: string | null;
 	name: string;
@@ -59,6 +124,7 @@ interface FilmDetail {
 	views: number | null;
 	versions: FilmVersion[];
 	categories: Record<string, string[]>;
+	similar: SimilarFilm[];
 }
 
 export const GET: RequestHandler = async ({ params, platform }) => {
@@ -89,11 +155,11 @@ export const GET: RequestHandler = async ({ params, platform }) => {
 };
 
 async function fetchFilmData(db: D1Database, slug: string): Promise<FilmDetail | null> {
-	const [films, mods, cats, analysis] = await Promise.all([
+	const [films, mods, cats, analysis, summaries, similar] = await Promise.all([
 		db.prepare('SELECT * FROM films WHERE slug = ?1').bind(slug).all(),
 		db
 			.prepare(
-				'SELECT m.* FROM modifications m JOIN films f ON m.film_id = f.id WHERE f.slug = ?1 ORDER BY m.cut_no'
+				'SELECT m.*, t.description, t.ai_description FROM modifications m JOIN films f ON m.film_id = f.id LEFT JOIN cut_texts t ON t.hash = m.text_hash WHERE f.slug = ?1 ORDER BY m.cut_no'
 			)
 			.bind(slug)
 			.all(),
@@ -103,12 +169,14 @@ async function fetchFilmData(db: D1Database, slug: string): Promise<FilmDetail |
 			)
 			.bind(slug)
 			.all(),
+		db.prepare(ANALYSIS_SQL).bind(slug).all(),
 		db
 			.prepare(
-				'SELECT a.*, f.language FROM analysis_results a JOIN films f ON a.film_id = f.id AND a.language = f.language WHERE f.slug = ?1'
+				'SELECT s.* FROM film_summary s JOIN films f ON s.film_id = f.id WHERE f.slug = ?1'
 			)
 			.bind(slug)
-			.all()
+			.all(),
+		db.prepare(SIMILAR_SQL).bind(slug).all()
 	]);
 
 	if (!films.success || !films.results?.length) return null;
@@ -142,20 +210,38 @@ async function fetchFilmData(db: D1Database, slug: string): Promise<FilmDetail |
 		});
 	});
 
-	const versions = films.results.map((film: any) => {
-		const analysisKey = `${film.id}-${film.language}`;
-		return {
-			id: film.id,
-			language: film.language,
-			cert_date: film.cert_date,
-			cbfc_file_no: film.cbfc_file_no,
-			certifier: film.certifier,
-			modifications: modsByFilm.get(film.id) || [],
-			categories: {},
-			analysis: analysisByFilmAndLang.get(analysisKey)
-		};
+	// Per-film totals precomputed at import time
+	const summaryByFilm = new Map<string, FilmSummary>();
+	(summaries.results || []).forEach((summary: any) => {
+		summaryByFilm.set(summary.film_id, {
+			modification_count: summary.modification_count,
+			deleted_secs: summary.deleted_secs,
+			replaced_secs: summary.replaced_secs,
+			inserted_secs: summary.inserted_secs,
+			ai_action_types: summary.ai_action_types,
+			ai_content_types: summary.ai_content_types
+		});
 	});
 
+	const versions = await Promise.all(
+		films.results.map(async (film: any) => {
+			const modifications = modsByFilm.get(film.id) || [];
+			return {
+				id: film.id,
+				language: film.language,
+				cert_date: film.cert_date,
+				cbfc_file_no: film.cbfc_file_no,
+				certifier: film.certifier,
+				modifications,
+				categories: {},
+				analysis:
+					analysisByFilmAndLang.get(`${film.id}-${film.language}`) ??
+					(await fetchPeerComparison(db, film, modifications)),
+				summary: summaryByFilm.get(film.id)
+			};
+		})
+	);
+
 	const allCategories: Record<string, string[]> = {};
 	categories.forEach((values, type) => (allCategories[type] = Array.from(values)));
 
@@ -174,10 +260,72 @@ async function fetchFilmData(db: D1Database, slug: string): Promise<FilmDetail |
 	return {
 		...base,
 		versions,
-		categories: allCategories
+		categories: allCategories,
+		similar: (similar.results || []) as unknown as SimilarFilm[]
 	} as FilmDetail;
 }
 
+// For a version imported since the last analysis: count its cuts the way the
+// analysis does and look up its peer group, falling back to the 'Other' group
+// for a genre or language the analysis grouped away as rare.
+async function fetchPeerComparison(
+	db: D1Database,
+	film: any,
+	modifications: Modification[]
+): Promise<AnalysisData | undefined> {
+	const rating = film.rating?.match(/U|A|UA|S/)?.[0];
+	const genres: string = film.imdb_genres || '';
+	const genre = GENRE_PRIORITY.find((g) => genres.includes(g)) ?? (genres ? genres.split('|')[0] : null);
+	if (!rating || !genre || !film.language) return undefined;
+
+	const result = await db
+		.prepare(
+			`SELECT * FROM analysis_peer_expectations
+			WHERE peer_rating = ?1 AND peer_genre IN (?2, 'Other') AND peer_language IN (?3, 'Other')
+			ORDER BY peer_genre = ?2 DESC, peer_language = ?3 DESC LIMIT 1`
+		)
+		.bind(rating, genre, film.language)
+		.first<any>();
+	if (!result) return undefined;
+
+	const counts = {
+		violence_modifications: 0,
+		sensitive_content_modifications: 0,
+		political_religious_modifications: 0,
+		disclaimers_added: 0
+	};
+	// Tags are pipe-delimited, and a cut counts when any of its tags match (MODIFICATION_RULES)
+	const tags = (value: string | null) =>
+		new Set(
+			(value || '')
+				.split('|')
+				.map((tag) => tag.trim())
+				.filter(Boolean)
+		);
+	const hasAny = (values: Set<string>, wanted: string[]) => wanted.some((tag) => values.has(tag));
+	modifications.forEach((mod) => {
+		const actions = tags(mod.ai_action_types);
+		const content = tags(mod.ai_content_types);
+		if ([...actions].some((action) => SUPPRESSION_ACTIONS.has(action))) {
+			if (hasAny(content, ['violence'])) counts.violence_modifications++;
+			if (hasAny(content, ['sexual_explicit', 'sexual_suggestive', 'profanity']))
+				counts.sensitive_content_modifications++;
+			if (hasAny(content, ['political', 'religious', 'identity_reference']))
+				counts.political_religious_modifications++;
+		}
+		if (actions.has('insertion')) counts.disclaimers_added++;
+	});
+
+	return {
+		model_type: result.model_type,
+		...counts,
+		violence_peer_median: result.violence_expected,
+		sensitive_content_peer_median: result.sensitive_content_expected,
+		political_religious_peer_median: result.political_religious_expected,
+		disclaimers_peer_median: result.disclaimers_expected
+	};
+}
+
 function extractAiCategories(modifications: Modification[]): Record<string, string[]> {
 	const result: Record<string, string[]> = {};
 	const fields = [
@@ -0,0 +1,37 @@
+import type { RequestHandler } from '@sveltejs/kit';
+import type { D1Database } from '@cloudflare/workers-types';
+
+// The view count changes between content builds, so film pages served from a
+// prerendered payload read it from here
+export const GET: RequestHandler = async ({ params, platform }) => {
+	const { slug } = params;
+	const db = platform?.env?.DB as D1Database;
+
+	if (!slug || !db) {
+		return new Response(JSON.stringify({ error: 'Missing slug or database' }), {
+			status: 400,
+			headers: { 'Content-Type': 'application/json' }
+		});
+	}
+
+	try {
+		// Same row the film API takes its film-level fields from
+		const film = await db
+			.prepare('SELECT views FROM films WHERE slug = ?1 LIMIT 1')
+			.bind(slug)
+			.first<{ views: number | null }>();
+		return film
+			? new Response(JSON.stringify({ views: film.views }), {
+					headers: { 'Content-Type': 'application/json' }
+				})
+			: new Response(JSON.stringify({ error: 'Film not found' }), {
+					status: 404,
+					headers: { 'Content-Type': 'application/json' }
+				});
+	} catch (error) {
+		return new Response(JSON.stringify({ error: 'Server error' }), {
+			status: 500,
+			headers: { 'Content-Type': 'application/json' }
+		});
+	}
+};
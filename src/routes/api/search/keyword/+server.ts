@@ -0,0 +1,85 @@
+import type { RequestHandler } from '@sveltejs/kit';
+import type { D1Database } from '@cloudflare/workers-types';
+
+interface KeywordHit {
+	id: string;
+	slug: string | null;
+	name: string;
+	year: number | null;
+	language: string | null;
+	poster_url: string | null;
+	snippet: string | null;
+}
+
+// Films ranked by their best matching cut in the modifications_fts index
+// (scripts/db/003-search.sql), with snippets built only for the returned page.
+// Kept in sync with KEYWORD_SEARCH_SQL in scripts/local_db.py.
+const KEYWORD_SEARCH_SQL = `
+	WITH hit AS MATERIALIZED (
+		SELECT m.film_id, m.id AS cut_id, bm25(modifications_fts, 1.0, 1.0, 3.0) AS rank
+		FROM modifications_fts
+		JOIN modifications m ON m.id = modifications_fts.rowid
+		WHERE modifications_fts MATCH ?1
+	),
+	best AS MATERIALIZED (
+		SELECT film_id, cut_id, MIN(rank) AS rank
+		FROM hit
+		GROUP BY film_id
+		ORDER BY rank
+		LIMIT ?2
+	)
+	SELECT f.id, f.slug, f.name, f.year, f.language, f.poster_url,
+		snippet(modifications_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet, best.rank
+	FROM best
+	JOIN modifications_fts ON modifications_fts.rowid = best.cut_id AND modifications_fts MATCH ?1
+	JOIN films f ON f.id = best.film_id
+	ORDER BY best.rank
+`;
+
+// Every word must match, the last one as a prefix. Words are quoted so user
+// input is never parsed as FTS5 query syntax.
+function toFtsQuery(text: string): string | null {
+	const words = text.toLowerCase().match(/[\p{L}\p{N}_]+/gu);
+	if (!words?.length) return null;
+	const terms = words.map((word) => `"${word}"`);
+	terms[terms.length - 1] += '*';
+	return terms.join(' ');
+}
+
+export const GET: RequestHandler = async ({ platform, url }) => {
+	const db = platform?.env?.DB as D1Database;
+	const query = toFtsQuery(url.searchParams.get('q') || '');
+	const limit = Math.min(50, Math.max(1, parseInt(url.searchParams.get('limit') || '20')));
+
+	if (!db || !query) {
+		return new Response(JSON.stringify({ error: 'Missing query or database' }), {
+			status: 400,
+			headers: { 'Content-Type': 'application/json' }
+		});
+	}
+
+	try {
+		const result = await db.prepare(KEYWORD_SEARCH_SQL).bind(query, limit).all();
+		const hits: KeywordHit[] = (result.results || []).map((row: any) => ({
+			id: row.id,
+			slug: row.slug,
+			name: row.name,
+			year: row.year,
+			language: row.language,
+			poster_url: row.poster_url,
+			snippet: row.snippet
+		}));
+
+		return new Response(JSON.stringify({ hits, found: hits.length }), {
+			headers: {
+				'Content-Type': 'application/json',
+				'Cache-Control': 'public, max-age=600'
+			}
+		});
+	} catch (error) {
+		return new Response(JSON.stringify({ error: 'Server error' }), {
+			status: 500,
+			headers: { 'Content-Type': 'application/json' }
+		});
+	}
+};
@@ -63,6 +63,15 @@ interface APIFilmResponse {
 	views: number | null;
 	versions: APIFilmVersion[];
 	categories: Record<string, string[]>;
+	similar: APISimilarFilm[];
+}
+
+interface APISimilarFilm {
+	slug: string;
+	name: string | null;
+	year: number | null;
+	poster_url: string | null;
+	score: number;
 }
 
 export interface CoreFilmData {
@@ -73,6 +82,46 @@ export interface CoreFilmData {
 	slug: string;
 }
 
+// Same path as film_payload_path in scripts/content_generator.py:
+// /films/<first byte of sha256(slug)>/<slug>.json
+const filmPayloadPath = async (slug: string): Promise<string> => {
+	const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(slug));
+	const shard = new Uint8Array(digest)[0].toString(16).padStart(2, '0');
+	return `/films/${shard}/${slug}.json`;
+};
+
+const fetchViews = async (fetch: typeof globalThis.fetch, slug: string): Promise<number | null> => {
+	try {
+		const response = await fetch(`/api/films/slug/${slug}/views`);
+		return response.ok ? ((await response.json()).views ?? null) : null;
+	} catch {
+		return null;
+	}
+};
+
+// Prerendered payloads are served from the CDN, with the live view count merged
+// in; the API covers films added since the last content build
+const fetchFilmPayload = async (
+	fetch: typeof globalThis.fetch,
+	slug: string
+): Promise<Response> => {
+	try {
+		const [response, views] = await Promise.all([
+			fetch(await filmPayloadPath(slug)),
+			fetchViews(fetch, slug)
+		]);
+		if (response.ok && response.headers.get('content-type')?.includes('json')) {
+			const payload = await response.json();
+			return new Response(JSON.stringify({ ...payload, views }), {
+				headers: { 'Content-Type': 'application/json' }
+			});
+		}
+	} catch {
+		// Fall through to the API
+	}
+	return fetch(`/api/films/slug/${slug}`);
+};
+
 const createErrorResponse = (message: string, status: number, slug: string): CoreFilmData => ({
 	currentFilm: null,
 	filmsByLanguage: null,
@@ -166,7 +215,7 @@ export const load: PageLoad = async ({ params, fetch, url }) => {
 	const langParam = browser ? url.searchParams.get('lang') : null;
 
 	try {
-		const response = await fetch(`/api/films/slug/${slug}`);
+		const response = await fetchFilmPayload(fetch, slug);
 
 		if (!response.ok) {
 			const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));